@@ -0,0 +1,145 @@
+from unittest.mock import MagicMock
+
+import pytest
+from huggingface_hub.errors import HfHubHTTPError
+
+from trackio.auth import AuthCache
+
+
+class FakeWhoami:
+    """Stands in for HfApi.whoami, returning canned responses per token."""
+
+    def __init__(self, responses: dict[str, dict | Exception]):
+        self.responses = responses
+        self.calls = 0
+
+    def __call__(self, token: str) -> dict:
+        self.calls += 1
+        response = self.responses[token]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def whoami_response(name: str, role: str = "write", orgs: list[str] = ()) -> dict:
+    return {
+        "name": name,
+        "orgs": [{"name": o} for o in orgs],
+        "auth": {"accessToken": {"role": role}},
+    }
+
+
+@pytest.fixture
+def space_env(monkeypatch):
+    monkeypatch.setenv("SPACE_AUTHOR_NAME", "alice")
+    monkeypatch.setenv("SPACE_REPO_NAME", "dashboard")
+
+
+def test_auth_cache_calls_whoami_once_per_ttl(space_env):
+    whoami = FakeWhoami({"good": whoami_response("alice")})
+    clock = FakeClock()
+    cache = AuthCache(whoami, ttl=60, clock=clock)
+    for _ in range(5):
+        cache.check("good")
+    assert whoami.calls == 1
+
+    clock.now = 61
+    cache.check("good")
+    assert whoami.calls == 2
+
+
+def test_auth_cache_caches_rejections(space_env):
+    whoami = FakeWhoami(
+        {
+            "read": whoami_response("alice", role="read"),
+            "stranger": whoami_response("bob", orgs=["other-org"]),
+        }
+    )
+    clock = FakeClock()
+    cache = AuthCache(whoami, negative_ttl=10, clock=clock)
+    for _ in range(3):
+        with pytest.raises(PermissionError, match="write permissions"):
+            cache.check("read")
+        with pytest.raises(PermissionError, match="owner of the space"):
+            cache.check("stranger")
+    assert whoami.calls == 2
+
+    clock.now = 11
+    with pytest.raises(PermissionError):
+        cache.check("read")
+    assert whoami.calls == 3
+
+
+def http_error(status: int) -> HfHubHTTPError:
+    return HfHubHTTPError(str(status), response=MagicMock(status_code=status))
+
+
+def test_auth_cache_caches_tokens_rejected_by_the_hub(space_env):
+    whoami = FakeWhoami(
+        {
+            "invalid": http_error(401),
+            "forbidden": http_error(403),
+            "flaky": http_error(503),
+            "offline": ConnectionError("unreachable"),
+        }
+    )
+    clock = FakeClock()
+    cache = AuthCache(whoami, negative_ttl=10, clock=clock)
+    for _ in range(3):
+        with pytest.raises(PermissionError, match="401"):
+            cache.check("invalid")
+        with pytest.raises(PermissionError, match="403"):
+            cache.check("forbidden")
+    assert whoami.calls == 2
+
+    for _ in range(3):
+        with pytest.raises(HfHubHTTPError):
+            cache.check("flaky")
+        with pytest.raises(ConnectionError):
+            cache.check("offline")
+    assert whoami.calls == 8
+
+    clock.now = 11
+    with pytest.raises(PermissionError):
+        cache.check("invalid")
+    assert whoami.calls == 9
+
+
+def test_auth_cache_fine_grained_token(space_env):
+    scoped = whoami_response("alice", role="fineGrained")
+    scoped["auth"]["accessToken"]["fineGrained"] = {
+        "scoped": [
+            {
+                "entity": {"type": "space", "name": "alice/dashboard"},
+                "permissions": ["repo.write"],
+            }
+        ]
+    }
+    unscoped = whoami_response("alice", role="fineGrained")
+    unscoped["auth"]["accessToken"]["fineGrained"] = {"scoped": []}
+    cache = AuthCache(FakeWhoami({"scoped": scoped, "unscoped": unscoped}))
+    cache.check("scoped")
+    with pytest.raises(PermissionError, match="fine grained"):
+        cache.check("unscoped")
+
+
+def test_auth_cache_is_bounded(space_env):
+    whoami = FakeWhoami({f"token-{i}": whoami_response("alice") for i in range(5)})
+    cache = AuthCache(whoami, max_size=2)
+    for i in range(5):
+        cache.check(f"token-{i}")
+    assert len(cache._entries) == 2
+    assert "token-4" not in "".join(cache._entries)
+
+    cache.check("token-4")
+    assert whoami.calls == 5
+    cache.check("token-0")
+    assert whoami.calls == 6
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trackio.downsample import downsample, lttb, min_max
+from trackio.ui import downsample_series
+
+
+@pytest.fixture
+def noisy_series():
+    rng = np.random.default_rng(0)
+    x = np.arange(100_000, dtype=np.float64)
+    y = np.sin(x / 5_000) + rng.normal(0, 0.1, len(x))
+    y[12_345] = 10.0
+    y[67_890] = -10.0
+    return x, y
+
+
+@pytest.mark.parametrize("method", [lttb, min_max])
+def test_downsample_is_bounded_and_keeps_endpoints(noisy_series, method):
+    x, y = noisy_series
+    for n_out in [4, 10, 500, 1000]:
+        indices = method(x, y, n_out)
+        assert len(indices) <= n_out
+        assert indices[0] == 0 and indices[-1] == len(x) - 1
+        assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("method", [lttb, min_max])
+def test_downsample_preserves_extremes(noisy_series, method):
+    x, y = noisy_series
+    indices = method(x, y, 500)
+    assert y[indices].max() == y.max()
+    assert y[indices].min() == y.min()
+
+
+def test_min_max_keeps_every_bucket_extreme():
+    y = np.array([0, 5, 1, 2, -3, 4, 0, 9, 8, 1], dtype=np.float64)
+    indices = min_max(np.arange(len(y)), y, 6)
+    # Buckets are [1, 5) and [5, 9): minimum and maximum of each, plus endpoints.
+    assert indices.tolist() == [0, 1, 4, 6, 7, 9]
+
+
+def test_short_series_are_not_downsampled():
+    x = np.arange(5)
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    assert min_max(x, x, 5).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_within_x_lim(noisy_series):
+    x, y = noisy_series
+    indices = downsample(x, y, 1000, x_lim=(50_000, 50_400))
+    # Zoomed in, every point in range is kept, plus one neighbor on each side.
+    assert indices.tolist() == list(range(49_999, 50_402))
+
+
+def test_downsample_series_per_run():
+    df = pd.DataFrame(
+        {
+            "step": list(range(5000)) * 2,
+            "loss": np.linspace(1, 0, 10_000),
+            "run": ["a"] * 5000 + ["b"] * 5000,
+        }
+    )
+    result = downsample_series(df, "step", "loss", n_points=100)
+    assert result.groupby("run").size().to_dict() == {"a": 100, "b": 100}
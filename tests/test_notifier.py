@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+from trackio.notifier import ChangeNotifier
+
+
+class FakeProject:
+    """Stands in for the state of a project database, counting how often it is read."""
+
+    def __init__(self):
+        self.runs = ["run1", "run2"]
+        self.last_steps = {"run1": 0, "run2": 0}
+        self.reads = 0
+
+    def __call__(self, project):
+        self.reads += 1
+        return list(self.runs), dict(self.last_steps)
+
+
+def log_later(notifier, update, delay=0.05):
+    def target():
+        time.sleep(delay)
+        update()
+        notifier.notify("proj")
+
+    threading.Thread(target=target).start()
+
+
+def test_wait_wakes_up_on_changes_to_watched_runs():
+    project = FakeProject()
+    notifier = ChangeNotifier(project, max_interval=10)
+
+    async def scenario():
+        version = notifier.version("proj")
+        log_later(notifier, lambda: project.last_steps.update(run2=5))
+        # A change to another run does not wake up the waiter.
+        assert await notifier.wait("proj", version, ["run1"], timeout=0.3) == version
+        log_later(notifier, lambda: project.last_steps.update(run1=1))
+        start = time.monotonic()
+        new_version = await notifier.wait("proj", version, ["run1"], timeout=5)
+        assert new_version > version
+        assert time.monotonic() - start < 1
+        # New runs wake up everyone.
+        log_later(notifier, lambda: project.runs.append("run3"))
+        assert await notifier.wait("proj", new_version, ["run1"], timeout=5) > (
+            new_version
+        )
+
+    asyncio.run(scenario())
+
+
+def test_wait_returns_immediately_for_missed_changes():
+    project = FakeProject()
+    notifier = ChangeNotifier(project, min_interval=0.01)
+
+    async def scenario():
+        version = notifier.version("proj")
+        project.last_steps["run2"] = 3
+        while notifier.version("proj") == version:
+            await asyncio.sleep(0.01)
+        start = time.monotonic()
+        assert await notifier.wait("proj", version, ["run2"], timeout=5) > version
+        assert time.monotonic() - start < 0.5
+        # ... but only if they concern the watched runs.
+        assert await notifier.wait("proj", version, ["run1"], timeout=0.1) == version
+
+    asyncio.run(scenario())
+
+
+def test_watcher_is_shared_backs_off_and_stops_when_idle():
+    project = FakeProject()
+    notifier = ChangeNotifier(
+        project, min_interval=0.01, max_interval=0.2, idle_timeout=0.3
+    )
+
+    async def scenario():
+        await asyncio.gather(
+            *(notifier.wait("proj", 0, timeout=0.5) for _ in range(20))
+        )
+
+    asyncio.run(scenario())
+    assert len(notifier._watchers) == 1
+    # Without any change, the interval quickly grows to its maximum.
+    assert project.reads < 15
+    time.sleep(0.8)
+    assert notifier._watchers == {}
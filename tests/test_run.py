@@ -1,16 +1,29 @@
+import os
+import subprocess
+import sys
 import tempfile
-from unittest.mock import MagicMock
+import time
+from unittest.mock import ANY, MagicMock, call
 
 import huggingface_hub
 import pytest
 
+import trackio
 from trackio import Run, init
+from trackio.sqlite_storage import SQLiteStorage
 
 
 class DummyClient:
     def __init__(self):
         self.predict = MagicMock()
 
+    def batches(self) -> list[list[dict]]:
+        return [
+            c.kwargs["logs"]
+            for c in self.predict.call_args_list
+            if c.kwargs["api_name"] == "/log_batch"
+        ]
+
 
 @pytest.fixture
 def temp_db(monkeypatch):
@@ -24,14 +37,23 @@ def test_run_log_calls_client():
     run = Run(project="proj", client=client, name="run1")
     metrics = {"x": 1}
     run.log(metrics)
-    client.predict.assert_called_once_with(
-        api_name="/log",
-        project="proj",
-        run="run1",
-        metrics=metrics,
-        dataset_id=None,
-        hf_token=huggingface_hub.utils.get_token(),
-    )
+    run.finish()
+    assert client.predict.call_args_list == [
+        call(
+            api_name="/log_batch",
+            project="proj",
+            logs=[{"run": "run1", "metrics": metrics, "timestamp": ANY}],
+            dataset_id=None,
+            hf_token=huggingface_hub.utils.get_token(),
+        ),
+        call(
+            api_name="/finish",
+            project="proj",
+            run="run1",
+            dataset_id=None,
+            hf_token=huggingface_hub.utils.get_token(),
+        ),
+    ]
 
 
 def test_init_resume_modes(temp_db):
@@ -86,3 +108,122 @@ def test_init_resume_modes(temp_db):
     )
     assert isinstance(run, Run)
     assert run.name == "nonexistent-run"
+
+
+def test_resume_keeps_saved_config(temp_db):
+    run = init(project="proj", name="run1", config={"lr": 0.1})
+    run.log({"x": 1})
+    trackio.finish()
+
+    init(project="proj", name="run1", resume="allow")
+    trackio.finish()
+    summaries = SQLiteStorage.get_run_summaries("proj", ["run1"])
+    assert summaries["run1"]["config"] == {"lr": 0.1}
+
+
+def test_run_log_batches_metrics():
+    client = DummyClient()
+    run = Run(project="proj", client=client, name="run1", batch_size=4)
+    for i in range(10):
+        run.log({"x": i})
+    run.finish()
+    batches = client.batches()
+    assert all(len(batch) <= 4 for batch in batches)
+    sent = [log["metrics"] for batch in batches for log in batch]
+    assert sent == [{"x": i} for i in range(10)]
+
+
+def test_run_log_applies_backpressure():
+    client = DummyClient()
+    client.predict.side_effect = lambda **kwargs: time.sleep(0.01)
+    run = Run(project="proj", client=client, name="run1", max_queue_size=2)
+    for i in range(10):
+        run.log({"x": i})
+        assert run._queue.qsize() <= 2
+    run.finish()
+    sent = [log for batch in client.batches() for log in batch]
+    assert len(sent) == 10
+
+
+def test_failed_batches_are_retried(monkeypatch):
+    monkeypatch.setattr("trackio.run.RETRY_INTERVAL", 0)
+    client = DummyClient()
+    client.predict.side_effect = [ConnectionError("unreachable"), None]
+    run = Run(project="proj", client=client, name="run1")
+    run.log({"x": 1})
+    run.finish()
+    batches = client.batches()
+    assert len(batches) == 2
+    assert batches[-1][0]["metrics"] == {"x": 1}
+
+
+def test_finish_raises_when_metrics_are_dropped(monkeypatch):
+    monkeypatch.setattr("trackio.run.RETRY_INTERVAL", 0)
+    client = DummyClient()
+    client.predict.side_effect = ConnectionError("unreachable")
+    run = Run(project="proj", client=client, name="run1")
+    run.log({"x": 1})
+    with pytest.raises(RuntimeError, match="failed to log 1 metrics"):
+        run.finish()
+    assert len(client.batches()) == trackio.run.SEND_RETRIES + 1
+
+
+def test_finish_does_not_retry_every_batch(monkeypatch):
+    monkeypatch.setattr("trackio.run.RETRY_INTERVAL", 0)
+    client = DummyClient()
+    run = Run(project="proj", client=client, name="run1", batch_size=2)
+
+    def unreachable(**kwargs):
+        run._stop_event.wait(5)
+        raise ConnectionError("unreachable")
+
+    client.predict.side_effect = unreachable
+    for i in range(10):
+        run.log({"x": i})
+    with pytest.raises(RuntimeError, match="failed to log 10 metrics"):
+        run.finish()
+    # Only the first batch is retried; the others are dropped once it fails.
+    assert len(client.batches()) == trackio.run.SEND_RETRIES + 1
+
+
+def test_run_log_after_finish_raises():
+    run = Run(project="proj", client=DummyClient(), name="run1")
+    run.finish()
+    with pytest.raises(RuntimeError):
+        run.log({"x": 1})
+
+
+def test_local_run_writes_directly_to_storage(temp_db):
+    run = Run(project="proj", client=None, name="run1", config={"lr": 0.1})
+    run.log({"x": 1})
+    run.log({"x": 2})
+    run.finish()
+    metrics = SQLiteStorage.get_metrics("proj", "run1")
+    assert [m["x"] for m in metrics] == [1, 2]
+
+
+def test_log_with_explicit_step(temp_db):
+    run = init(project="proj", name="run1")
+    trackio.log({"x": 1})
+    trackio.log({"x": 2}, step=100)
+    trackio.log({"x": 3})
+    trackio.finish()
+    steps = [m["step"] for m in SQLiteStorage.get_metrics("proj", run.name)]
+    assert steps == [0, 100, 101]
+
+
+def test_local_logging_does_not_import_gradio(temp_db):
+    code = (
+        "import sys\n"
+        "import trackio\n"
+        "trackio.init(project='proj', name='run1')\n"
+        "trackio.log({'x': 1})\n"
+        "trackio.finish()\n"
+        "assert 'gradio' not in sys.modules, 'gradio was imported'\n"
+        "assert 'gradio_client' not in sys.modules, 'gradio_client was imported'\n"
+    )
+    env = {**os.environ, "HF_HOME": temp_db}
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
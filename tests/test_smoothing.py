@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trackio.smoothing import ema, rolling_mean, rolling_window, smooth
+
+
+def naive_ema(y, weight, x=None):
+    """The debiased EMA computed one value at a time."""
+    smoothed, numerator, denominator = [], 0.0, 0.0
+    for i, value in enumerate(y):
+        decay = weight if x is None or i == 0 else weight ** (x[i] - x[i - 1])
+        numerator = decay * numerator + (1 - decay) * value
+        denominator = decay * denominator + (1 - decay)
+        smoothed.append(numerator / denominator)
+    return np.array(smoothed)
+
+
+@pytest.fixture
+def noisy_series():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.integers(1, 4, 5_000)).astype(np.float64)
+    y = np.sin(x / 500) + rng.normal(0, 0.3, len(x))
+    return x, y
+
+
+@pytest.mark.parametrize("weight", [0.0, 0.3, 0.9, 0.999])
+def test_ema_matches_sequential_definition(noisy_series, weight):
+    x, y = noisy_series
+    smoothed, _ = ema(y, weight)
+    np.testing.assert_allclose(smoothed, naive_ema(y, weight), atol=1e-9)
+    assert smoothed[0] == pytest.approx(y[0])
+    smoothed, _ = ema(y, weight, x=x)
+    np.testing.assert_allclose(smoothed, naive_ema(y, weight, x), atol=1e-9)
+
+
+def test_time_weighted_ema_discounts_gaps():
+    y = np.array([0.0, 0.0, 0.0, 1.0])
+    contiguous, _ = ema(y, 0.9, x=np.array([0, 1, 2, 3]))
+    np.testing.assert_allclose(contiguous, ema(y, 0.9)[0])
+    after_gap, _ = ema(y, 0.9, x=np.array([0, 1, 2, 100]))
+    assert after_gap[-1] > 0.99
+
+
+def test_rolling_mean_is_trailing():
+    y = np.arange(20, dtype=np.float64) ** 2
+    smoothed, _ = rolling_mean(y, 5)
+    expected = pd.Series(y).rolling(5, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(smoothed, expected)
+    assert rolling_window(0.6) == 4
+    assert rolling_window(0.0) == 1
+
+
+@pytest.mark.parametrize("method", ["ema", "time_ema", "rolling"])
+def test_smoothing_can_be_extended(noisy_series, method):
+    x, y = noisy_series
+    full, _ = smooth(y, method, 0.95, x=x)
+    parts, state = [], None
+    for start, end in [(0, 1), (1, 3), (3, 1_000), (1_000, 1_000), (1_000, len(y))]:
+        part, state = smooth(y[start:end], method, 0.95, x=x[start:end], state=state)
+        parts.append(part)
+    np.testing.assert_allclose(np.concatenate(parts), full, atol=1e-9)
+
+
+def test_smoothing_rejects_invalid_parameters():
+    with pytest.raises(ValueError, match="weight"):
+        ema(np.ones(3), 1.0)
+    with pytest.raises(ValueError, match="Unknown smoothing method"):
+        smooth(np.ones(3), "median")
@@ -1,9 +1,12 @@
 import os
 import sqlite3
+import subprocess
+import sys
 import tempfile
 
 import pytest
 
+from trackio import sqlite_storage
 from trackio.sqlite_storage import SQLiteStorage
 
 
@@ -38,6 +41,44 @@ def test_log_and_get_metrics(temp_db):
     assert "timestamp" in results[0]
 
 
+def test_get_metrics_keeps_negative_steps(temp_db):
+    SQLiteStorage.bulk_log(
+        "proj1",
+        [
+            {"run": "run1", "step": step, "metrics": {"acc": step}}
+            for step in (-2, 0, 3)
+        ],
+    )
+    steps = [m["step"] for m in SQLiteStorage.get_metrics("proj1", "run1")]
+    assert sorted(steps) == [-2, 0, 3]
+    since = SQLiteStorage.get_metrics("proj1", "run1", since_step=-2)
+    assert sorted(m["step"] for m in since) == [0, 3]
+
+
+def test_failed_writes_give_their_steps_back(temp_db, monkeypatch):
+    insert_rows = SQLiteStorage._insert_rows
+    fail_next = [True]
+
+    def flaky_insert_rows(cursor, rows, ids=None):
+        if fail_next[0]:
+            fail_next[0] = False
+            raise sqlite3.OperationalError("database is locked")
+        insert_rows(cursor, rows, ids)
+
+    monkeypatch.setattr(SQLiteStorage, "_insert_rows", staticmethod(flaky_insert_rows))
+    logs = [{"run": "run1", "metrics": {"a": i}} for i in range(3)]
+    with pytest.raises(sqlite3.OperationalError):
+        SQLiteStorage.bulk_log("proj1", logs)
+    SQLiteStorage.bulk_log("proj1", logs)
+    storage = SQLiteStorage.get_storage("proj1", "run1")
+    fail_next[0] = True
+    with pytest.raises(sqlite3.OperationalError):
+        storage.log({"a": 3})
+    storage.log({"a": 3})
+    metrics = SQLiteStorage.get_metrics("proj1", "run1")
+    assert [(m["step"], m["a"]) for m in metrics] == [(i, i) for i in range(4)]
+
+
 def test_get_projects_and_runs(temp_db):
     storage = SQLiteStorage("proj1", "run1", {})
     storage.log({"a": 1})
@@ -47,3 +88,486 @@ def test_get_projects_and_runs(temp_db):
     assert {"proj1", "proj2"}.issubset(projects)
     runs = set(storage.get_runs("proj1"))
     assert "run1" in runs
+
+
+def test_bulk_log_multiple_runs(temp_db):
+    SQLiteStorage("proj1", "run1", {}).log({"a": 0})
+    SQLiteStorage.bulk_log(
+        "proj1",
+        [
+            {"run": "run1", "metrics": {"a": 1}},
+            {"run": "run2", "metrics": {"a": 2}, "step": 5},
+            {"run": "run1", "metrics": {"a": 3}, "timestamp": "2025-01-01T00:00:00"},
+            {"run": "run2", "metrics": {"a": 4}},
+        ],
+    )
+    run1 = sorted(SQLiteStorage.get_metrics("proj1", "run1"), key=lambda m: m["step"])
+    assert [(m["step"], m["a"]) for m in run1] == [(0, 0), (1, 1), (2, 3)]
+    assert run1[2]["timestamp"] == "2025-01-01T00:00:00"
+    run2 = SQLiteStorage.get_metrics("proj1", "run2")
+    assert [(m["step"], m["a"]) for m in run2] == [(5, 2), (6, 4)]
+
+
+def test_get_storage_reuses_writer_and_keeps_config(temp_db):
+    SQLiteStorage("proj1", "run1", {"lr": 0.1})
+    storage = SQLiteStorage.get_storage("proj1", "run1")
+    assert SQLiteStorage.get_storage("proj1", "run1") is storage
+    assert SQLiteStorage.get_storage("proj1", "run2") is not storage
+    storage.log({"a": 1})
+    with sqlite3.connect(storage.db_path) as conn:
+        row = conn.execute(
+            "SELECT config FROM configs WHERE project_name=? AND run_name=?",
+            ("proj1", "run1"),
+        ).fetchone()
+    assert row[0] == '{"lr": 0.1}'
+
+
+def test_scheduler_shared_per_dataset(temp_db, monkeypatch):
+    created = []
+
+    class FakeHubDatasetRepo:
+        def __init__(self, repo_id, token=None):
+            created.append(repo_id)
+
+    monkeypatch.setattr("trackio.sync.HubDatasetRepo", FakeHubDatasetRepo)
+    monkeypatch.setattr(sqlite_storage, "_schedulers", {})
+    for run in ["run1", "run2", "run1"]:
+        SQLiteStorage.get_storage("proj1", run, dataset_id="user/ds").log({"a": 1})
+    SQLiteStorage.bulk_log("proj1", [{"run": "run3", "metrics": {"a": 1}}], "user/ds")
+    assert created == ["user/ds"]
+    for scheduler in sqlite_storage._schedulers.values():
+        scheduler.stop()
+
+
+def test_connections_are_persistent_and_use_wal(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    conn = sqlite_storage.get_connection(storage.db_path)
+    assert sqlite_storage.get_connection(storage.db_path) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_set_durability(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    conn = sqlite_storage.get_connection(storage.db_path)
+    try:
+        sqlite_storage.set_durability("full")
+        sqlite_storage.get_connection(storage.db_path)
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+        sqlite_storage.set_durability("off")
+        sqlite_storage.get_connection(storage.db_path)
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+        sqlite_storage.set_durability("FULL")
+        sqlite_storage.get_connection(storage.db_path)
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+        with pytest.raises(ValueError):
+            sqlite_storage.set_durability("sometimes")
+    finally:
+        sqlite_storage.set_durability("normal")
+
+
+@pytest.mark.parametrize("durability, valid", [("FULL", True), ("fast", False)])
+def test_durability_from_environment(temp_db, durability, valid):
+    code = "import trackio.sqlite_storage as s; print(s._durability)"
+    env = {**os.environ, "HF_HOME": temp_db, "TRACKIO_DURABILITY": durability}
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True
+    )
+    if valid:
+        assert result.stdout.strip() == "full"
+    else:
+        assert "durability must be one of" in result.stderr
+
+
+def test_log_explicit_and_automatic_steps(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    storage.log({"a": 1})
+    storage.log({"a": 2}, step=10)
+    storage.log({"a": 3})
+    storage.log({"a": 4}, step=5)
+    storage.log({"a": 5})
+    steps = [m["step"] for m in SQLiteStorage.get_metrics("proj1", "run1")]
+    assert steps == [0, 10, 11, 5, 12]
+
+
+def test_step_counter_seeded_on_resume(temp_db):
+    SQLiteStorage.get_storage("proj1", "run1").log({"a": 1}, step=41)
+    SQLiteStorage.clear_storages()
+    SQLiteStorage.get_storage("proj1", "run1").log({"a": 2})
+    steps = [m["step"] for m in SQLiteStorage.get_metrics("proj1", "run1")]
+    assert steps == [41, 42]
+
+
+def test_runs_table_tracks_inserts(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    storage.log({"a": 1})
+    storage.log({"a": 2}, step=7)
+    SQLiteStorage.bulk_log("proj1", [{"run": "run2", "metrics": {"a": 1}}] * 3)
+    assert SQLiteStorage.get_runs("proj1") == ["run1", "run2"]
+    assert SQLiteStorage.get_last_steps("proj1", ["run1", "run2", "run3"]) == {
+        "run1": 7,
+        "run2": 2,
+        "run3": 0,
+    }
+    storage.finish()
+    with sqlite3.connect(storage.db_path) as conn:
+        rows = conn.execute(
+            "SELECT run_name, row_count, status FROM runs ORDER BY id"
+        ).fetchall()
+    assert rows == [("run1", 2, "finished"), ("run2", 3, "running")]
+
+
+def test_old_database_is_upgraded(temp_db):
+    db_path = os.path.join(temp_db, "proj1.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                project_name TEXT NOT NULL,
+                run_name TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                metrics TEXT NOT NULL
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO metrics (timestamp, project_name, run_name, step, metrics) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("2025-01-01T00:00:00", "proj1", "old-run", 0, '{"a": 1}'),
+                ("2025-01-01T00:00:01", "proj1", "old-run", 1, '{"a": 2}'),
+            ],
+        )
+    conn.close()
+
+    assert SQLiteStorage.get_runs("proj1") == ["old-run"]
+    assert SQLiteStorage.get_last_steps("proj1", ["old-run"]) == {"old-run": 1}
+    SQLiteStorage.get_storage("proj1", "old-run").log({"a": 3})
+    assert [m["step"] for m in SQLiteStorage.get_metrics("proj1", "old-run")] == [
+        0,
+        1,
+        2,
+    ]
+    with sqlite3.connect(db_path) as conn:
+        indexes = [
+            row[0]
+            for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        ]
+    assert "idx_metrics_project_run_step" in indexes
+    assert SQLiteStorage.get_metric_types("proj1") == {"a": "number"}
+    assert SQLiteStorage.get_metric_stats("proj1", ["old-run"]) == {
+        "old-run": {"a": (3, 2)}
+    }
+    assert SQLiteStorage.get_metric_values("proj1", "old-run", "a") == [
+        (0, 1.0),
+        (1, 2.0),
+        (2, 3.0),
+    ]
+
+
+def test_metric_values_and_summary(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    storage.log({"loss": 3.0, "acc": 0.1, "phase": "warmup", "done": False})
+    storage.log({"loss": 1.0, "acc": 0.5})
+    storage.log({"loss": 2.0, "acc": float("nan")})
+    SQLiteStorage("proj1", "run2", {}).log({"val/loss": 4})
+
+    assert SQLiteStorage.get_metric_names("proj1", ["run1"]) == ["acc", "loss"]
+    assert SQLiteStorage.get_metric_names("proj1") == ["acc", "loss", "val/loss"]
+    assert SQLiteStorage.get_metric_values("proj1", "run1", "loss") == [
+        (0, 3.0),
+        (1, 1.0),
+        (2, 2.0),
+    ]
+    summary = SQLiteStorage.get_metric_summary("proj1", "run1")
+    assert summary["loss"] == {"count": 3, "min": 1.0, "max": 3.0, "last": 2.0}
+    assert summary["acc"] == {"count": 2, "min": 0.1, "max": 0.5, "last": None}
+    assert SQLiteStorage.get_metric_summary("proj1", "run1", ["loss"]).keys() == {
+        "loss"
+    }
+    assert SQLiteStorage.get_metrics("proj1", "run1")[0]["phase"] == "warmup"
+
+
+def test_incremental_reads(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    for i in range(3):
+        storage.log({"a": i})
+    assert [m["a"] for m in SQLiteStorage.get_metrics("proj1", "run1", 0)] == [1, 2]
+    storage.log({"a": 3})
+    assert [m["a"] for m in SQLiteStorage.get_metrics("proj1", "run1", 2)] == [3]
+
+
+def test_get_metrics_frame(temp_db):
+    run1 = SQLiteStorage("proj1", "run1", {})
+    run1.log({"loss": 1.0, "note": "start"})
+    run1.log({"loss": float("nan"), "acc": 0.5})
+    run1.log({"loss": 0.25, "acc": 0.75})
+    SQLiteStorage("proj1", "run2", {}).log({"acc": 0.1})
+
+    df = SQLiteStorage.get_metrics_frame("proj1", ["run2", "run1", "missing"])
+    assert list(df.columns) == ["run", "step", "timestamp", "loss", "acc"]
+    assert df["run"].tolist() == ["run2", "run1", "run1", "run1"]
+    assert df["step"].tolist() == [0, 0, 1, 2]
+    assert df["timestamp"].notna().all()
+    assert df["loss"].fillna(-1).tolist() == [-1, 1.0, -1, 0.25]
+
+    df = SQLiteStorage.get_metrics_frame(
+        "proj1", ["run1", "run2"], metrics=["acc"], step_range=(1, None)
+    )
+    assert list(df.columns) == ["run", "step", "acc"]
+    assert df[["run", "step", "acc"]].values.tolist() == [
+        ["run1", 1, 0.5],
+        ["run1", 2, 0.75],
+    ]
+    df = SQLiteStorage.get_metrics_frame("proj1", ["run1"], metrics=["timestamp"])
+    assert list(df.columns) == ["run", "step", "timestamp"] and len(df) == 3
+    assert SQLiteStorage.get_metrics_frame("proj1", ["run1"], ["missing"]).empty
+    assert SQLiteStorage.get_metrics_frame("proj2", ["run1"]).empty
+
+    # Metrics not logged at every step are aligned on the steps of the run.
+    run3 = SQLiteStorage("proj1", "run3", {})
+    run3.log({"loss": 2.0}, step=0)
+    run3.log({"loss": 1.0, "eval": 0.5}, step=5)
+    run3.log({"loss": 0.5}, step=6)
+    df = SQLiteStorage.get_metrics_frame("proj1", ["run3"], ["eval", "loss"])
+    assert list(df.columns) == ["run", "step", "eval", "loss"]
+    assert df["step"].tolist() == [0, 5, 6]
+    assert df["eval"].fillna(-1).tolist() == [-1, 0.5, -1]
+
+
+def test_project_version_changes_on_write(temp_db):
+    assert SQLiteStorage.get_project_version("proj1") is None
+    storage = SQLiteStorage("proj1", "run1", {})
+    version = SQLiteStorage.get_project_version("proj1")
+    assert SQLiteStorage.get_project_version("proj1") == version
+    storage.log({"a": 1})
+    assert SQLiteStorage.get_project_version("proj1") != version
+
+
+def test_metric_key_catalog(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    storage.log({"loss": 1, "phase": "warmup", "done": False, "hist": [1, 2]})
+    storage.log({"loss": 0.5, "phase": 2})
+    SQLiteStorage("proj1", "run2", {}).log({"val/loss": 4, "phase": "eval"})
+
+    assert SQLiteStorage.get_metric_types("proj1", ["run1"]) == {
+        "loss": "number",
+        "phase": "mixed",
+        "done": "bool",
+        "hist": "object",
+    }
+    assert SQLiteStorage.get_metric_types("proj1", ["run2"]) == {
+        "val/loss": "number",
+        "phase": "string",
+    }
+    assert SQLiteStorage.get_metric_types("proj1", []) == {}
+    assert SQLiteStorage.get_metric_names("proj1") == ["loss", "val/loss"]
+    assert SQLiteStorage.get_metric_stats("proj1", ["run1"]) == {
+        "run1": {"loss": (2, 1), "phase": (2, 1), "done": (1, 0), "hist": (1, 0)}
+    }
+    storage.log({"loss": 0.25}, step=10)
+    assert SQLiteStorage.get_metric_stats("proj1", ["run1", "run2"]) == {
+        "run1": {"loss": (3, 10), "phase": (2, 1), "done": (1, 0), "hist": (1, 0)},
+        "run2": {"val/loss": (1, 0), "phase": (1, 0)},
+    }
+
+
+def test_rollups_maintained_on_insert(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    for step in range(250):
+        storage.log({"loss": float(step % 17)})
+    SQLiteStorage.bulk_log(
+        "proj1",
+        [
+            {"run": "run1", "metrics": {"loss": 100.0}, "step": 250 + i}
+            for i in range(5)
+        ],
+    )
+
+    rollups = SQLiteStorage.get_metric_rollups("proj1", "run1", "loss", 100)
+    assert [r[0] for r in rollups] == [0, 100, 200]
+    assert rollups[2][1:4] == (55, 0.0, 100.0)
+    assert rollups[2][5] == 100.0
+    values = [float(step % 17) for step in range(100)]
+    assert rollups[0][4] == pytest.approx(sum(values) / 100)
+
+    in_range = SQLiteStorage.get_metric_rollups(
+        "proj1", "run1", "loss", 10, step_range=(95, 124)
+    )
+    assert [r[0] for r in in_range] == [90, 100, 110, 120]
+
+    incremental = {
+        level: SQLiteStorage.get_metric_rollups("proj1", "run1", "loss", level)
+        for level in sqlite_storage.ROLLUP_LEVELS
+    }
+    SQLiteStorage.rebuild_rollups("proj1")
+    for level, expected in incremental.items():
+        rebuilt = SQLiteStorage.get_metric_rollups("proj1", "run1", "loss", level)
+        assert rebuilt == pytest.approx(expected)
+
+
+def test_rollups_follow_replaced_values(temp_db):
+    storage = SQLiteStorage("proj1", "run1", {})
+    storage.log({"acc": 100.0}, step=5)
+    storage.log({"acc": 1.0}, step=5)
+    summary = SQLiteStorage.get_run_summaries("proj1", ["run1"])["run1"]
+    assert summary["metrics"]["acc"] == {
+        "count": 1,
+        "min": 1.0,
+        "max": 1.0,
+        "last": 1.0,
+    }
+
+    for step in range(-20, 300, 7):
+        storage.log({"acc": float(step)}, step=step)
+    SQLiteStorage.bulk_log(
+        "proj1",
+        [
+            {"run": "run1", "metrics": {"acc": value}, "step": step}
+            for step, value in [(-6, 50.0), (50, -1.0), (50, float("nan")), (999, 2.0)]
+        ],
+    )
+    incremental = {
+        level: SQLiteStorage.get_metric_rollups("proj1", "run1", "acc", level)
+        for level in sqlite_storage.ROLLUP_LEVELS
+    }
+    SQLiteStorage.rebuild_rollups("proj1")
+    for level, expected in incremental.items():
+        rebuilt = SQLiteStorage.get_metric_rollups("proj1", "run1", "acc", level)
+        assert rebuilt == pytest.approx(expected)
+
+
+def test_choose_rollup_level():
+    assert SQLiteStorage.choose_rollup_level(5_000, 1000) is None
+    assert SQLiteStorage.choose_rollup_level(10_000, 1000) == 10
+    assert SQLiteStorage.choose_rollup_level(250_000, 1000) == 100
+    assert SQLiteStorage.choose_rollup_level(10_000_000, 1000) == 1000
+
+
+def test_search_runs(temp_db):
+    for i in range(12):
+        storage = SQLiteStorage(
+            "proj1", f"sweep-{i:02d}_a", {"lr": 0.1 * (i % 3), "opt": "adam"}
+        )
+        storage.log({"loss": float(12 - i)} if i != 4 else {"acc": 1.0})
+    SQLiteStorage(
+        "proj1", "other", {"opt": "sgd", "tags": [1, "a"], "model": {"depth": 2}}
+    ).log({"acc": 1.0})
+
+    assert SQLiteStorage.search_runs("proj1", limit=2) == (
+        ["sweep-00_a", "sweep-01_a"],
+        13,
+    )
+    assert SQLiteStorage.search_runs("proj1", "SWEEP-1", limit=1, offset=1) == (
+        ["sweep-11_a"],
+        2,
+    )
+    # LIKE wildcards in the query are matched literally.
+    assert SQLiteStorage.search_runs("proj1", "%")[1] == 0
+    assert SQLiteStorage.search_runs("proj1", "_a")[1] == 12
+    assert SQLiteStorage.search_runs(
+        "proj1", r"^sweep-0[0-2]", regex=True, sort="name", descending=True
+    ) == (["sweep-02_a", "sweep-01_a", "sweep-00_a"], 3)
+    with pytest.raises(ValueError, match="Invalid regular expression"):
+        SQLiteStorage.search_runs("proj1", "(", regex=True)
+
+    assert SQLiteStorage.search_runs("proj1", config_filters={"opt": "sgd"}) == (
+        ["other"],
+        1,
+    )
+    assert SQLiteStorage.search_runs(
+        "proj1", config_filters={"lr": 0.2, "opt": "adam"}
+    ) == (["sweep-02_a", "sweep-05_a", "sweep-08_a", "sweep-11_a"], 4)
+    assert SQLiteStorage.search_runs(
+        "proj1", config_filters={"tags": [1, "a"], "model": {"depth": 2}}
+    ) == (["other"], 1)
+    assert SQLiteStorage.search_runs("proj1", config_filters={"tags": [1]})[1] == 0
+
+    # Runs without the metric are listed last, whatever the order.
+    by_loss = SQLiteStorage.search_runs("proj1", "sweep", sort="metric:loss")[0]
+    assert by_loss[:2] == ["sweep-11_a", "sweep-10_a"]
+    assert by_loss[-1] == "sweep-04_a"
+    by_loss = SQLiteStorage.search_runs(
+        "proj1", "sweep", sort="metric:loss", descending=True
+    )[0]
+    assert by_loss[:2] == ["sweep-00_a", "sweep-01_a"]
+    assert by_loss[-1] == "sweep-04_a"
+    with pytest.raises(ValueError, match="Unknown sort"):
+        SQLiteStorage.search_runs("proj1", sort="size")
+
+
+def test_get_run_summaries(temp_db):
+    logs = [
+        {"run": "long", "step": step, "metrics": {"loss": float((step * 7) % 2500)}}
+        for step in range(2500)
+    ]
+    SQLiteStorage.bulk_log("proj1", logs)
+    SQLiteStorage("proj1", "long", {"lr": 0.1})
+    short = SQLiteStorage("proj1", "short", {"lr": 0.01})
+    short.log({"loss": 3.0, "acc": 0.5})
+    short.log({"loss": 2.0, "acc": 0.75})
+    short.finish()
+
+    summaries = SQLiteStorage.get_run_summaries("proj1", ["long", "short", "none"])
+    assert set(summaries) == {"long", "short"}
+    assert summaries["long"]["config"] == {"lr": 0.1}
+    assert summaries["long"]["last_step"] == 2499
+    assert summaries["long"]["metrics"] == {
+        "loss": {"count": 2500, "min": 0.0, "max": 2499.0, "last": 2499 * 7 % 2500}
+    }
+    assert summaries["short"]["status"] == "finished"
+    assert summaries["short"]["metrics"]["acc"] == {
+        "count": 2,
+        "min": 0.5,
+        "max": 0.75,
+        "last": 0.75,
+    }
+    only_acc = SQLiteStorage.get_run_summaries("proj1", ["short"], metrics=["acc"])
+    assert list(only_acc["short"]["metrics"]) == ["acc"]
+    assert (
+        SQLiteStorage.get_run_summaries("proj1", ["short"], [])["short"]["metrics"]
+        == {}
+    )
+
+    assert SQLiteStorage.search_runs("proj1", sort="min:acc")[0] == ["short", "long"]
+    assert SQLiteStorage.search_runs("proj1", sort="max:loss", descending=True)[0] == [
+        "long",
+        "short",
+    ]
+    assert SQLiteStorage.search_runs("proj1", sort="config:lr")[0] == [
+        "short",
+        "long",
+    ]
+
+
+def test_project_catalog_only_reindexes_changed_databases(temp_db, monkeypatch):
+    SQLiteStorage.bulk_log(
+        "proj1", [{"run": f"run{i}", "metrics": {"a": 1}} for i in range(3)]
+    )
+    SQLiteStorage("proj2", "run1", {}).log({"a": 1})
+
+    indexed = []
+    index_database = SQLiteStorage._index_database
+
+    def spy(cursor, db_file, version):
+        indexed.append(db_file)
+        index_database(cursor, db_file, version)
+
+    monkeypatch.setattr(SQLiteStorage, "_index_database", staticmethod(spy))
+    catalog = SQLiteStorage.get_project_catalog()
+    assert [(p["name"], p["run_count"]) for p in catalog] == [
+        ("proj1", 3),
+        ("proj2", 1),
+    ]
+    assert catalog[0]["db_path"] == os.path.join(temp_db, "proj1.db")
+    assert catalog[0]["size"] > 0 and catalog[0]["last_updated"]
+    assert sorted(indexed) == ["proj1.db", "proj2.db"]
+
+    indexed.clear()
+    assert SQLiteStorage.get_projects() == ["proj1", "proj2"]
+    assert indexed == []
+
+    SQLiteStorage("proj1", "run3", {}).log({"a": 1})
+    assert SQLiteStorage.get_project_catalog()[0]["run_count"] == 4
+    assert indexed == ["proj1.db"]
+
+    os.remove(os.path.join(temp_db, "proj2.db"))
+    assert SQLiteStorage.get_projects() == ["proj1"]
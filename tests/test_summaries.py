@@ -0,0 +1,52 @@
+import tempfile
+
+import pytest
+
+import trackio
+from trackio.sqlite_storage import SQLiteStorage
+
+
+@pytest.fixture
+def temp_db(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", tmpdir)
+        yield tmpdir
+
+
+def test_summary_has_one_row_per_run(temp_db, monkeypatch):
+    for i, lr in enumerate([0.1, 0.01, 0.001]):
+        storage = SQLiteStorage("proj", f"run{i}", {"lr": lr, "step": "ignored"})
+        for loss in [3.0, 1.0 + i, 2.0]:
+            storage.log({"loss": loss, "acc": 1 / loss})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the history of a metric was read")
+
+    monkeypatch.setattr(SQLiteStorage, "get_metrics", fail)
+    monkeypatch.setattr(SQLiteStorage, "get_metrics_frame", fail)
+    df = trackio.summary("proj", metrics=["loss"], sort="min:loss", limit=2)
+    assert df.columns.tolist() == [
+        "run",
+        "status",
+        "step",
+        "lr",
+        "last(loss)",
+        "min(loss)",
+        "max(loss)",
+    ]
+    assert df["run"].tolist() == ["run0", "run1"]
+    assert df["min(loss)"].tolist() == [1.0, 2.0]
+    assert df["last(loss)"].tolist() == [2.0, 2.0]
+    assert df["step"].tolist() == [2, 2]
+
+    df = trackio.summary("proj", config_filters={"lr": 0.001}, offset=0)
+    assert df["run"].tolist() == ["run2"]
+    assert sorted(df.columns) == sorted(
+        ["run", "status", "step", "lr"]
+        + [f"{stat}({m})" for m in ["acc", "loss"] for stat in ["last", "min", "max"]]
+    )
+
+    token = trackio.current_project.set(None)
+    with pytest.raises(ValueError, match="Pass a project"):
+        trackio.summary()
+    trackio.current_project.reset(token)
@@ -0,0 +1,324 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from trackio import sync
+from trackio.sqlite_storage import SQLiteStorage, set_hydrator
+from trackio.sync import LocalRepo, SyncScheduler, restore_database, start_hydration
+
+
+@pytest.fixture
+def temp_db(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", tmpdir)
+        yield tmpdir
+
+
+@pytest.fixture
+def repo_dir():
+    with tempfile.TemporaryDirectory() as repo_dir:
+        yield repo_dir
+
+
+@pytest.fixture
+def scheduler(temp_db, repo_dir):
+    scheduler = SyncScheduler(temp_db, LocalRepo(repo_dir), every=60)
+    yield scheduler
+    scheduler.stop()
+
+
+def read_manifest(repo_dir: str, name: str) -> dict:
+    with open(os.path.join(repo_dir, name, "manifest.json")) as f:
+        return json.load(f)
+
+
+def test_only_new_rows_are_uploaded(temp_db, repo_dir, scheduler):
+    storage = SQLiteStorage("proj1", "run1", {"lr": 0.1})
+    storage.log({"loss": 1.0})
+    storage.log({"loss": 0.5})
+    SQLiteStorage("proj2", "run1", {}).log({"loss": 1.0})
+    assert scheduler.sync() == ["proj1.db", "proj2.db"]
+    assert scheduler.sync() == []
+
+    storage.log({"loss": 0.25})
+    assert scheduler.sync() == ["proj1.db"]
+    manifest = read_manifest(repo_dir, "proj1.db")
+    assert manifest["last_id"] == 3
+    assert [(s["first_id"], s["last_id"]) for s in manifest["segments"]] == [
+        (1, 2),
+        (3, 3),
+    ]
+    assert manifest["runs"][0]["config"] == {"lr": 0.1}
+
+    # Runs changing state are synced without new rows.
+    storage.finish()
+    assert scheduler.sync() == ["proj1.db"]
+    assert read_manifest(repo_dir, "proj1.db")["runs"][0]["status"] == "finished"
+
+    # A new scheduler resumes from the high-water mark in the manifest.
+    storage.log({"loss": 0.125})
+    resumed = SyncScheduler(temp_db, LocalRepo(repo_dir), every=60)
+    try:
+        assert resumed.sync() == ["proj1.db"]
+        segments = read_manifest(repo_dir, "proj1.db")["segments"]
+        assert [s["rows"] for s in segments] == [2, 1, 1]
+        assert len(read_manifest(repo_dir, "proj2.db")["segments"]) == 1
+    finally:
+        resumed.stop()
+
+
+def test_small_segments_are_compacted(temp_db, repo_dir, scheduler, monkeypatch):
+    monkeypatch.setattr(sync, "SEGMENT_ROWS", 4)
+    monkeypatch.setattr(sync, "COMPACTION_SEGMENTS", 3)
+    upload = scheduler.repo.upload
+
+    def checked_upload(files, delete=()):
+        assert not set(files).intersection(delete)
+        upload(files, delete)
+
+    monkeypatch.setattr(scheduler.repo, "upload", checked_upload)
+    storage = SQLiteStorage("proj", "run1", {})
+    for i in range(7):
+        storage.log({"loss": float(i)})
+        scheduler.sync()
+
+    segments = read_manifest(repo_dir, "proj.db")["segments"]
+    # Every third small segment triggers a compaction.
+    assert [(s["first_id"], s["last_id"]) for s in segments] == [(1, 4), (5, 7)]
+    files = os.listdir(os.path.join(repo_dir, "proj.db", "segments"))
+    assert sorted(files) == sorted(os.path.basename(s["path"]) for s in segments)
+
+
+def test_restore_rebuilds_the_database(temp_db, repo_dir, scheduler):
+    storage = SQLiteStorage("proj", "run1", {"lr": 0.1})
+    storage.log({"loss": 1.0, "note": "a"})
+    scheduler.sync()
+    storage.log({"loss": 0.5}, step=10)
+    storage.finish()
+    SQLiteStorage("proj", "run2", {}).log({"acc": 1.0})
+    scheduler.sync()
+
+    with tempfile.TemporaryDirectory() as restore_dir:
+        db_path = os.path.join(restore_dir, "proj.db")
+        assert restore_database(LocalRepo(repo_dir), "proj.db", db_path) == 3
+        assert restore_database(LocalRepo(repo_dir), "proj.db", db_path) == 0
+        original = SQLiteStorage.export_runs(storage.db_path)
+        assert SQLiteStorage.export_runs(db_path) == original
+        assert list(SQLiteStorage.export_rows(db_path)) == list(
+            SQLiteStorage.export_rows(storage.db_path)
+        )
+
+        segment = read_manifest(repo_dir, "proj.db")["segments"][0]
+        with open(os.path.join(repo_dir, segment["path"]), "ab") as f:
+            f.write(b"corrupted")
+        with pytest.raises(ValueError, match="checksum"):
+            restore_database(LocalRepo(repo_dir), "proj.db", db_path)
+
+
+def test_writes_are_not_blocked_during_upload(temp_db, repo_dir):
+    uploading = threading.Event()
+
+    class SlowRepo(LocalRepo):
+        def upload(self, files, delete=()):
+            uploading.set()
+            time.sleep(1.0)
+            super().upload(files, delete)
+
+    scheduler = SyncScheduler(temp_db, SlowRepo(repo_dir), every=60)
+    try:
+        storage = SQLiteStorage("proj", "run1", {})
+        storage.log({"loss": 0.0})
+        syncing = threading.Thread(target=scheduler.sync)
+        syncing.start()
+        assert uploading.wait(5)
+        latencies = []
+        while syncing.is_alive():
+            start = time.perf_counter()
+            storage.log({"loss": 1.0})
+            latencies.append(time.perf_counter() - start)
+        syncing.join()
+    finally:
+        scheduler.stop()
+    assert len(latencies) > 10
+    assert max(latencies) < 0.5
+    # The upload only has the rows logged before it started.
+    assert read_manifest(repo_dir, "proj.db")["last_id"] == 1
+
+
+@pytest.fixture
+def restored_dir(monkeypatch):
+    with tempfile.TemporaryDirectory() as restored_dir:
+        yield restored_dir
+        set_hydrator(None)
+
+
+def test_projects_are_hydrated_on_first_use(
+    temp_db, repo_dir, scheduler, restored_dir, monkeypatch
+):
+    monkeypatch.setattr(sync, "SEGMENT_ROWS", 2)
+    for project in ["proj1", "proj2"]:
+        storage = SQLiteStorage(project, "run1", {"lr": 0.1})
+        for i in range(9):
+            storage.log({"loss": float(i)})
+    SQLiteStorage("proj2", "run2", {}).log({"acc": 1.0})
+    scheduler.sync()
+
+    listed = threading.Event()
+    lock = threading.Lock()
+    active, max_active = [0], [0]
+
+    class StandInRepo(LocalRepo):
+        def list_databases(self):
+            assert listed.wait(5)
+            return super().list_databases()
+
+        def read(self, path_in_repo):
+            with lock:
+                active[0] += 1
+                max_active[0] = max(max_active[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return super().read(path_in_repo)
+
+    monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", restored_dir)
+    hydrator = start_hydration(StandInRepo(repo_dir), restored_dir)
+    # The dashboard doesn't wait for projects to be restored...
+    assert SQLiteStorage.get_projects() == []
+    # ...but reading a project waits until it is.
+    assert SQLiteStorage.get_runs("proj2") == ["run1", "run2"]
+    assert SQLiteStorage.get_metrics("proj2", "run1")[-1]["loss"] == 8.0
+    assert not os.path.exists(os.path.join(restored_dir, "proj1.db"))
+    assert max_active[0] > 1
+
+    listed.set()
+    hydrator._thread.join(5)
+    assert hydrator.get_projects() == ["proj1", "proj2"]
+    assert sorted(SQLiteStorage.get_projects()) == ["proj1", "proj2"]
+    assert SQLiteStorage.get_run_summaries("proj1", ["run1"])["run1"]["config"] == {
+        "lr": 0.1
+    }
+    # Logging continues after the restored rows, and syncs as usual.
+    SQLiteStorage("proj1", "run1").log({"loss": 9.0})
+    assert SQLiteStorage.get_last_steps("proj1", ["run1"]) == {"run1": 9}
+    resumed = SyncScheduler(restored_dir, LocalRepo(repo_dir), every=60)
+    try:
+        assert resumed.sync() == ["proj1.db"]
+    finally:
+        resumed.stop()
+    assert read_manifest(repo_dir, "proj1.db")["last_id"] == 10
+
+
+def test_corrupted_projects_are_not_hydrated(
+    temp_db, repo_dir, scheduler, restored_dir, monkeypatch
+):
+    SQLiteStorage("proj", "run1", {}).log({"loss": 1.0})
+    scheduler.sync()
+    segment = read_manifest(repo_dir, "proj.db")["segments"][0]
+    with open(os.path.join(repo_dir, segment["path"]), "ab") as f:
+        f.write(b"corrupted")
+
+    monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", restored_dir)
+    start_hydration(LocalRepo(repo_dir), restored_dir)
+    assert SQLiteStorage.get_runs("proj") == []
+    assert not os.path.exists(os.path.join(restored_dir, "proj.db.partial"))
+
+
+def test_failed_restores_are_retried(
+    temp_db, repo_dir, scheduler, restored_dir, monkeypatch
+):
+    storage = SQLiteStorage("proj", "run1", {})
+    for i in range(3):
+        storage.log({"loss": float(i)})
+    scheduler.sync()
+
+    class FlakyRepo(LocalRepo):
+        available = False
+
+        def read(self, path_in_repo):
+            if not self.available and not path_in_repo.endswith("manifest.json"):
+                raise ConnectionError("The Hub is unavailable")
+            return super().read(path_in_repo)
+
+    repo = FlakyRepo(repo_dir)
+    monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", restored_dir)
+    hydrator = start_hydration(repo, restored_dir)
+    hydrator._thread.join(5)
+
+    # Rows logged meanwhile get ids after the synced ones...
+    SQLiteStorage("proj", "run2", {}).log({"loss": 5.0})
+    writer = SQLiteStorage.get_storage("proj", "run1")
+    db_path = os.path.join(restored_dir, "proj.db")
+    assert SQLiteStorage.get_last_row_id(db_path) == 4
+    # ...and the restore isn't tried again until the backoff has passed.
+    repo.available = True
+    assert SQLiteStorage.get_runs("proj") == ["run2"]
+
+    monotonic = time.monotonic
+    monkeypatch.setattr(sync.time, "monotonic", lambda: monotonic() + 3600)
+    assert sorted(SQLiteStorage.get_runs("proj")) == ["run1", "run2"]
+    # Writers created meanwhile carry on after the restored steps.
+    writer.log({"loss": 3.0})
+    metrics = SQLiteStorage.get_metrics("proj", "run1")
+    assert [(m["step"], m["loss"]) for m in metrics] == [
+        (i, float(i)) for i in range(4)
+    ]
+
+    restored_scheduler = SyncScheduler(restored_dir, repo, every=60)
+    try:
+        assert restored_scheduler.sync() == ["proj.db"]
+    finally:
+        restored_scheduler.stop()
+    assert read_manifest(repo_dir, "proj.db")["last_id"] == 5
+
+
+def test_writers_can_be_created_while_a_restore_is_in_flight(
+    temp_db, repo_dir, scheduler, restored_dir, monkeypatch
+):
+    storage = SQLiteStorage("proj", "run1", {})
+    for i in range(3):
+        storage.log({"loss": float(i)})
+    scheduler.sync()
+
+    reading, release = threading.Event(), threading.Event()
+
+    class SlowRepo(LocalRepo):
+        def read(self, path_in_repo):
+            if not path_in_repo.endswith("manifest.json"):
+                reading.set()
+                assert release.wait(5)
+            return super().read(path_in_repo)
+
+    monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", restored_dir)
+    hydrator = start_hydration(SlowRepo(repo_dir), restored_dir)
+    assert reading.wait(5)
+
+    def log_in_background(project: str) -> threading.Thread:
+        thread = threading.Thread(
+            target=lambda: SQLiteStorage.get_storage(project, "run2").log({"x": 1}),
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    writer = log_in_background("proj")
+    # Writers of other projects don't wait for the restore...
+    other_writer = log_in_background("other")
+    other_writer.join(5)
+    assert not other_writer.is_alive()
+    assert writer.is_alive()
+    # ...and the writer of the project being restored logs once it is done.
+    release.set()
+    writer.join(5)
+    assert not writer.is_alive()
+    hydrator._thread.join(5)
+    assert sorted(SQLiteStorage.get_runs("proj")) == ["run1", "run2"]
+    assert [m["loss"] for m in SQLiteStorage.get_metrics("proj", "run1")] == [
+        0.0,
+        1.0,
+        2.0,
+    ]
@@ -0,0 +1,355 @@
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from trackio import ui
+from trackio.notifier import ChangeNotifier
+from trackio.sqlite_storage import SQLiteStorage
+from trackio.ui import ProjectStateCache, RunFrameCache
+
+
+@pytest.fixture
+def temp_db(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        monkeypatch.setattr("trackio.sqlite_storage.TRACKIO_DIR", tmpdir)
+        yield tmpdir
+    ui.frame_cache.clear()
+    ui.smoothing_cache.clear()
+
+
+def test_run_frame_cache_appends_new_rows(temp_db, monkeypatch):
+    storage = SQLiteStorage("proj", "run1", {})
+    storage.log({"loss": 1.0})
+    storage.log({"loss": 0.5})
+
+    reads = []
+    get_metrics_frame = SQLiteStorage.get_metrics_frame
+
+    def spy(project, runs, metrics=None, step_range=None):
+        reads.append((runs, step_range))
+        return get_metrics_frame(project, runs, metrics, step_range)
+
+    monkeypatch.setattr(SQLiteStorage, "get_metrics_frame", staticmethod(spy))
+    cache = RunFrameCache()
+    df, first_generation = cache.get("proj", "run1")
+    assert df["loss"].tolist() == [1.0, 0.5]
+    assert cache.get("proj", "run1")[0]["loss"].tolist() == [1.0, 0.5]
+    storage.log({"loss": 0.25})
+    df, generation = cache.get("proj", "run1")
+    assert df["step"].tolist() == [0, 1, 2] and generation == first_generation
+    assert reads == [(["run1"], None), (["run1"], (2, None))]
+
+    # A row logged at an earlier step makes the run be read again.
+    storage.log({"acc": 1.0}, step=1)
+    df, generation = cache.get("proj", "run1")
+    assert df["acc"].iloc[1] == 1.0
+    assert generation != first_generation and reads[-1] == (["run1"], None)
+
+
+def test_smoothing_is_redone_after_an_evicted_run_is_rewritten(temp_db, monkeypatch):
+    monkeypatch.setattr(ui, "frame_cache", RunFrameCache(max_runs=1))
+    storage = SQLiteStorage("proj", "run1", {})
+    for step in range(0, 10, 2):
+        storage.log({"loss": 10.0}, step=step)
+    SQLiteStorage("proj", "other", {}).log({"loss": 1.0})
+
+    ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+    storage.log({"loss": 0.0}, step=1)
+    ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+    ui.load_run_data("proj", "other", True, "step", "ema", 0.5)  # evicts run1
+    storage.log({"loss": 0.0}, step=3)
+    df = ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+
+    monkeypatch.setattr(ui, "smoothing_cache", ui.SmoothingCache())
+    expected = ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+    smoothed = df[df["data_type"] == "smoothed"]["loss"].tolist()
+    assert smoothed == expected[expected["data_type"] == "smoothed"]["loss"].tolist()
+    assert min(smoothed) < 10.0
+
+
+def test_run_frame_cache_reads_runs_together(temp_db, monkeypatch):
+    SQLiteStorage("proj", "run1", {}).log({"loss": 1.0})
+    SQLiteStorage("proj", "run2", {}).log({"acc": 0.5})
+
+    reads = []
+    get_metrics_frame = SQLiteStorage.get_metrics_frame
+
+    def spy(project, runs, metrics=None, step_range=None):
+        reads.append(runs)
+        return get_metrics_frame(project, runs, metrics, step_range)
+
+    monkeypatch.setattr(SQLiteStorage, "get_metrics_frame", staticmethod(spy))
+    frames = RunFrameCache().get_many("proj", ["run1", "run2", "missing"])
+    assert reads == [["run1", "run2", "missing"]]
+    assert list(frames["run1"][0].columns) == ["run", "step", "timestamp", "loss"]
+    assert list(frames["run2"][0].columns) == ["run", "step", "timestamp", "acc"]
+    assert frames["missing"][0].empty
+
+
+def test_run_frame_cache_is_bounded(temp_db):
+    for run in ["run1", "run2", "run3"]:
+        storage = SQLiteStorage("proj", run, {})
+        for i in range(10):
+            storage.log({"loss": i})
+
+    cache = RunFrameCache(max_runs=2)
+    for run in ["run1", "run2", "run3"]:
+        cache.get("proj", run)
+    assert list(cache._frames) == [("proj", "run2"), ("proj", "run3")]
+
+    cache = RunFrameCache(max_rows=15)
+    for run in ["run1", "run2", "run3"]:
+        cache.get("proj", run)
+    assert list(cache._frames) == [("proj", "run3")]
+
+
+def test_project_state_cache_only_queries_on_change(temp_db, monkeypatch):
+    storage = SQLiteStorage("proj", "run1", {})
+    storage.log({"loss": 1.0})
+
+    queries = []
+    get_runs = SQLiteStorage.get_runs
+
+    def spy(project):
+        queries.append(project)
+        return get_runs(project)
+
+    monkeypatch.setattr(SQLiteStorage, "get_runs", staticmethod(spy))
+    cache = ProjectStateCache()
+    assert cache.get("missing") == ([], {})
+    for _ in range(5):
+        assert cache.get("proj") == (["run1"], {"run1": 0})
+    assert len(queries) == 1
+
+    storage.log({"loss": 0.5})
+    SQLiteStorage("proj", "run2", {}).log({"loss": 2.0})
+    assert cache.get("proj") == (["run1", "run2"], {"run1": 1, "run2": 0})
+    assert len(queries) == 2
+
+
+def test_long_runs_are_plotted_from_rollups(temp_db, monkeypatch):
+    monkeypatch.setattr(ui, "PLOT_POINTS", 20)
+    SQLiteStorage.bulk_log(
+        "proj",
+        [{"run": "long", "metrics": {"loss": float(i % 7)}} for i in range(1000)]
+        + [{"run": "short", "metrics": {"loss": 1.0}} for _ in range(10)],
+    )
+    assert ui.get_rollup_levels("proj", ["long", "short"], "step") == {"long": 10}
+    assert ui.get_rollup_levels("proj", ["long"], "time") == {}
+    assert ui.get_rollup_levels("proj", ["long"], "step", x_lim=[0, 100]) == {}
+
+    SQLiteStorage.bulk_log(
+        "proj",
+        [
+            {"run": "late", "step": 1_000_000 + i, "metrics": {"loss": 1.0}}
+            for i in range(101)
+        ],
+    )
+    assert ui.get_rollup_levels("proj", ["late"], "step") == {}
+
+    df = ui.load_rollup_data("proj", "long", "loss", 10, smoothing=False)
+    assert len(df) == 200
+    assert df["loss"].min() == 0.0 and df["loss"].max() == 6.0
+    df = ui.load_rollup_data("proj", "long", "loss", 10, True, x_lim=[0, 99])
+    assert set(df["run"]) == {"long_original", "long_smoothed"}
+    assert len(df) == 30
+
+
+def test_smoothing_cache_only_smooths_new_values(temp_db, monkeypatch):
+    storage = SQLiteStorage("proj", "run1", {})
+    for i in range(10):
+        storage.log({"loss": float(i), "acc": 1.0} if i % 2 else {"loss": float(i)})
+
+    smoothed_lengths = []
+    smooth = ui.smooth
+
+    def spy(y, *args, **kwargs):
+        smoothed_lengths.append(len(y))
+        return smooth(y, *args, **kwargs)
+
+    monkeypatch.setattr(ui, "smooth", spy)
+    monkeypatch.setattr(ui, "smoothing_cache", ui.SmoothingCache())
+    df = ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+    smoothed = df[df["data_type"] == "smoothed"]
+    assert set(df["run"]) == {"run1_original", "run1_smoothed"}
+    assert smoothed["loss"].iloc[0] == 0.0
+    assert smoothed["loss"].iloc[1] == pytest.approx(2 / 3)
+    assert smoothed["acc"].isna().sum() == 5
+    assert sorted(smoothed_lengths) == [5, 10]
+
+    ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+    storage.log({"loss": 10.0})
+    df = ui.load_run_data("proj", "run1", True, "step", "ema", 0.5)
+    assert len(df) == 22
+    assert sorted(smoothed_lengths) == [0, 1, 5, 10]
+
+    ui.load_run_data("proj", "run1", True, "step", "rolling", 0.5)
+    assert sorted(smoothed_lengths) == [0, 1, 5, 5, 10, 11]
+
+
+def test_finish_endpoint_marks_run_finished(temp_db):
+    ui.log_batch("proj", [{"run": "run1", "metrics": {"loss": 0.5}}], None, None)
+    summaries = SQLiteStorage.get_run_summaries("proj", ["run1"])
+    assert summaries["run1"]["status"] == "running"
+    ui.finish_run("proj", "run1", None, None)
+    summaries = SQLiteStorage.get_run_summaries("proj", ["run1"])
+    assert summaries["run1"]["status"] == "finished"
+
+
+def test_watch_project_streams_new_versions(temp_db, monkeypatch):
+    monkeypatch.setattr(
+        ui, "notifier", ChangeNotifier(ui.project_state_cache.get, min_interval=0.01)
+    )
+    SQLiteStorage.bulk_log("proj", [{"run": "run1", "metrics": {"loss": 1.0}}])
+    request = SimpleNamespace(session_hash="session")
+
+    async def scenario():
+        stream = ui.watch_project("proj", ["run1"], True, request)
+        next_version = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        ui.log_batch("proj", [{"run": "run1", "metrics": {"loss": 0.5}}], None, None)
+        assert (await asyncio.wait_for(next_version, 5))[0] == "proj"
+
+        # A newer watch from the same session (e.g. after selecting other runs)
+        # supersedes the previous one.
+        newer = ui.watch_project("proj", [], True, request)
+        next_version = asyncio.ensure_future(anext(newer))
+        await asyncio.sleep(0.05)
+        SQLiteStorage.bulk_log("proj", [{"run": "run2", "metrics": {"loss": 1.0}}])
+        await asyncio.wait_for(next_version, 5)
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(anext(stream), 5)
+
+        ui.stop_watching(request)
+        assert [v async for v in ui.watch_project(None, [], True, request)] == []
+
+    asyncio.run(scenario())
+
+
+def test_only_plots_with_new_values_are_reloaded(temp_db):
+    SQLiteStorage.bulk_log(
+        "proj",
+        [
+            {"run": "run1", "metrics": {"loss": 1.0, "acc": 0.1, "phase": "a"}},
+            {"run": "run2", "metrics": {"loss": 2.0, "val/acc": 0.2}},
+        ],
+    )
+    runs = ["run1", "run2"]
+    metrics = ui.get_plot_metrics("proj", runs)
+    assert metrics == ["acc", "loss", "val/acc"]
+    assert ui.get_plot_metrics("proj", runs, ["loss"]) == ["loss"]
+
+    signatures = ui.get_plot_signatures("proj", runs, metrics)
+    SQLiteStorage.bulk_log("proj", [{"run": "run2", "metrics": {"loss": 1.5}}])
+    new_signatures = ui.get_plot_signatures("proj", runs, metrics)
+    assert [m for m in metrics if new_signatures[m] != signatures[m]] == ["loss"]
+
+    plots = ui.load_plot_data("proj", runs, ["loss"], False, "step")
+    df, y_lim = plots["loss"]
+    assert list(plots) == ["loss"]
+    assert sorted(df["loss"]) == [1.0, 1.5, 2.0]
+    assert y_lim == [1.0, 2.0]
+    assert "acc" not in df.columns
+
+
+def test_metric_groups_search_and_pages():
+    metrics = ["train/loss", "loss", "train/acc", "val/loss", "acc"]
+    assert ui.group_metrics_by_prefix(metrics) == {
+        "": ["acc", "loss"],
+        "train": ["train/acc", "train/loss"],
+        "val": ["val/loss"],
+    }
+    assert ui.filter_metrics(metrics, " LOSS") == ["train/loss", "loss", "val/loss"]
+    assert ui.filter_metrics(metrics, "") == metrics
+
+    layers = [f"layer_{i}/grad_norm" for i in range(25)]
+    assert ui.paginate(layers, 0, 10) == (layers[:10], 0, 3)
+    assert ui.paginate(layers, 2, 10) == (layers[20:], 2, 3)
+    assert ui.paginate(layers, 7, 10) == (layers[20:], 2, 3)
+    assert ui.paginate([], 0, 10) == ([], 0, 1)
+
+
+def test_run_list_is_paginated_and_keeps_the_selection(temp_db, monkeypatch):
+    monkeypatch.setattr(ui, "RUNS_PAGE_SIZE", 3)
+    SQLiteStorage.bulk_log(
+        "proj", [{"run": f"run{i}", "metrics": {"loss": 1.0}} for i in range(7)]
+    )
+    search = ("proj", "", False, "", "created", False)
+
+    run_cb, _, _, _, _, page, page_runs, selected, interacted = ui.update_runs(*search)
+    assert run_cb.choices == [("run0", "run0"), ("run1", "run1"), ("run2", "run2")]
+    assert page_runs == selected == ["run0", "run1", "run2"]
+    assert not interacted
+
+    selected, interacted = ui.select_runs(["run1"], page_runs, selected)
+    assert selected == ["run1"] and interacted
+    run_cb, label, page_md, _, next_btn, page, page_runs, selected, _ = ui.next_runs(
+        *search, page, selected, interacted
+    )
+    assert page == 1 and page_runs == ["run3", "run4", "run5"]
+    assert run_cb.value == [] and selected == ["run1"]
+    assert label.label == "Runs (7)"
+    assert page_md.value == "Page 2 of 3, 1 selected"
+    selected, _ = ui.select_runs(["run4"], page_runs, selected)
+    assert selected == ["run1", "run4"]
+
+    # Pages past the end show the last page.
+    _, _, _, _, next_btn, page, page_runs, _, _ = ui.update_runs(
+        *search, 9, selected, True
+    )
+    assert page == 2 and page_runs == ["run6"] and not next_btn.interactive
+
+    _, label, _, _, _, _, page_runs, selected, _ = ui.search_runs(
+        "proj", "run[56]", True, "", "created", True, selected, True
+    )
+    assert page_runs == ["run6", "run5"] and selected == ["run1", "run4"]
+    assert label.label == "Runs (2)"
+
+
+def test_parse_config_filters():
+    assert ui.parse_config_filters("lr=0.001, optimizer=adam,, flag=true") == {
+        "lr": 0.001,
+        "optimizer": "adam",
+        "flag": True,
+    }
+    assert ui.parse_config_filters(None) == {}
+
+
+def test_runs_table_is_sorted_and_paginated(temp_db, monkeypatch):
+    monkeypatch.setattr(ui, "RUNS_PAGE_SIZE", 2)
+    SQLiteStorage.bulk_log(
+        "proj",
+        [
+            {"run": f"run{i}", "metrics": {"loss": float(i % 3), "acc": 0.5}}
+            for i in range(5)
+        ],
+    )
+    search = ("proj", "", False, "", ["loss"], "metric:loss", False)
+
+    df, page_md, previous_btn, _, page = ui.update_summary(*search)
+    assert df["run"].tolist() == ["run0", "run3"]
+    assert df.columns.tolist()[-3:] == ["last(loss)", "min(loss)", "max(loss)"]
+    assert page_md.value == "Page 1 of 3, 5 runs"
+    assert not previous_btn.interactive
+
+    df, _, _, next_btn, page = ui.update_summary(*search, 7)
+    assert page == 2 and df["run"].tolist() == ["run2"]
+    assert not next_btn.interactive
+
+    sort_dd = ui.update_summary_sort_choices(["acc"], "metric:loss")
+    assert sort_dd.value == "created"
+    assert ("Min acc", "min:acc") in sort_dd.choices
+
+
+def test_projects_not_hydrated_yet_are_listed(temp_db, monkeypatch):
+    SQLiteStorage("local", "run1", {}).log({"loss": 1.0})
+    monkeypatch.setattr(
+        ui, "hydrator", SimpleNamespace(get_projects=lambda: ["remote", "local"])
+    )
+    request = SimpleNamespace(query_params={})
+    assert ui.get_projects(request).choices == [
+        ("local", "local"),
+        ("remote", "remote"),
+    ]
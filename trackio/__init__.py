@@ -4,14 +4,10 @@ import webbrowser
 from pathlib import Path
 
 import huggingface_hub
-from gradio_client import Client
-from httpx import ReadTimeout
 from huggingface_hub.errors import RepositoryNotFoundError
 
-from trackio.deploy import deploy_as_space
 from trackio.run import Run
-from trackio.sqlite_storage import SQLiteStorage
-from trackio.ui import demo
+from trackio.sqlite_storage import SQLiteStorage, set_durability
 from trackio.utils import TRACKIO_DIR, TRACKIO_LOGO_PATH, block_except_in_notebook
 
 __version__ = Path(__file__).parent.joinpath("version.txt").read_text().strip()
@@ -23,9 +19,6 @@ current_run: contextvars.ContextVar[Run | None] = contextvars.ContextVar(
 current_project: contextvars.ContextVar[str | None] = contextvars.ContextVar(
     "current_project", default=None
 )
-current_server: contextvars.ContextVar[str | None] = contextvars.ContextVar(
-    "current_server", default=None
-)
 
 config = {}
 SPACE_URL = "https://huggingface.co/spaces/{space_id}"
@@ -42,6 +35,7 @@ def init(
     dataset_id: str | None = None,
     config: dict | None = None,
     resume: str = "never",
+    durability: str | None = None,
 ) -> Run:
     """
     Creates a new Trackio project and returns a Run object.
@@ -49,21 +43,24 @@ def init(
     Args:
         project: The name of the project (can be an existing project to continue tracking or a new project to start tracking from scratch).
         name: The name of the run (if not provided, a default name will be generated).
-        space_id: If provided, the project will be logged to a Hugging Face Space instead of a local directory. Should be a complete Space name like "username/reponame". If the Space does not exist, it will be created. If the Space already exists, the project will be logged to it.
+        space_id: If provided, the project will be logged to a Hugging Face Space instead of a local directory. Otherwise, metrics are written directly to the local database without starting a server. Should be a complete Space name like "username/reponame". If the Space does not exist, it will be created. If the Space already exists, the project will be logged to it.
         dataset_id: If provided, a persistent Hugging Face Dataset will be created and the metrics will be synced to it every 5 minutes. Should be a complete Dataset name like "username/datasetname". If the Dataset does not exist, it will be created. If the Dataset already exists, the project will be appended to it.
         config: A dictionary of configuration options. Provided for compatibility with wandb.init()
         resume: Controls how to handle resuming a run. Can be one of:
             - "must": Must resume the run with the given name, raises error if run doesn't exist
             - "allow": Resume the run if it exists, otherwise create a new run
             - "never": Never resume a run, always create a new one
+        durability: How hard the local database works to make logged metrics survive a crash or power loss. Can be one of:
+            - "full": Sync every commit to disk (slowest)
+            - "normal": Sync at checkpoints; a power loss may drop the most recent metrics but never corrupts the database (default)
+            - "off": Leave syncing to the operating system (fastest)
+            Only applies when logging locally. Defaults to the TRACKIO_DURABILITY environment variable, or "normal".
     """
-    if not current_server.get() and space_id is None:
-        _, url, _ = demo.launch(
-            show_api=False, inline=False, quiet=True, prevent_thread_lock=True
-        )
-        current_server.set(url)
-    else:
-        url = current_server.get()
+    if durability is not None:
+        set_durability(durability)
+
+    if current_run.get() is not None:
+        current_run.get().finish()
 
     if current_project.get() is None or current_project.get() != project:
         print(f"* Trackio project initialized: {project}")
@@ -80,8 +77,12 @@ def init(
             )
     current_project.set(project)
 
-    space_or_url = space_id if space_id else url
-    client = Client(space_or_url, verbose=False)
+    if space_id is None:
+        client = None
+    else:
+        from gradio_client import Client
+
+        client = Client(space_id, verbose=False)
 
     if resume == "must":
         if name is None:
@@ -131,6 +132,11 @@ def create_space_if_not_exists(
     except RepositoryNotFoundError:
         pass
 
+    from gradio_client import Client
+    from httpx import ReadTimeout
+
+    from trackio.deploy import deploy_as_space
+
     print(f"* Creating new space: {SPACE_URL.format(space_id=space_id)}")
     deploy_as_space(space_id, dataset_id)
 
@@ -148,27 +154,73 @@ def create_space_if_not_exists(
             time.sleep(5)
 
 
-def log(metrics: dict) -> None:
+def log(metrics: dict, step: int | None = None) -> None:
     """
     Logs metrics to the current run.
 
     Args:
         metrics: A dictionary of metrics to log.
+        step: The step to log the metrics at. If not provided, the step after the last logged step of the run is used.
     """
     if current_run.get() is None:
         raise RuntimeError("Call trackio.init() before log().")
-    current_run.get().log(metrics)
+    current_run.get().log(metrics, step=step)
 
 
 def finish():
     """
-    Finishes the current run.
+    Finishes the current run, blocking until all of its logged metrics have been sent.
+    Raises a RuntimeError if some of them could not be sent.
     """
     if current_run.get() is None:
         raise RuntimeError("Call trackio.init() before finish().")
     current_run.get().finish()
 
 
+def summary(
+    project: str | None = None,
+    metrics: list[str] | None = None,
+    query: str | None = None,
+    regex: bool = False,
+    config_filters: dict | None = None,
+    sort: str = "created",
+    descending: bool = False,
+    limit: int | None = None,
+    offset: int = 0,
+):
+    """
+    Summarizes the runs of a project as a pandas DataFrame with one row per run: its name, status and last step, its config, and the last, minimum and maximum value of each metric (in columns named e.g. "last(loss)"). The statistics are computed by the local database, so no metric history is loaded.
+
+    Args:
+        project: The name of the project. If not provided, the project of the current run is used.
+        metrics: The metrics to summarize. If not provided, all numeric metrics are summarized.
+        query: Only include runs whose name contains this string (ignoring case).
+        regex: If True, `query` is a regular expression that run names must match.
+        config_filters: Only include runs whose config has these values, e.g. {"lr": 0.001}.
+        sort: How to sort the runs: "created", "recent" (last updated), "name", or by a metric or config value with "metric:<name>" (last value), "min:<name>", "max:<name>" or "config:<key>".
+        descending: If True, sort the runs in descending order.
+        limit: The maximum number of runs to return. If not provided, all runs are returned.
+        offset: The number of runs to skip, to get the following pages of runs.
+    """
+    from trackio.summaries import get_summary
+
+    project = project or current_project.get()
+    if project is None:
+        raise ValueError("Pass a project, or call trackio.init() before summary().")
+    df, _ = get_summary(
+        project,
+        metrics=metrics,
+        query=query,
+        regex=regex,
+        config_filters=config_filters,
+        sort=sort,
+        descending=descending,
+        limit=limit,
+        offset=offset,
+    )
+    return df
+
+
 def show(project: str | None = None):
     """
     Launches the Trackio dashboard.
@@ -176,6 +228,8 @@ def show(project: str | None = None):
     Args:
         project: The name of the project whose runs to show. If not provided, all projects will be shown and the user can select one.
     """
+    from trackio.ui import demo
+
     _, url, share_url = demo.launch(
         show_api=False,
         quiet=True,
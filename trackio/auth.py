@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from huggingface_hub.errors import HfHubHTTPError
+
+AUTH_CACHE_TTL = float(os.getenv("TRACKIO_AUTH_CACHE_TTL", 300))  # seconds
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("TRACKIO_AUTH_CACHE_NEGATIVE_TTL", 30))
+AUTH_CACHE_MAX_SIZE = 1024
+
+
+def verify_write_access(who: dict, owner_name: str | None, repo_name: str | None):
+    """
+    Raises a PermissionError unless the `whoami` response `who` describes a token with
+    write access to the Space `owner_name/repo_name`.
+    """
+    access_token = who["auth"]["accessToken"]
+    # make sure the token user is either the author of the space,
+    # or is a member of an org that is the author.
+    orgs = [o["name"] for o in who["orgs"]]
+    if owner_name != who["name"] and owner_name not in orgs:
+        raise PermissionError(
+            "Expected the provided hf_token to be the user owner of the space, or be a member of the org owner of the space"
+        )
+    # reject fine-grained tokens without specific repo access
+    if access_token["role"] == "fineGrained":
+        matched = False
+        for item in access_token["fineGrained"]["scoped"]:
+            if (
+                item["entity"]["type"] == "space"
+                and item["entity"]["name"] == f"{owner_name}/{repo_name}"
+                and "repo.write" in item["permissions"]
+            ):
+                matched = True
+                break
+            if (
+                item["entity"]["type"] == "user"
+                and item["entity"]["name"] == owner_name
+                and "repo.write" in item["permissions"]
+            ):
+                matched = True
+                break
+        if not matched:
+            raise PermissionError(
+                "Expected the provided hf_token with fine grained permissions to provide write access to the space"
+            )
+    # reject read-only tokens
+    elif access_token["role"] != "write":
+        raise PermissionError(
+            "Expected the provided hf_token to provide write permissions"
+        )
+
+
+class AuthCache:
+    """
+    Caches the result of checking an HF token for write access to the current Space,
+    so that `whoami` is called once per token and TTL rather than once per request.
+    Rejected tokens, including the ones `whoami` answers with a 401 or 403, are
+    cached too (for `negative_ttl` seconds); network and server errors are not, so
+    that the next request checks again. Tokens are only
+    stored as SHA-256 hashes, and the least recently used entries are evicted once
+    the cache holds `max_size` tokens.
+    """
+
+    def __init__(
+        self,
+        whoami: Callable[[str], dict],
+        ttl: float = AUTH_CACHE_TTL,
+        negative_ttl: float = AUTH_CACHE_NEGATIVE_TTL,
+        max_size: int = AUTH_CACHE_MAX_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.whoami = whoami
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.clock = clock
+        # token hash -> (expiry time, error message or None if authorized)
+        self._entries: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(hf_token: str) -> str:
+        return hashlib.sha256(hf_token.encode("utf-8")).hexdigest()
+
+    def check(self, hf_token: str) -> None:
+        """Raises a PermissionError unless `hf_token` has write access to the Space."""
+        key = self._hash(hf_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, error = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    if error is not None:
+                        raise PermissionError(error)
+                    return
+                del self._entries[key]
+
+        try:
+            try:
+                who = self.whoami(hf_token)
+            except HfHubHTTPError as e:
+                status = getattr(e.response, "status_code", None)
+                if status not in (401, 403):
+                    raise
+                raise PermissionError(
+                    f"The provided hf_token was rejected by the Hub ({status})"
+                ) from e
+            verify_write_access(
+                who,
+                os.getenv("SPACE_AUTHOR_NAME"),
+                os.getenv("SPACE_REPO_NAME"),
+            )
+        except PermissionError as e:
+            self._store(key, self.negative_ttl, str(e))
+            raise
+        self._store(key, self.ttl, None)
+
+    def _store(self, key: str, ttl: float, error: str | None):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, error)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
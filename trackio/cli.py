@@ -1,6 +1,7 @@
 import argparse
 
 from trackio import show
+from trackio.sqlite_storage import SQLiteStorage
 
 
 def main():
@@ -14,10 +15,25 @@ def main():
         "--project", required=False, help="Project name to show in the dashboard"
     )
 
+    rollups_parser = subparsers.add_parser(
+        "rebuild-rollups",
+        help="Recompute the pre-aggregated metrics used to plot long runs",
+    )
+    rollups_parser.add_argument(
+        "--project",
+        required=False,
+        help="Project whose rollups to rebuild (all projects if not provided)",
+    )
+
     args = parser.parse_args()
 
     if args.command == "show":
         show(args.project)
+    elif args.command == "rebuild-rollups":
+        projects = [args.project] if args.project else SQLiteStorage.get_projects()
+        for project in projects:
+            print(f"* Rebuilding rollups of project: {project}")
+            SQLiteStorage.rebuild_rollups(project)
     else:
         parser.print_help()
 
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+def _bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    """Edges splitting the points between the first and the last into `n_buckets` buckets."""
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm, which keeps
+    the visual shape of a line (peaks, dips and trends). `x` must be sorted. Returns
+    the sorted indices of the (at most `max(n_out, 3)`) points to keep, always
+    including the first and the last point.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+
+    edges = _bucket_edges(n, n_out - 2)
+    starts, ends = edges[:-1], edges[1:]
+    # The third corner of each triangle is the average of the next bucket (or the
+    # last point, for the last bucket), which does not depend on earlier choices.
+    cum_x = np.concatenate([[0.0], np.cumsum(x)])
+    cum_y = np.concatenate([[0.0], np.cumsum(y)])
+    next_starts = np.append(starts[1:], n - 1)
+    next_ends = np.append(ends[1:], n)
+    counts = next_ends - next_starts
+    avg_x = (cum_x[next_ends] - cum_x[next_starts]) / counts
+    avg_y = (cum_y[next_ends] - cum_y[next_starts]) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[a] - avg_x[i]) * (bucket_y - y[a])
+            - (x[a] - bucket_x) * (avg_y[i] - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def min_max(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Downsample a series by keeping the minimum and the maximum of each of `n_out // 2`
+    buckets, so that every extreme value survives. `x` must be sorted. Returns the
+    sorted indices of the (at most `max(n_out, 4)`) points to keep, always including
+    the first and the last point.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_buckets = max((n_out - 2) // 2, 1)
+
+    edges = _bucket_edges(n, n_buckets)
+    edges = np.unique(edges)  # drops empty buckets
+    starts, sizes = edges[:-1], np.diff(edges)
+    inner = y[1 : n - 1]
+    bucket = np.repeat(np.arange(len(starts)), sizes)
+    offsets = starts - 1
+    keep = [np.array([0, n - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extremes = reduce.reduceat(inner, offsets)
+        hits = np.flatnonzero(inner == np.repeat(extremes, sizes))
+        # The first point of each bucket that reaches the bucket's extreme.
+        _, first = np.unique(bucket[hits], return_index=True)
+        keep.append(hits[first] + 1)
+    return np.unique(np.concatenate(keep))
+
+
+METHODS = {"lttb": lttb, "minmax": min_max}
+
+
+def downsample(
+    x: np.ndarray,
+    y: np.ndarray,
+    n_out: int,
+    x_lim: tuple[float, float] | None = None,
+    method: str = "lttb",
+) -> np.ndarray:
+    """
+    Get the indices of at most `n_out` points that represent the series (x, y). If
+    `x_lim` is given, the points are chosen from that range only (plus the nearest
+    point on each side, so that lines still reach the edges of the plot), which gives
+    full resolution when zoomed in. `x` must be sorted.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    lo, hi = 0, len(x)
+    if x_lim is not None:
+        lo = max(int(np.searchsorted(x, x_lim[0], side="left")) - 1, 0)
+        hi = min(int(np.searchsorted(x, x_lim[1], side="right")) + 1, len(x))
+    return lo + METHODS[method](x[lo:hi], np.asarray(y)[lo:hi], n_out)
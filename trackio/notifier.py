@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+# How often a project database is checked for changes (a `stat` of its files). The
+# interval doubles each time nothing has changed, up to the maximum, and goes back
+# to the minimum as soon as something does.
+WATCH_MIN_INTERVAL = 0.1  # seconds
+WATCH_MAX_INTERVAL = 2.0
+# How long a watcher thread keeps running once nobody is subscribed to its project.
+WATCH_IDLE_TIMEOUT = 30.0
+# How many past states of a project are kept to tell whether a subscriber that comes
+# back with an older version has missed a change to its runs.
+WATCH_HISTORY_SIZE = 64
+
+# The state of a project as seen by subscribers: its runs and the last step of each.
+ProjectState = tuple[list[str], dict[str, int]]
+
+
+class _Waiter:
+    def __init__(self, runs: set[str] | None, wake: Callable[[int], None]):
+        self.runs = runs
+        self.wake = wake
+
+    def is_affected(self, old: ProjectState, new: ProjectState) -> bool:
+        if old[0] != new[0]:
+            return True
+        runs = new[1].keys() if self.runs is None else self.runs
+        return any(old[1].get(run) != new[1].get(run) for run in runs)
+
+
+class ProjectWatcher:
+    """
+    Watches the database of one project from a background thread, and wakes the
+    subscribers watching the runs that changed. A single watcher serves every
+    dashboard session viewing the project, and it stops once it has had no
+    subscribers for `idle_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        project: str,
+        get_state: Callable[[str], ProjectState],
+        on_exit: Callable[["ProjectWatcher"], None],
+        min_interval: float = WATCH_MIN_INTERVAL,
+        max_interval: float = WATCH_MAX_INTERVAL,
+        idle_timeout: float = WATCH_IDLE_TIMEOUT,
+    ):
+        self.project = project
+        self.get_state = get_state
+        self.on_exit = on_exit
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_timeout = idle_timeout
+        self.version = 0
+        self.state = get_state(project)
+        self._history: OrderedDict[int, ProjectState] = OrderedDict({0: self.state})
+        self._waiters: set[_Waiter] = set()
+        self._changed = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._watch, name=f"trackio-watch-{project}", daemon=True
+        )
+        self._thread.start()
+
+    def subscribe(
+        self, since_version: int, runs: set[str] | None, wake: Callable[[int], None]
+    ) -> _Waiter | None:
+        """
+        Call `wake(version)` once the given runs (or any run, if `runs` is None) have
+        changed since `since_version`, immediately if they already have. Returns None
+        if the watcher has already stopped.
+        """
+        waiter = _Waiter(runs, wake)
+        with self._condition:
+            if self._closed:
+                return None
+            old = self._history.get(since_version)
+            if old is None or waiter.is_affected(old, self.state):
+                if since_version != self.version:
+                    wake(self.version)
+            self._waiters.add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter: _Waiter):
+        with self._condition:
+            self._waiters.discard(waiter)
+
+    def check_now(self):
+        """Check for changes without waiting for the end of the current interval."""
+        with self._condition:
+            self._changed = True
+            self._condition.notify()
+
+    def _watch(self):
+        interval = self.min_interval
+        idle_since = time.monotonic()
+        while True:
+            with self._condition:
+                if not self._changed:
+                    self._condition.wait(interval)
+                self._changed = False
+                if self._waiters:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > self.idle_timeout:
+                    self._closed = True
+                    self.on_exit(self)
+                    return
+            try:
+                state = self.get_state(self.project)
+            except Exception:
+                state = self.state
+            if state == self.state:
+                interval = min(interval * 2, self.max_interval)
+                continue
+            interval = self.min_interval
+            with self._condition:
+                old, self.state = self.state, state
+                self.version += 1
+                self._history[self.version] = state
+                if len(self._history) > WATCH_HISTORY_SIZE:
+                    self._history.popitem(last=False)
+                for waiter in self._waiters:
+                    if waiter.is_affected(old, state):
+                        waiter.wake(self.version)
+
+
+class ChangeNotifier:
+    """
+    Lets dashboard sessions and API clients wait until new metrics are logged to a
+    project, instead of polling it. Projects are watched by one ProjectWatcher each,
+    started on the first subscription; writes made by this process can wake them up
+    immediately with `notify()`.
+    """
+
+    def __init__(self, get_state: Callable[[str], ProjectState], **watcher_kwargs):
+        self.get_state = get_state
+        self.watcher_kwargs = watcher_kwargs
+        self._watchers: dict[str, ProjectWatcher] = {}
+        self._lock = threading.Lock()
+
+    def _get_watcher(self, project: str) -> ProjectWatcher:
+        with self._lock:
+            watcher = self._watchers.get(project)
+            if watcher is None:
+                watcher = ProjectWatcher(
+                    project, self.get_state, self._remove, **self.watcher_kwargs
+                )
+                self._watchers[project] = watcher
+            return watcher
+
+    def _remove(self, watcher: ProjectWatcher):
+        with self._lock:
+            if self._watchers.get(watcher.project) is watcher:
+                del self._watchers[watcher.project]
+
+    def version(self, project: str) -> int:
+        """The number of changes seen so far in `project`, which starts watching it."""
+        return self._get_watcher(project).version
+
+    def notify(self, project: str):
+        """Tell the watcher of `project`, if any, that it has just been written to."""
+        with self._lock:
+            watcher = self._watchers.get(project)
+        if watcher is not None:
+            watcher.check_now()
+
+    async def wait(
+        self,
+        project: str,
+        since_version: int,
+        runs: list[str] | None = None,
+        timeout: float | None = None,
+    ) -> int:
+        """
+        Wait until any of `runs` (or of all runs, if None) changes after
+        `since_version`, or until `timeout` seconds have passed. Returns the version
+        of the project, which is `since_version` if nothing changed.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(version: int):
+            if not future.done():
+                future.set_result(version)
+
+        def wake(version: int):
+            try:
+                loop.call_soon_threadsafe(resolve, version)
+            except RuntimeError:  # the event loop was closed
+                pass
+
+        waiter = None
+        while waiter is None:
+            watcher = self._get_watcher(project)
+            waiter = watcher.subscribe(
+                since_version, None if runs is None else set(runs), wake
+            )
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return since_version
+        finally:
+            watcher.unsubscribe(waiter)
@@ -1,39 +1,181 @@
-import huggingface_hub
-from gradio_client import Client
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING
 
+import huggingface_hub.utils
+
+from trackio.sqlite_storage import SQLiteStorage
 from trackio.utils import RESERVED_KEYS, generate_readable_name
 
+if TYPE_CHECKING:
+    from gradio_client import Client
+
+BATCH_SIZE = 128
+FLUSH_INTERVAL = 0.5  # seconds
+MAX_QUEUE_SIZE = 10_000
+# A batch that fails to be sent is retried this many times, waiting twice as long
+# before each new attempt, before its metrics are dropped. Once a batch is dropped,
+# the next ones are only tried once until one is sent, and the metrics still queued
+# when the run finishes are dropped without being sent.
+SEND_RETRIES = 4
+RETRY_INTERVAL = 1.0  # seconds
+
+_WAKE_UP = object()
+
 
 class Run:
     def __init__(
         self,
         project: str,
-        client: Client,
+        client: "Client | None",
         name: str | None = None,
         config: dict | None = None,
         dataset_id: str | None = None,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_queue_size: int = MAX_QUEUE_SIZE,
     ):
         self.project = project
         self.client = client
         self.name = name or generate_readable_name()
         self.config = config or {}
         self.dataset_id = dataset_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Without a client (i.e. when logging locally), metrics are written
+        # straight to the database from this process instead of over HTTP.
+        self._storage = None
+        if client is None:
+            # Only a config that was passed is saved, so that resuming a run without
+            # one keeps the config it was started with.
+            self._storage = SQLiteStorage.get_storage(
+                project, self.name, dataset_id=dataset_id, config=config
+            )
+
+        # Metrics are buffered here and sent by a background thread so that
+        # `log()` never waits on a network round-trip. The queue is bounded so
+        # that a slow server applies backpressure instead of growing memory.
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._finished = False
+        # Metrics that could not be sent, and the last error, reported by `finish()`.
+        self._dropped = 0
+        self._send_error: Exception | None = None
+        self._failing = False
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name=f"trackio-{self.name}", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.finish)
 
-    def log(self, metrics: dict):
+    def log(self, metrics: dict, step: int | None = None):
+        if self._finished:
+            raise RuntimeError("Cannot log to a run that has already finished.")
         for k in metrics.keys():
             if k in RESERVED_KEYS or k.startswith("__"):
                 raise ValueError(
                     f"Please do not use this reserved key as a metric: {k}"
                 )
-        self.client.predict(
-            api_name="/log",
-            project=self.project,
-            run=self.name,
-            metrics=metrics,
-            dataset_id=self.dataset_id,
-            hf_token=huggingface_hub.utils.get_token(),
-        )
+        # Blocks while the queue is full, which slows the caller down to the
+        # rate at which the flusher can send metrics.
+        log = {
+            "run": self.name,
+            "metrics": metrics,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if step is not None:
+            log["step"] = step
+        self._queue.put(log)
+
+    def _next_batch(self) -> list[dict]:
+        """Collect up to `batch_size` queued metrics, waiting at most `flush_interval`."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout <= 0 or self._stop_event.is_set():
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is not _WAKE_UP:
+                batch.append(item)
+        return batch
+
+    def _flush_loop(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+
+    def _send_batch(self, batch: list[dict]):
+        """
+        Send a batch of metrics, retrying with backoff so that a server that is
+        briefly unreachable (or a database that is briefly locked) loses nothing.
+        """
+        if self._failing and self._stop_event.is_set():
+            self._dropped += len(batch)
+            return
+        retries = 0 if self._failing else SEND_RETRIES
+        interval = RETRY_INTERVAL
+        for attempt in range(retries + 1):
+            try:
+                if self.client is None:
+                    SQLiteStorage.bulk_log(
+                        self.project, batch, dataset_id=self.dataset_id
+                    )
+                else:
+                    self.client.predict(
+                        api_name="/log_batch",
+                        project=self.project,
+                        logs=batch,
+                        dataset_id=self.dataset_id,
+                        hf_token=huggingface_hub.utils.get_token(),
+                    )
+                self._failing = False
+                return
+            except Exception as e:
+                error = e
+            if attempt < retries:
+                time.sleep(interval)
+                interval *= 2
+        print(f"* Trackio failed to log metrics for run {self.name}: {error}")
+        self._dropped += len(batch)
+        self._send_error = error
+        self._failing = True
 
     def finish(self):
-        """Cleanup when run is finished."""
-        pass
+        """
+        Cleanup when run is finished. Blocks until all queued metrics are sent, and
+        raises a RuntimeError if some of them could not be.
+        """
+        if self._finished:
+            return
+        self._finished = True
+        self._stop_event.set()
+        self._queue.put(_WAKE_UP)
+        self._flusher.join()
+        if self._storage is not None:
+            self._storage.finish()
+        else:
+            try:
+                self.client.predict(
+                    api_name="/finish",
+                    project=self.project,
+                    run=self.name,
+                    dataset_id=self.dataset_id,
+                    hf_token=huggingface_hub.utils.get_token(),
+                )
+            except Exception as e:
+                print(f"* Trackio failed to mark run {self.name} as finished: {e}")
+        atexit.unregister(self.finish)
+        if self._dropped:
+            raise RuntimeError(
+                f"Trackio failed to log {self._dropped} metrics for run {self.name}."
+            ) from self._send_error
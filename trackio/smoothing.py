@@ -0,0 +1,130 @@
+import numpy as np
+
+# How far the cumulative decay of an EMA may fall within one segment of the
+# vectorized computation before a new segment is started, as a natural log. This
+# keeps the rescaled terms well within the range of a float64.
+_MAX_SEGMENT_LOG_DECAY = 300.0
+# Decays smaller than exp(-50) are indistinguishable from 0 for smoothing purposes.
+_MIN_LOG_DECAY = -50.0
+
+METHODS = ("ema", "time_ema", "rolling")
+DEFAULT_METHOD = "ema"
+DEFAULT_WEIGHT = 0.6
+
+
+def _decayed_sums(
+    log_decay: np.ndarray, inputs: np.ndarray, initial: np.ndarray
+) -> np.ndarray:
+    """
+    Compute s[i] = exp(log_decay[i]) * s[i - 1] + inputs[i] for each column of
+    `inputs`, with s[-1] = `initial`. Within a segment, s[i] = P[i] * (initial +
+    cumsum(inputs / P)[i]) where P is the cumulative decay since the start of the
+    segment; segments are cut so that 1 / P never overflows.
+    """
+    n = len(log_decay)
+    out = np.empty_like(inputs)
+    cum_log = np.cumsum(log_decay)
+    # Segment ends are found by binary search, which needs an ascending array.
+    neg_cum_log = -cum_log
+    start, carry, base = 0, initial, 0.0
+    while start < n:
+        end = int(
+            np.searchsorted(neg_cum_log, _MAX_SEGMENT_LOG_DECAY - base, side="right")
+        )
+        end = max(end, start + 1)
+        decay = np.exp(cum_log[start:end] - base)[:, None]
+        out[start:end] = decay * (carry + np.cumsum(inputs[start:end] / decay, axis=0))
+        carry, base = out[end - 1], cum_log[end - 1]
+        start = end
+    return out
+
+
+def ema(
+    y: np.ndarray,
+    weight: float,
+    x: np.ndarray | None = None,
+    state: tuple | None = None,
+) -> tuple[np.ndarray, tuple]:
+    """
+    Smooth `y` with a debiased exponential moving average, as done by TensorBoard: the
+    average is divided by the total weight of the values seen so far, so that it does
+    not start at 0. If `x` is given, the EMA is time-weighted: `weight` applies per
+    unit of `x`, so that points after a gap count for less than points that follow
+    each other closely.
+
+    Returns the smoothed values and a state which, passed back with the values that
+    follow, continues the EMA without recomputing it from the start.
+    """
+    if not 0 <= weight < 1:
+        raise ValueError(f"The smoothing weight must be in [0, 1), got {weight}")
+    y = np.asarray(y, dtype=np.float64)
+    numerator, denominator, last_x = state or (0.0, 0.0, None)
+    if len(y) == 0:
+        return y, (numerator, denominator, last_x)
+
+    log_weight = max(np.log(weight), _MIN_LOG_DECAY) if weight > 0 else _MIN_LOG_DECAY
+    if x is None:
+        log_decay = np.full(len(y), log_weight)
+    else:
+        x = np.asarray(x, dtype=np.float64)
+        previous = x[0] if last_x is None else last_x
+        gaps = np.diff(x, prepend=previous)
+        log_decay = np.maximum(np.maximum(gaps, 0) * log_weight, _MIN_LOG_DECAY)
+        if last_x is None:
+            log_decay[0] = log_weight
+        last_x = x[-1]
+
+    gain = -np.expm1(log_decay)  # 1 - decay
+    sums = _decayed_sums(
+        log_decay,
+        np.column_stack([gain * y, gain]),
+        np.array([numerator, denominator]),
+    )
+    return sums[:, 0] / sums[:, 1], (sums[-1, 0], sums[-1, 1], last_x)
+
+
+def rolling_window(weight: float) -> int:
+    """
+    The window of the rolling mean with the same center of mass as an EMA with the
+    given weight, so that a single smoothing weight can drive every method.
+    """
+    return max(int(round((1 + weight) / (1 - weight))), 1)
+
+
+def rolling_mean(
+    y: np.ndarray, window: int, state: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Smooth `y` with a trailing rolling mean over the last `window` values. Unlike a
+    centered window, a trailing one never changes once computed, which lets it be
+    extended with new values. Returns the smoothed values and the state (the last
+    `window - 1` values) to pass back with the values that follow.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    tail = np.empty(0) if state is None else state
+    values = np.concatenate([tail, y])
+    sums = np.concatenate([[0.0], np.cumsum(values)])
+    ends = np.arange(len(tail), len(values)) + 1
+    starts = np.maximum(ends - window, 0)
+    smoothed = (sums[ends] - sums[starts]) / (ends - starts)
+    return smoothed, values[max(len(values) - (window - 1), 0) :]
+
+
+def smooth(
+    y: np.ndarray,
+    method: str = DEFAULT_METHOD,
+    weight: float = DEFAULT_WEIGHT,
+    x: np.ndarray | None = None,
+    state=None,
+):
+    """
+    Smooth `y` with one of METHODS: "ema", "time_ema" (weighted by the spacing of `x`)
+    or "rolling". Returns the smoothed values and the state to continue from.
+    """
+    if method == "ema":
+        return ema(y, weight, state=state)
+    if method == "time_ema":
+        return ema(y, weight, x=x, state=state)
+    if method == "rolling":
+        return rolling_mean(y, rolling_window(weight), state=state)
+    raise ValueError(f"Unknown smoothing method: {method}. Use one of {METHODS}.")
@@ -1,34 +1,194 @@
+import contextlib
+import functools
 import glob
 import json
+import math
 import os
+import re
 import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
-
-from huggingface_hub import CommitScheduler
+from typing import Callable
 
 try:
-    from trackio.dummy_commit_scheduler import DummyCommitScheduler
     from trackio.utils import TRACKIO_DIR
 except:  # noqa: E722
-    from dummy_commit_scheduler import DummyCommitScheduler
     from utils import TRACKIO_DIR
 
+MAX_CACHED_STORAGES = 256
+# How runs can be sorted by `SQLiteStorage.search_runs`, besides by metric.
+RUN_SORT_COLUMNS = {
+    "recent": "r.last_timestamp",
+    "created": "r.created_at",
+    "name": "r.run_name",
+}
+SCHEMA_VERSION = 7
+# Widths, in steps, of the buckets that metric values are pre-aggregated into.
+ROLLUP_LEVELS = (10, 100, 1000)
+# The index of the project databases in TRACKIO_DIR, see `get_project_catalog`. Its
+# extension keeps it out of the databases that are listed and synced.
+CATALOG_FILE = "catalog.sqlite"
+
+# Maps the `durability` option of `trackio.init()` to SQLite's `synchronous` pragma.
+# In WAL mode, "normal" only fsyncs at checkpoints: a power loss can drop the last
+# few commits but never corrupts the database.
+DURABILITY_LEVELS = {"full": "FULL", "normal": "NORMAL", "off": "OFF"}
+_durability = "normal"
+_connections = threading.local()
+
+# Process-wide registries, so that schedulers, storage writers and schemas are set up
+# once rather than on every logging request.
+_schedulers: dict[tuple[str, str], object] = {}
+_storages: OrderedDict[tuple[str, str, str | None], "SQLiteStorage"] = OrderedDict()
+_initialized_db_paths: set[str] = set()
+# See `set_hydrator`.
+_hydrate: Callable[[str], None] | None = None
+_registry_lock = threading.RLock()
+
+
+def set_durability(durability: str) -> None:
+    """Set how hard SQLite works to make commits survive a crash: "full", "normal" or "off"."""
+    global _durability
+    if durability.lower() not in DURABILITY_LEVELS:
+        raise ValueError(
+            f"durability must be one of {list(DURABILITY_LEVELS)}, got '{durability}'"
+        )
+    _durability = durability.lower()
+
+
+set_durability(os.environ.get("TRACKIO_DURABILITY", "normal"))
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_regex(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value: str | None) -> bool:
+    """Implements SQLite's `value REGEXP pattern` operator."""
+    return value is not None and _compile_regex(pattern).search(value) is not None
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Get a connection to `db_path` that stays open for the lifetime of the calling
+    thread, in WAL mode so that dashboard reads don't block writers (and vice versa).
+    """
+    cache = _connections.__dict__.setdefault("by_path", {})
+    entry = cache.get(db_path)
+    if entry is not None and not os.path.exists(db_path):
+        entry[0].close()
+        entry = None
+    if entry is None:
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("PRAGMA cache_size=-16000")  # 16 MB
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.create_function("regexp", 2, _regexp, deterministic=True)
+        entry = [conn, None]
+        cache[db_path] = entry
+    if entry[1] != _durability:
+        entry[0].execute(f"PRAGMA synchronous={DURABILITY_LEVELS[_durability]}")
+        entry[1] = _durability
+    return entry[0]
+
+
+def close_connections(db_path: str | None = None) -> None:
+    """Close the connections opened by the calling thread, or only the one to `db_path`."""
+    cache = _connections.__dict__.setdefault("by_path", {})
+    for path in [db_path] if db_path is not None else list(cache):
+        entry = cache.pop(path, None)
+        if entry is not None:
+            entry[0].close()
+
+
+def set_hydrator(hydrate: Callable[[str], None] | None) -> None:
+    """
+    Set a function called with the path of a project database before it is read or
+    written, which can restore it from the dataset it is synced to first.
+    """
+    global _hydrate
+    _hydrate = hydrate
+
 
 class SQLiteStorage:
     def __init__(
-        self, project: str, name: str, config: dict, dataset_id: str | None = None
+        self,
+        project: str,
+        name: str,
+        config: dict | None = None,
+        dataset_id: str | None = None,
     ):
         self.project = project
         self.name = name
         self.config = config
         self.db_path = self._get_project_db_path(project)
         self.dataset_id = dataset_id
-        self.scheduler = self._get_scheduler()
-
-        os.makedirs(TRACKIO_DIR, exist_ok=True)
+        self.scheduler = self._get_scheduler(dataset_id)
 
         self._init_db()
-        self._save_config()
+        # The step counter is seeded from the database once, so that logging doesn't
+        # need to look up the last step of the run on every insert.
+        self._step_lock = threading.Lock()
+        last_step = self._load_last_step()
+        self._next_step = 0 if last_step is None else last_step + 1
+        # A run's config is only written when one is given, so that writers created
+        # just for logging don't overwrite the config saved when the run started.
+        if config is not None:
+            self._save_config()
+
+    @staticmethod
+    def get_storage(
+        project: str,
+        name: str,
+        dataset_id: str | None = None,
+        config: dict | None = None,
+    ) -> "SQLiteStorage":
+        """
+        Get the long-lived storage writer for a run, creating it on first use. The least
+        recently used writers are evicted once more than MAX_CACHED_STORAGES are open.
+        If `config` is provided, it is saved as the run's config.
+        """
+        key = (project, name, dataset_id)
+        db_path = SQLiteStorage._get_project_db_path(project)
+
+        def get_cached() -> "SQLiteStorage | None":
+            storage = _storages.get(key)
+            if storage is None or storage.db_path != db_path:
+                return None
+            if not os.path.exists(db_path):
+                return None
+            _storages.move_to_end(key)
+            return storage
+
+        with _registry_lock:
+            storage = get_cached()
+        if storage is None:
+            # Created outside of the lock, since creating a writer can wait for its
+            # database to be restored, and restoring needs the lock. Concurrent
+            # requests for a new run all get the first writer that is registered, so
+            # they still share a single step counter.
+            created = SQLiteStorage(project, name, dataset_id=dataset_id)
+            with _registry_lock:
+                storage = get_cached()
+                if storage is None:
+                    storage = _storages[key] = created
+                    while len(_storages) > MAX_CACHED_STORAGES:
+                        _storages.popitem(last=False)
+        if config is not None:
+            storage.config = config
+            storage._save_config()
+        return storage
+
+    @staticmethod
+    def clear_storages():
+        """Drop all cached storage writers."""
+        with _registry_lock:
+            _storages.clear()
+            _initialized_db_paths.clear()
 
     @staticmethod
     def _get_project_db_path(project: str) -> str:
@@ -40,168 +200,1716 @@ class SQLiteStorage:
             safe_project_name = "default"
         return os.path.join(TRACKIO_DIR, f"{safe_project_name}.db")
 
-    def _get_scheduler(self):
+    @staticmethod
+    def _get_scheduler(dataset_id: str | None = None):
+        """
+        Get the scheduler syncing TRACKIO_DIR to the dataset, shared by all writers, or
+        None if there is no dataset to sync to.
+        """
         hf_token = os.environ.get(
             "HF_TOKEN"
         )  # Get the token from the environment variable on Spaces
-        dataset_id = self.dataset_id or os.environ.get("TRACKIO_DATASET_ID")
+        dataset_id = dataset_id or os.environ.get("TRACKIO_DATASET_ID")
         if dataset_id is None:
-            scheduler = DummyCommitScheduler()
-        else:
-            scheduler = CommitScheduler(
-                repo_id=dataset_id,
-                repo_type="dataset",
-                folder_path=TRACKIO_DIR,
-                private=True,
-                squash_history=True,
-                token=hf_token,
-            )
-        return scheduler
+            return None
+        key = (dataset_id, TRACKIO_DIR)
+        with _registry_lock:
+            if key not in _schedulers:
+                # Imported here, since the sync module reads and writes databases
+                # through this one.
+                try:
+                    from trackio.sync import HubDatasetRepo, SyncScheduler
+                except:  # noqa: E722
+                    from sync import HubDatasetRepo, SyncScheduler
+
+                os.makedirs(TRACKIO_DIR, exist_ok=True)
+                _schedulers[key] = SyncScheduler(
+                    TRACKIO_DIR, HubDatasetRepo(dataset_id, token=hf_token)
+                )
+            return _schedulers[key]
 
     def _init_db(self):
         """Initialize the SQLite database with required tables."""
-        with self.scheduler.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+        if _hydrate is not None:
+            _hydrate(self.db_path)
+        self._ensure_db(self.db_path)
 
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS metrics (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TEXT NOT NULL,
-                        project_name TEXT NOT NULL,
-                        run_name TEXT NOT NULL,
-                        step INTEGER NOT NULL,
-                        metrics TEXT NOT NULL
-                    )
-                """)
-
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS configs (
-                        project_name TEXT NOT NULL,
-                        run_name TEXT NOT NULL,
-                        config TEXT NOT NULL,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        PRIMARY KEY (project_name, run_name)
-                    )
-                """)
+    @staticmethod
+    def _ensure_db(db_path: str) -> None:
+        """Create the tables of a project database, once per process."""
+        if db_path in _initialized_db_paths and os.path.exists(db_path):
+            return
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with get_connection(db_path) as conn:
+            SQLiteStorage._create_tables(conn)
+        with _registry_lock:
+            _initialized_db_paths.add(db_path)
 
-                conn.commit()
+    @staticmethod
+    def _get_existing_db_path(project: str) -> str | None:
+        """
+        Get the database path of a project for reading, upgrading its schema first if
+        needed, or None if the project has no database yet.
+        """
+        db_path = SQLiteStorage._get_project_db_path(project)
+        if _hydrate is not None:
+            _hydrate(db_path)
+        if not os.path.exists(db_path):
+            return None
+        SQLiteStorage._ensure_db(db_path)
+        return db_path
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection):
+        """
+        Create the tables of a project database, or upgrade the tables of a database
+        written by an older version of Trackio. The schema version is tracked with
+        SQLite's `user_version` pragma.
+        """
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                SQLiteStorage._migrate_to_v1(cursor)
+            if version < 2:
+                SQLiteStorage._migrate_to_v2(cursor)
+            if version < 3:
+                SQLiteStorage._migrate_to_v3(cursor)
+            if version < 4:
+                SQLiteStorage._migrate_to_v4(cursor)
+            if version < 5:
+                SQLiteStorage._migrate_to_v5(cursor)
+            if version < 6:
+                SQLiteStorage._migrate_to_v6(cursor)
+            if version < 7:
+                SQLiteStorage._migrate_to_v7(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    @staticmethod
+    def _migrate_to_v1(cursor: sqlite3.Cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                project_name TEXT NOT NULL,
+                run_name TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                metrics TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS configs (
+                project_name TEXT NOT NULL,
+                run_name TEXT NOT NULL,
+                config TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (project_name, run_name)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_metrics_project_run_step
+            ON metrics (project_name, run_name, step)
+        """)
+
+        # One row per run, kept up to date on every insert into `metrics`, so that
+        # listing runs and finding their last step doesn't scan the metrics.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_name TEXT NOT NULL,
+                run_name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_step INTEGER,
+                last_timestamp TEXT,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'running',
+                UNIQUE (project_name, run_name)
+            )
+        """)
+
+        cursor.execute("""
+            INSERT OR IGNORE INTO runs
+            (project_name, run_name, created_at, last_step, last_timestamp, row_count, status)
+            SELECT project_name, run_name, MIN(timestamp), MAX(step), MAX(timestamp), COUNT(*), 'finished'
+            FROM metrics
+            GROUP BY project_name, run_name
+            ORDER BY MIN(id)
+        """)
+
+    @staticmethod
+    def _migrate_to_v2(cursor: sqlite3.Cursor):
+        # Numeric metrics are also stored one value per row, keyed by run, metric name
+        # and step, so that a single metric can be read or aggregated in SQL without
+        # parsing the JSON of every step. The JSON in `metrics` stays the complete
+        # record (including non-numeric values).
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS metric_keys (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS metric_values (
+                run_id INTEGER NOT NULL,
+                key_id INTEGER NOT NULL,
+                step INTEGER NOT NULL,
+                value REAL,
+                PRIMARY KEY (run_id, key_id, step)
+            ) WITHOUT ROWID
+        """)
+
+        run_ids = {
+            (project, run): run_id
+            for run_id, project, run in cursor.execute(
+                "SELECT id, project_name, run_name FROM runs"
+            ).fetchall()
+        }
+        reader = cursor.connection.execute(
+            "SELECT project_name, run_name, step, metrics FROM metrics ORDER BY id"
+        )
+        while rows := reader.fetchmany(10_000):
+            SQLiteStorage._insert_values(
+                cursor,
+                [
+                    (run_ids[(project, run)], step, json.loads(metrics_json))
+                    for project, run, step, metrics_json in rows
+                ],
+                update_summaries=False,
+            )
+
+    @staticmethod
+    def _migrate_to_v3(cursor: sqlite3.Cursor):
+        # Rows of a run in insertion order, for incremental reads by row id (the rowid
+        # is implicitly the last column of every index).
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_metrics_project_run
+            ON metrics (project_name, run_name)
+        """)
+
+    @staticmethod
+    def _migrate_to_v4(cursor: sqlite3.Cursor):
+        # The metric keys logged by each run and the type of their values, so that
+        # the available metrics can be listed without reading any metric rows.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS run_metric_keys (
+                run_id INTEGER NOT NULL,
+                key_id INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                PRIMARY KEY (run_id, key_id)
+            ) WITHOUT ROWID
+        """)
+        # The catalog is filled in by _migrate_to_v6().
+
+    @staticmethod
+    def _migrate_to_v5(cursor: sqlite3.Cursor):
+        # Count, min, max, sum and last value of each metric over buckets of 10, 100
+        # and 1000 steps, so that zoomed-out plots of long runs read a few rows per
+        # bucket instead of every value.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS metric_rollups (
+                run_id INTEGER NOT NULL,
+                key_id INTEGER NOT NULL,
+                level INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                sum REAL NOT NULL,
+                last_step INTEGER NOT NULL,
+                last REAL NOT NULL,
+                PRIMARY KEY (run_id, key_id, level, bucket)
+            ) WITHOUT ROWID
+        """)
+        SQLiteStorage._rebuild_rollups(cursor)
+
+    @staticmethod
+    def _migrate_to_v6(cursor: sqlite3.Cursor):
+        # How many values of each metric key a run has logged, and the last step they
+        # were logged at, so that readers can tell which metrics have new values.
+        cursor.execute(
+            "ALTER TABLE run_metric_keys ADD COLUMN count INTEGER NOT NULL DEFAULT 0"
+        )
+        cursor.execute("ALTER TABLE run_metric_keys ADD COLUMN last_step INTEGER")
+        cursor.execute("DELETE FROM run_metric_keys")
+
+        run_ids = {
+            (project, run): run_id
+            for run_id, project, run in cursor.execute(
+                "SELECT id, project_name, run_name FROM runs"
+            ).fetchall()
+        }
+        reader = cursor.connection.execute(
+            "SELECT project_name, run_name, step, metrics FROM metrics ORDER BY id"
+        )
+        while rows := reader.fetchmany(10_000):
+            catalog = {}
+            for project, run, step, metrics_json in rows:
+                SQLiteStorage._add_to_catalog(
+                    catalog, run_ids[(project, run)], step, json.loads(metrics_json)
+                )
+            SQLiteStorage._update_catalog(cursor, catalog)
+
+    @staticmethod
+    def _migrate_to_v7(cursor: sqlite3.Cursor):
+        # Lets run searches sorted by recency stop after one page of runs.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_runs_project_last_timestamp
+            ON runs (project_name, last_timestamp)
+        """)
+
+    @staticmethod
+    def _rebuild_rollups(cursor: sqlite3.Cursor):
+        cursor.execute("DELETE FROM metric_rollups")
+        for level in ROLLUP_LEVELS:
+            # Integer division truncates towards zero in SQLite, as in _bucket().
+            cursor.execute(
+                """
+                WITH buckets AS (
+                    SELECT run_id, key_id, step / :level AS bucket, COUNT(*) AS count,
+                        MIN(value) AS min, MAX(value) AS max, SUM(value) AS sum,
+                        MAX(step) AS last_step
+                    FROM metric_values
+                    WHERE value IS NOT NULL
+                    GROUP BY run_id, key_id, step / :level
+                )
+                INSERT INTO metric_rollups
+                SELECT b.run_id, b.key_id, :level, b.bucket, b.count, b.min, b.max,
+                    b.sum, b.last_step, v.value
+                FROM buckets b
+                JOIN metric_values v
+                ON v.run_id = b.run_id AND v.key_id = b.key_id AND v.step = b.last_step
+                """,
+                {"level": level},
+            )
+
+    @staticmethod
+    def _bucket(step: int, level: int) -> int:
+        bucket = abs(step) // level
+        return bucket if step >= 0 else -bucket
+
+    @staticmethod
+    def _bucket_steps(bucket: int, level: int) -> tuple[int, int]:
+        """The first and last step of a bucket, the inverse of _bucket()."""
+        if bucket > 0:
+            return bucket * level, bucket * level + level - 1
+        if bucket < 0:
+            return bucket * level - level + 1, bucket * level
+        return -(level - 1), level - 1
+
+    @staticmethod
+    def _recompute_rollups(cursor: sqlite3.Cursor, buckets: set[tuple]):
+        """
+        Recompute (run_id, key_id, level, bucket) rollups from `metric_values`, for
+        buckets where values were replaced rather than added.
+        """
+        for run_id, key_id, level, bucket in buckets:
+            first, last = SQLiteStorage._bucket_steps(bucket, level)
+            cursor.execute(
+                """
+                SELECT step, value FROM metric_values
+                WHERE run_id = ? AND key_id = ? AND step BETWEEN ? AND ?
+                AND value IS NOT NULL
+                ORDER BY step
+                """,
+                (run_id, key_id, first, last),
+            )
+            rows = cursor.fetchall()
+            cursor.execute(
+                """
+                DELETE FROM metric_rollups
+                WHERE run_id = ? AND key_id = ? AND level = ? AND bucket = ?
+                """,
+                (run_id, key_id, level, bucket),
+            )
+            if not rows:
+                continue
+            values = [value for _, value in rows]
+            cursor.execute(
+                """
+                INSERT INTO metric_rollups
+                (run_id, key_id, level, bucket, count, min, max, sum, last_step, last)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run_id,
+                    key_id,
+                    level,
+                    bucket,
+                    len(values),
+                    min(values),
+                    max(values),
+                    sum(values),
+                    *rows[-1],
+                ),
+            )
+
+    @staticmethod
+    def _update_rollups(
+        cursor: sqlite3.Cursor, items: list[tuple], skip: set[tuple] = frozenset()
+    ):
+        """
+        Add (run_id, key_id, step, value) items to the rollups of every level, except
+        to the (run_id, key_id, level, bucket) rollups in `skip`.
+        """
+        rollups = {}
+        for run_id, key_id, step, value in items:
+            if value is None:
+                continue
+            for level in ROLLUP_LEVELS:
+                key = (run_id, key_id, level, SQLiteStorage._bucket(step, level))
+                if key in skip:
+                    continue
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollups[key] = [1, value, value, value, step, value]
+                    continue
+                rollup[0] += 1
+                rollup[1] = min(rollup[1], value)
+                rollup[2] = max(rollup[2], value)
+                rollup[3] += value
+                if step >= rollup[4]:
+                    rollup[4] = step
+                    rollup[5] = value
+        cursor.executemany(
+            """
+            INSERT INTO metric_rollups
+            (run_id, key_id, level, bucket, count, min, max, sum, last_step, last)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id, key_id, level, bucket) DO UPDATE SET
+                count = count + excluded.count,
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max),
+                sum = sum + excluded.sum,
+                last = CASE WHEN excluded.last_step >= last_step THEN excluded.last ELSE last END,
+                last_step = MAX(last_step, excluded.last_step)
+            """,
+            [(*key, *rollup) for key, rollup in rollups.items()],
+        )
+
+    @staticmethod
+    def _metric_type(value) -> str | None:
+        """The type of a metric value in the metric key catalog."""
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, (int, float)):
+            return "number"
+        if isinstance(value, str):
+            return "string"
+        return "object"
+
+    @staticmethod
+    def _add_to_catalog(catalog: dict, run_id: int, step: int, metrics: dict):
+        for name, value in metrics.items():
+            value_type = SQLiteStorage._metric_type(value)
+            if value_type is None:
+                continue
+            entry = catalog.get((run_id, name))
+            if entry is None:
+                catalog[(run_id, name)] = [value_type, 1, step]
+                continue
+            if entry[0] != value_type:
+                entry[0] = "mixed"
+            entry[1] += 1
+            entry[2] = max(entry[2], step)
+
+    @staticmethod
+    def _update_catalog(cursor: sqlite3.Cursor, catalog: dict):
+        """
+        Add {(run_id, name): [type, count, last step]} entries to the metric key
+        catalog.
+        """
+        key_ids = SQLiteStorage._get_key_ids(cursor, {name for _, name in catalog})
+        cursor.executemany(
+            """
+            INSERT INTO run_metric_keys (run_id, key_id, type, count, last_step)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (run_id, key_id) DO UPDATE SET
+                type = CASE WHEN type = excluded.type THEN type ELSE 'mixed' END,
+                count = count + excluded.count,
+                last_step = MAX(COALESCE(last_step, excluded.last_step), excluded.last_step)
+            """,
+            [
+                (run_id, key_ids[name], *entry)
+                for (run_id, name), entry in catalog.items()
+            ],
+        )
+
+    @staticmethod
+    def _numeric_items(metrics: dict):
+        for name, value in metrics.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield name, float(value) if math.isfinite(value) else None
+
+    @staticmethod
+    def _get_key_ids(cursor: sqlite3.Cursor, names: set[str]) -> dict[str, int]:
+        """Get the ids of the given metric names, adding the names that are new."""
+        names = list(names)
+        key_ids = {}
+        # Stay well below SQLite's limit on the number of query parameters.
+        for i in range(0, len(names), 500):
+            chunk = names[i : i + 500]
+            cursor.executemany(
+                "INSERT OR IGNORE INTO metric_keys (name) VALUES (?)",
+                [(name,) for name in chunk],
+            )
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT name, id FROM metric_keys WHERE name IN ({placeholders})",
+                chunk,
+            )
+            key_ids.update(cursor.fetchall())
+        return key_ids
+
+    @staticmethod
+    def _insert_values(
+        cursor: sqlite3.Cursor, values: list[tuple], update_summaries: bool = True
+    ):
+        """
+        Insert the numeric values of (run_id, step, metrics) records into
+        `metric_values`, and add them to the metric key catalog and the rollups.
+        """
+        items = [
+            (run_id, step, name, value)
+            for run_id, step, metrics in values
+            for name, value in SQLiteStorage._numeric_items(metrics)
+        ]
+        key_ids = SQLiteStorage._get_key_ids(cursor, {item[2] for item in items})
+        # A value logged again at the same step replaces the previous one.
+        latest = {
+            (run_id, key_ids[name], step): value for run_id, step, name, value in items
+        }
+        items = [(*key, value) for key, value in latest.items()]
+        if update_summaries:
+            replaced = SQLiteStorage._find_existing_values(cursor, items)
+            catalog = {}
+            for run_id, step, metrics in values:
+                SQLiteStorage._add_to_catalog(catalog, run_id, step, metrics)
+            SQLiteStorage._update_catalog(cursor, catalog)
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO metric_values (run_id, key_id, step, value)
+            VALUES (?, ?, ?, ?)
+            """,
+            items,
+        )
+        if update_summaries:
+            # Replaced values can't be taken out of the rollups they were added to,
+            # so those buckets are recomputed, and new values are added to the others.
+            stale = {
+                (run_id, key_id, level, SQLiteStorage._bucket(step, level))
+                for run_id, key_id, step in replaced
+                for level in ROLLUP_LEVELS
+            }
+            SQLiteStorage._update_rollups(cursor, items, skip=stale)
+            SQLiteStorage._recompute_rollups(cursor, stale)
+
+    @staticmethod
+    def _find_existing_values(
+        cursor: sqlite3.Cursor, items: list[tuple]
+    ) -> list[tuple[int, int, int]]:
+        """
+        Get the (run_id, key_id, step) of the (run_id, key_id, step, value) items that
+        are already in `metric_values`. Only items at or before the last step of their
+        metric in the catalog can be, which is rarely the case.
+        """
+        pairs = {(run_id, key_id) for run_id, key_id, _, _ in items}
+        last_steps = {}
+        for run_id, key_id in pairs:
+            cursor.execute(
+                "SELECT last_step FROM run_metric_keys WHERE run_id = ? AND key_id = ?",
+                (run_id, key_id),
+            )
+            row = cursor.fetchone()
+            if row is not None and row[0] is not None:
+                last_steps[(run_id, key_id)] = row[0]
+        existing = []
+        for run_id, key_id, step, _ in items:
+            if step > last_steps.get((run_id, key_id), -math.inf):
+                continue
+            cursor.execute(
+                """
+                SELECT 1 FROM metric_values
+                WHERE run_id = ? AND key_id = ? AND step = ?
+                """,
+                (run_id, key_id, step),
+            )
+            if cursor.fetchone() is not None:
+                existing.append((run_id, key_id, step))
+        return existing
+
+    @staticmethod
+    def _insert_rows(
+        cursor: sqlite3.Cursor, rows: list[tuple], ids: list[int] | None = None
+    ):
+        """
+        Insert (timestamp, project, run, step, metrics) rows into `metrics` and
+        `metric_values`, and update the `runs` table to match, as part of the caller's
+        transaction. The rows are given the ids in `ids`, if provided.
+        """
+        cursor.executemany(
+            """
+            INSERT INTO metrics
+            (id, timestamp, project_name, run_name, step, metrics)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (row_id, timestamp, project, run, step, json.dumps(metrics))
+                for row_id, (timestamp, project, run, step, metrics) in zip(
+                    ids or [None] * len(rows), rows
+                )
+            ],
+        )
+
+        runs = {}
+        for timestamp, project, run, step, _ in rows:
+            if (project, run) not in runs:
+                runs[(project, run)] = [timestamp, step, timestamp, 0]
+            summary = runs[(project, run)]
+            summary[1] = max(summary[1], step)
+            summary[2] = max(summary[2], timestamp)
+            summary[3] += 1
+        cursor.executemany(
+            """
+            INSERT INTO runs
+            (project_name, run_name, created_at, last_step, last_timestamp, row_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (project_name, run_name) DO UPDATE SET
+                last_step = MAX(COALESCE(last_step, excluded.last_step), excluded.last_step),
+                last_timestamp = MAX(COALESCE(last_timestamp, excluded.last_timestamp), excluded.last_timestamp),
+                row_count = row_count + excluded.row_count,
+                status = 'running'
+            """,
+            [(project, run, *summary) for (project, run), summary in runs.items()],
+        )
+
+        run_ids = {}
+        for project, run in runs:
+            cursor.execute(
+                "SELECT id FROM runs WHERE project_name = ? AND run_name = ?",
+                (project, run),
+            )
+            run_ids[(project, run)] = cursor.fetchone()[0]
+        SQLiteStorage._insert_values(
+            cursor,
+            [
+                (run_ids[(project, run)], step, metrics)
+                for _, project, run, step, metrics in rows
+            ],
+        )
 
     def _save_config(self):
         """Save the run configuration to the database."""
-        with self.scheduler.lock:
-            with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO configs (project_name, run_name, config) VALUES (?, ?, ?)",
+                (self.project, self.name, json.dumps(self.config)),
+            )
+            conn.commit()
+
+    def _load_last_step(self) -> int | None:
+        with get_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT last_step FROM runs WHERE project_name = ? AND run_name = ?",
+                (self.project, self.name),
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    @contextlib.contextmanager
+    def _assign_steps(self, steps: list[int | None]):
+        """
+        Fill in missing steps from the run's step counter. Explicit steps move the
+        counter forward, so that the next automatic step comes after them. If the
+        block that writes the steps fails, the counter is moved back, so that writing
+        them again (as when a batch is retried) gives them the same steps.
+        """
+        assigned = []
+        with self._step_lock:
+            first_step = self._next_step
+            for step in steps:
+                if step is None:
+                    step = self._next_step
+                self._next_step = max(self._next_step, step + 1)
+                assigned.append(step)
+            next_step = self._next_step
+        try:
+            yield assigned
+        except BaseException:
+            with self._step_lock:
+                # Unless steps were handed out meanwhile, in which case the failed
+                # ones are left unused.
+                if self._next_step == next_step:
+                    self._next_step = first_step
+            raise
+
+    def log(self, metrics: dict, step: int | None = None):
+        """Log metrics to the database. If `step` is not provided, the next step of the run is used."""
+        with self._assign_steps([step]) as (step,):
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT OR REPLACE INTO configs (project_name, run_name, config) VALUES (?, ?, ?)",
-                    (self.project, self.name, json.dumps(self.config)),
+                self._insert_rows(
+                    cursor,
+                    [
+                        (
+                            datetime.now().isoformat(),
+                            self.project,
+                            self.name,
+                            step,
+                            metrics,
+                        )
+                    ],
                 )
                 conn.commit()
 
-    def log(self, metrics: dict):
-        """Log metrics to the database."""
-        with self.scheduler.lock:
-            with sqlite3.connect(self.db_path) as conn:
+    @staticmethod
+    def bulk_log(project: str, logs: list[dict], dataset_id: str | None = None):
+        """
+        Log many metrics records to the database in a single transaction. Each record
+        is a dict with a "run" name and a "metrics" dict, and optionally a "step" (int)
+        and a "timestamp" (ISO format string). Records without a step are numbered
+        after the last step of their run, in the order they are given.
+        """
+        if not logs:
+            return
+        storages = {}
+        steps = {}
+        for log in logs:
+            run = log["run"]
+            if run not in storages:
+                storages[run] = SQLiteStorage.get_storage(project, run, dataset_id)
+                steps[run] = []
+            steps[run].append(log.get("step"))
+        with contextlib.ExitStack() as stack:
+            steps = {
+                run: iter(stack.enter_context(storages[run]._assign_steps(run_steps)))
+                for run, run_steps in steps.items()
+            }
+
+            rows = []
+            for log in logs:
+                run = log["run"]
+                rows.append(
+                    (
+                        log.get("timestamp") or datetime.now().isoformat(),
+                        project,
+                        run,
+                        next(steps[run]),
+                        log["metrics"],
+                    )
+                )
+
+            storage = next(iter(storages.values()))
+            with get_connection(storage.db_path) as conn:
                 cursor = conn.cursor()
+                SQLiteStorage._insert_rows(cursor, rows)
+                conn.commit()
+
+    @staticmethod
+    def export_rows(
+        db_path: str,
+        after_id: int = 0,
+        last_id: int | None = None,
+        batch_size: int = 10_000,
+    ):
+        """
+        Iterate over the rows of the `metrics` table of a database file with ids in
+        (`after_id`, `last_id`], in batches of (id, timestamp, project, run, step,
+        metrics JSON) tuples. The rows of `metrics` are never changed once inserted,
+        which is what lets them be synced incrementally.
+        """
+        conn = get_connection(db_path)
+        reader = conn.execute(
+            """
+            SELECT id, timestamp, project_name, run_name, step, metrics
+            FROM metrics WHERE id > ? AND id <= ? ORDER BY id
+            """,
+            (after_id, math.inf if last_id is None else last_id),
+        )
+        while rows := reader.fetchmany(batch_size):
+            yield rows
+
+    @staticmethod
+    def get_last_row_id(db_path: str) -> int:
+        """The id of the last row of the `metrics` table of a database file, or 0."""
+        row = get_connection(db_path).execute("SELECT MAX(id) FROM metrics").fetchone()
+        return row[0] or 0
 
+    @staticmethod
+    def reserve_row_ids(db_path: str, last_id: int) -> None:
+        """
+        Make the rows inserted into a database file from now on get ids above
+        `last_id`, so that rows imported later with ids up to `last_id` don't clash
+        with them.
+        """
+        SQLiteStorage._ensure_db(db_path)
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'metrics'",
+                (last_id,),
+            )
+            if cursor.rowcount == 0:
                 cursor.execute(
-                    """
-                    SELECT MAX(step) 
-                    FROM metrics 
-                    WHERE project_name = ? AND run_name = ?
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES ('metrics', ?)",
+                    (last_id,),
+                )
+            conn.commit()
+
+    @staticmethod
+    def reload_steps(db_path: str) -> None:
+        """
+        Move the step counters of the cached writers of a database file past the last
+        steps of their runs, as needed once rows were imported into it.
+        """
+        with _registry_lock:
+            storages = [s for s in _storages.values() if s.db_path == db_path]
+        for storage in storages:
+            last_step = storage._load_last_step()
+            if last_step is not None:
+                with storage._step_lock:
+                    storage._next_step = max(storage._next_step, last_step + 1)
+
+    @staticmethod
+    def import_rows(db_path: str, rows: list[tuple]) -> int:
+        """
+        Insert rows exported by `export_rows` into a database file, keeping their ids,
+        and skipping the rows that it already has. Returns the number of rows inserted.
+        """
+        SQLiteStorage._ensure_db(db_path)
+        if not rows:
+            return 0
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM metrics WHERE id BETWEEN ? AND ?",
+                (min(row[0] for row in rows), max(row[0] for row in rows)),
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            rows = [row for row in rows if row[0] not in existing]
+            SQLiteStorage._insert_rows(
+                cursor,
+                [
+                    (timestamp, project, run, step, json.loads(metrics))
+                    for _, timestamp, project, run, step, metrics in rows
+                ],
+                ids=[row[0] for row in rows],
+            )
+            conn.commit()
+        return len(rows)
+
+    @staticmethod
+    def export_runs(db_path: str) -> list[dict]:
+        """
+        Get the state of the runs of a database file that can change after they are
+        created: their "status" and "config" (None if they have none), along with their
+        "project", "run" name and "created_at" time.
+        """
+        conn = get_connection(db_path)
+        runs = {
+            (project, run): {
+                "project": project,
+                "run": run,
+                "created_at": created_at,
+                "status": status,
+                "config": None,
+            }
+            for project, run, created_at, status in conn.execute(
+                "SELECT project_name, run_name, created_at, status FROM runs ORDER BY id"
+            )
+        }
+        for project, run, config in conn.execute(
+            "SELECT project_name, run_name, config FROM configs"
+        ):
+            run_state = runs.setdefault(
+                (project, run),
+                {"project": project, "run": run, "created_at": None, "status": None},
+            )
+            run_state["config"] = json.loads(config)
+        return list(runs.values())
+
+    @staticmethod
+    def import_runs(db_path: str, runs: list[dict]) -> None:
+        """Restore the state of runs exported by `export_runs` into a database file."""
+        SQLiteStorage._ensure_db(db_path)
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            for run in runs:
+                if run["config"] is not None:
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO configs (project_name, run_name, config) VALUES (?, ?, ?)",
+                        (run["project"], run["run"], json.dumps(run["config"])),
+                    )
+                if run["status"] is not None:
+                    cursor.execute(
+                        """
+                        UPDATE runs SET status = ?, created_at = ?
+                        WHERE project_name = ? AND run_name = ?
+                        """,
+                        (run["status"], run["created_at"], run["project"], run["run"]),
+                    )
+            conn.commit()
+
+    @staticmethod
+    def get_metrics(
+        project: str, run: str, since_step: int | None = None
+    ) -> list[dict]:
+        """
+        Retrieve metrics for a specific run. The metrics also include the step count (int) and the timestamp (datetime object).
+        If `since_step` is provided, only the metrics logged at later steps are returned.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return []
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT timestamp, step, metrics
+                FROM metrics
+                WHERE project_name = ? AND run_name = ?
+            """
+            params = [project, run]
+            if since_step is not None:
+                query += " AND step > ?"
+                params.append(since_step)
+            cursor.execute(query + " ORDER BY timestamp", params)
+            return SQLiteStorage._rows_to_metrics(cursor.fetchall())
+
+    @staticmethod
+    def get_metrics_frame(
+        project: str,
+        runs: list[str],
+        metrics: list[str] | None = None,
+        step_range: tuple[int | None, int | None] | None = None,
+    ):
+        """
+        Read the numeric metrics of several runs as a pandas DataFrame with one row per
+        run and step, ordered by run (in the order of `runs`) and step: a "run" and a
+        "step" column, a "timestamp" column, and one float column per metric, NaN
+        where it was not logged (or not finite). If `metrics` is given, only those
+        columns (which may include "timestamp") are read. If `step_range` is given,
+        only the steps between its two ends (inclusive, either may be None) are read.
+        The columns are built with NumPy straight from `metric_values`, so no logged
+        row is decoded into a dict.
+        """
+        import numpy as np
+        import pandas as pd
+
+        with_timestamps = metrics is None or "timestamp" in metrics
+        names = None
+        if metrics is not None:
+            names = [m for m in metrics if m not in ("run", "step", "timestamp")]
+        index_columns = (
+            ["run", "step", "timestamp"] if with_timestamps else ["run", "step"]
+        )
+        empty = pd.DataFrame(columns=index_columns)
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None or not runs or names == [] and not with_timestamps:
+            return empty
+
+        first_step, last_step = step_range or (None, None)
+        step_clauses, step_params = "", []
+        if first_step is not None:
+            step_clauses += " AND step >= ?"
+            step_params.append(int(first_step))
+        if last_step is not None:
+            step_clauses += " AND step <= ?"
+            step_params.append(int(last_step))
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT run_name, id FROM runs
+                WHERE project_name = ? AND run_name IN ({", ".join("?" * len(runs))})
+                """,
+                [project, *runs],
+            )
+            run_ids = dict(cursor.fetchall())
+            runs = [run for run in runs if run in run_ids]
+            if not runs:
+                return empty
+
+            # The values of each metric of each run, as (steps, values) arrays.
+            series = {}
+            key_names = {}
+            if names != []:
+                query = f"""
+                    SELECT c.run_id, c.key_id, k.name, c.count,
+                        (SELECT MIN(step) FROM metric_values v
+                         WHERE v.run_id = c.run_id AND v.key_id = c.key_id),
+                        (SELECT MAX(step) FROM metric_values v
+                         WHERE v.run_id = c.run_id AND v.key_id = c.key_id)
+                    FROM run_metric_keys c
+                    JOIN metric_keys k ON k.id = c.key_id
+                    WHERE c.run_id IN ({", ".join("?" * len(runs))})
+                """
+                params = [run_ids[run] for run in runs]
+                if names is not None:
+                    query += f" AND k.name IN ({', '.join('?' * len(names))})"
+                    params.extend(names)
+                cursor.execute(query, params)
+                sparse = set()
+                # Non-finite values are stored as NULL, so infinity stands in for them
+                # without a separate column, which sqlite3 would convert on every row.
+                for run_id, key_id, name, count, first, last in cursor.fetchall():
+                    if first is None:  # no numeric values
+                        continue
+                    low = first if first_step is None else max(first, int(first_step))
+                    high = last if last_step is None else min(last, int(last_step))
+                    if low > high:
+                        continue
+                    key_names[key_id] = name
+                    # Metrics logged at every step (most of them) are read as a single
+                    # column of values, as their steps follow from how many there are.
+                    if count == last - first + 1:
+                        values = np.fromiter(
+                            (
+                                value
+                                for (value,) in conn.execute(
+                                    """
+                                    SELECT IFNULL(value, 1e999) FROM metric_values
+                                    WHERE run_id = ? AND key_id = ?
+                                    AND step BETWEEN ? AND ?
+                                    """,
+                                    (run_id, key_id, low, high),
+                                )
+                            ),
+                            dtype=np.float64,
+                        )
+                        if len(values) == high - low + 1:
+                            series[(run_id, key_id)] = (
+                                np.arange(low, high + 1),
+                                values,
+                            )
+                            continue
+                    sparse.add((run_id, key_id))
+
+                # The other metrics are read together, for all runs at once.
+                if sparse:
+                    sparse_runs = sorted({run_id for run_id, _ in sparse})
+                    sparse_keys = sorted({key_id for _, key_id in sparse})
+                    cursor.execute(
+                        f"""
+                        SELECT run_id, key_id, step, IFNULL(value, 1e999)
+                        FROM metric_values
+                        WHERE run_id IN ({", ".join("?" * len(sparse_runs))})
+                        AND key_id IN ({", ".join("?" * len(sparse_keys))})
+                        {step_clauses}
+                        ORDER BY run_id, key_id, step
+                        """,
+                        [*sparse_runs, *sparse_keys, *step_params],
+                    )
+                    rows = np.fromiter(
+                        cursor,
+                        dtype=[
+                            ("run_id", np.int64),
+                            ("key_id", np.int64),
+                            ("step", np.int64),
+                            ("value", np.float64),
+                        ],
+                    )
+                    starts = np.flatnonzero(
+                        np.diff(rows["run_id"], prepend=-1)
+                        | np.diff(rows["key_id"], prepend=-1)
+                    )
+                    for start, end in zip(starts, [*starts[1:], len(rows)]):
+                        pair = (int(rows["run_id"][start]), int(rows["key_id"][start]))
+                        if pair in sparse:
+                            series[pair] = (
+                                rows["step"][start:end],
+                                rows["value"][start:end],
+                            )
+
+            timestamps = None
+            if with_timestamps:
+                cursor.execute(
+                    f"""
+                    SELECT run_name, step, timestamp
+                    FROM metrics
+                    WHERE project_name = ?
+                    AND run_name IN ({", ".join("?" * len(runs))}){step_clauses}
                     """,
-                    (self.project, self.name),
+                    [project, *runs, *step_params],
+                )
+                timestamps = pd.DataFrame(
+                    cursor.fetchall(), columns=["run", "step", "timestamp"]
+                )
+                # A step logged more than once is timed by its last row.
+                timestamps = timestamps.sort_values("timestamp", kind="stable")
+                timestamps = timestamps.drop_duplicates(["run", "step"], keep="last")
+                timestamps["timestamp"] = pd.to_datetime(
+                    timestamps["timestamp"], format="ISO8601"
                 )
-                last_step = cursor.fetchone()[0]
-                current_step = 0 if last_step is None else last_step + 1
 
-                current_timestamp = datetime.now().isoformat()
+        if not series:
+            if timestamps is None:
+                return empty
+            # Order the rows like `runs`, as they are when read from the values.
+            position = timestamps["run"].map({run: i for i, run in enumerate(runs)})
+            order = np.lexsort((timestamps["step"].to_numpy(), position.to_numpy()))
+            return timestamps.iloc[order].reset_index(drop=True)
 
+        if names is None:
+            columns = sorted(key_names)
+        else:
+            ids = {name: key_id for key_id, name in key_names.items()}
+            columns = [ids[name] for name in dict.fromkeys(names) if name in ids]
+        column_positions = {key_id: i for i, key_id in enumerate(columns)}
+        by_run = {}
+        for (run_id, key_id), (steps, values) in series.items():
+            by_run.setdefault(run_id, []).append(
+                (column_positions[key_id], steps, values)
+            )
+
+        # Align the series of each run on the steps that any of them was logged at.
+        run_names, run_steps, tables = [], [], []
+        for run in runs:
+            run_series = by_run.get(run_ids[run])
+            if not run_series:
+                continue
+            steps = np.unique(np.concatenate([s for _, s, _ in run_series]))
+            table = np.full((len(steps), len(columns)), np.nan)
+            for column, series_steps, values in run_series:
+                table[np.searchsorted(steps, series_steps), column] = values
+            run_names.append(run)
+            run_steps.append(steps)
+            tables.append(table)
+        table = np.concatenate(tables)
+        table[np.isinf(table)] = np.nan
+
+        frame = pd.DataFrame(
+            {
+                "run": np.repeat(
+                    np.array(run_names, dtype=object), [len(s) for s in run_steps]
+                ),
+                "step": np.concatenate(run_steps),
+            }
+        )
+        if timestamps is not None:
+            frame = frame.merge(timestamps, on=["run", "step"], how="left")
+        metric_frame = pd.DataFrame(table, columns=[key_names[k] for k in columns])
+        return pd.concat([frame, metric_frame], axis=1)
+
+    @staticmethod
+    def count_rows(project: str, run: str, min_step: int | None = None) -> int:
+        """
+        Count the rows logged by a run, or only those logged at `min_step` or later.
+        Comparing the two tells whether the rows added since a run was read were all
+        logged after the steps that were read.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return 0
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            if min_step is None:
+                cursor.execute(
+                    "SELECT row_count FROM runs WHERE project_name = ? AND run_name = ?",
+                    (project, run),
+                )
+            else:
                 cursor.execute(
                     """
-                    INSERT INTO metrics 
-                    (timestamp, project_name, run_name, step, metrics)
-                    VALUES (?, ?, ?, ?, ?)
+                    SELECT COUNT(*) FROM metrics
+                    WHERE project_name = ? AND run_name = ? AND step >= ?
                     """,
-                    (
-                        current_timestamp,
-                        self.project,
-                        self.name,
-                        current_step,
-                        json.dumps(metrics),
-                    ),
+                    (project, run, min_step),
                 )
-                conn.commit()
+            row = cursor.fetchone()
+            return row[0] if row else 0
 
     @staticmethod
-    def get_metrics(project: str, run: str) -> list[dict]:
-        """Retrieve metrics for a specific run. The metrics also include the step count (int) and the timestamp (datetime object)."""
-        db_path = SQLiteStorage._get_project_db_path(project)
-        if not os.path.exists(db_path):
+    def _rows_to_metrics(rows: list[tuple]) -> list[dict]:
+        results = []
+        for timestamp, step, metrics_json in rows:
+            metrics = json.loads(metrics_json)
+            metrics["timestamp"] = timestamp
+            metrics["step"] = step
+            results.append(metrics)
+        return results
+
+    @staticmethod
+    def _get_run_id(cursor: sqlite3.Cursor, project: str, run: str) -> int | None:
+        cursor.execute(
+            "SELECT id FROM runs WHERE project_name = ? AND run_name = ?",
+            (project, run),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def get_metric_types(project: str, runs: list[str] | None = None) -> dict[str, str]:
+        """
+        Get the metric keys logged by the given runs (or by any run of the project) and
+        the type of their values: "number", "bool", "string", "object", or "mixed" if
+        values of different types were logged under the same key.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return {}
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT k.name, c.type
+                FROM run_metric_keys c
+                JOIN metric_keys k ON k.id = c.key_id
+                JOIN runs r ON r.id = c.run_id
+                WHERE r.project_name = ?
+            """
+            params = [project]
+            if runs is not None:
+                if not runs:
+                    return {}
+                query += f" AND r.run_name IN ({', '.join('?' * len(runs))})"
+                params.extend(runs)
+            cursor.execute(query, params)
+            types = {}
+            for name, value_type in cursor.fetchall():
+                known_type = types.setdefault(name, value_type)
+                if known_type != value_type:
+                    types[name] = "mixed"
+            return types
+
+    @staticmethod
+    def get_metric_stats(
+        project: str, runs: list[str]
+    ) -> dict[str, dict[str, tuple[int, int | None]]]:
+        """
+        Get the number of values logged for each metric key of the given runs and the
+        last step they were logged at, as {run: {metric: (count, last step)}}. These
+        change whenever new values are logged, so they tell which metrics to reload.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None or not runs:
+            return {}
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT r.run_name, k.name, c.count, c.last_step
+                FROM run_metric_keys c
+                JOIN metric_keys k ON k.id = c.key_id
+                JOIN runs r ON r.id = c.run_id
+                WHERE r.project_name = ? AND r.run_name IN ({", ".join("?" * len(runs))})
+                """,
+                [project, *runs],
+            )
+            stats = {}
+            for run, name, count, last_step in cursor.fetchall():
+                stats.setdefault(run, {})[name] = (count, last_step)
+            return stats
+
+    @staticmethod
+    def get_metric_names(project: str, runs: list[str] | None = None) -> list[str]:
+        """Get the names of the numeric metrics logged by the given runs (or by any run of the project)."""
+        types = SQLiteStorage.get_metric_types(project, runs)
+        return sorted(
+            name for name, value_type in types.items() if value_type == "number"
+        )
+
+    @staticmethod
+    def get_metric_values(
+        project: str, run: str, metric: str
+    ) -> list[tuple[int, float | None]]:
+        """Get the (step, value) pairs of one numeric metric of a run, ordered by step."""
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
             return []
 
-        with sqlite3.connect(db_path) as conn:
+        with get_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                SELECT timestamp, step, metrics
-                FROM metrics
-                WHERE project_name = ? AND run_name = ?
-                ORDER BY timestamp
+                SELECT v.step, v.value
+                FROM metric_values v
+                JOIN runs r ON r.id = v.run_id
+                JOIN metric_keys k ON k.id = v.key_id
+                WHERE r.project_name = ? AND r.run_name = ? AND k.name = ?
+                ORDER BY v.step
                 """,
-                (project, run),
+                (project, run, metric),
             )
-            rows = cursor.fetchall()
+            return cursor.fetchall()
+
+    @staticmethod
+    def get_metric_summary(
+        project: str, run: str, metrics: list[str] | None = None
+    ) -> dict[str, dict]:
+        """
+        Get the count, min, max and last value (at the highest step) of the numeric
+        metrics of a run, computed in SQLite.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return {}
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            run_id = SQLiteStorage._get_run_id(cursor, project, run)
+            if run_id is None:
+                return {}
+            cursor.execute(
+                """
+                SELECT k.name, COUNT(v.value), MIN(v.value), MAX(v.value),
+                    (SELECT value FROM metric_values
+                     WHERE run_id = v.run_id AND key_id = v.key_id
+                     ORDER BY step DESC LIMIT 1)
+                FROM metric_values v
+                JOIN metric_keys k ON k.id = v.key_id
+                WHERE v.run_id = ?
+                GROUP BY v.key_id
+                """,
+                (run_id,),
+            )
+            summary = {
+                name: {"count": count, "min": min_, "max": max_, "last": last}
+                for name, count, min_, max_, last in cursor.fetchall()
+            }
+        if metrics is not None:
+            summary = {name: summary[name] for name in metrics if name in summary}
+        return summary
 
-            results = []
-            for row in rows:
-                timestamp, step, metrics_json = row
-                metrics = json.loads(metrics_json)
-                metrics["timestamp"] = timestamp
-                metrics["step"] = step
-                results.append(metrics)
-            return results
+    @staticmethod
+    def choose_rollup_level(n_steps: int, n_points: int) -> int | None:
+        """
+        Get the coarsest rollup level that still gives at least `n_points` buckets over
+        `n_steps` steps, or None if the raw values are needed for that resolution.
+        """
+        levels = [level for level in ROLLUP_LEVELS if n_steps // level >= n_points]
+        return max(levels) if levels else None
+
+    @staticmethod
+    def get_metric_rollups(
+        project: str,
+        run: str,
+        metric: str,
+        level: int,
+        step_range: tuple[int, int] | None = None,
+    ) -> list[tuple]:
+        """
+        Get the rollups of one metric of a run at the given level (one of ROLLUP_LEVELS),
+        as (first step of the bucket, count, min, max, mean, last) tuples ordered by
+        step. If `step_range` is provided, only the buckets overlapping it are returned.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return []
+
+        first, last = step_range if step_range is not None else (None, None)
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT u.bucket * u.level, u.count, u.min, u.max, u.sum / u.count, u.last
+                FROM metric_rollups u
+                JOIN runs r ON r.id = u.run_id
+                JOIN metric_keys k ON k.id = u.key_id
+                WHERE r.project_name = ? AND r.run_name = ? AND k.name = ?
+                    AND u.level = ?
+                    AND (? IS NULL OR u.bucket >= ?)
+                    AND (? IS NULL OR u.bucket <= ?)
+                ORDER BY u.bucket
+                """,
+                (
+                    project,
+                    run,
+                    metric,
+                    level,
+                    first,
+                    None if first is None else SQLiteStorage._bucket(first, level),
+                    last,
+                    None if last is None else SQLiteStorage._bucket(last, level),
+                ),
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def rebuild_rollups(project: str) -> None:
+        """Recompute all the rollups of a project from its metric values."""
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return
+        with get_connection(db_path) as conn:
+            SQLiteStorage._rebuild_rollups(conn.cursor())
+            conn.commit()
 
     @staticmethod
     def get_projects() -> list[str]:
-        """Get list of all projects by scanning database files."""
-        projects = []
-        if not os.path.exists(TRACKIO_DIR):
-            return projects
+        """Get the names of all projects, from the project catalog."""
+        return sorted({entry["name"] for entry in SQLiteStorage.get_project_catalog()})
 
-        db_files = glob.glob(os.path.join(TRACKIO_DIR, "*.db"))
+    @staticmethod
+    def get_project_catalog() -> list[dict]:
+        """
+        List the projects in TRACKIO_DIR, each as a dict with its "name", "db_path",
+        "run_count", "last_updated" time and database "size" in bytes. The list is read
+        from a small index, in which only the databases whose files changed since they
+        were last indexed (as told by their size and modification time) are updated,
+        so listing projects doesn't open every database.
+        """
+        if not os.path.exists(TRACKIO_DIR):
+            return []
+        versions = {}
+        for db_path in glob.glob(os.path.join(TRACKIO_DIR, "*.db")):
+            version = SQLiteStorage._get_file_version(db_path)
+            if version is not None:
+                versions[os.path.basename(db_path)] = json.dumps(version)
 
-        for db_file in db_files:
-            try:
-                with sqlite3.connect(db_file) as conn:
-                    cursor = conn.cursor()
+        catalog_path = os.path.join(TRACKIO_DIR, CATALOG_FILE)
+        with get_connection(catalog_path) as conn:
+            cursor = conn.cursor()
+            if catalog_path not in _initialized_db_paths:
+                SQLiteStorage._create_catalog_tables(cursor)
+                with _registry_lock:
+                    _initialized_db_paths.add(catalog_path)
+            indexed = dict(cursor.execute("SELECT db_file, version FROM catalog_files"))
+            stale = [name for name in versions if indexed.get(name) != versions[name]]
+            removed = [name for name in indexed if name not in versions]
+            if stale or removed:
+                cursor.execute("BEGIN IMMEDIATE")
+                for name in removed:
                     cursor.execute(
-                        "SELECT name FROM sqlite_master WHERE type='table' AND name='metrics'"
+                        "DELETE FROM catalog_files WHERE db_file = ?", (name,)
                     )
-                    if cursor.fetchone():
-                        cursor.execute("SELECT DISTINCT project_name FROM metrics")
-                        project_names = [row[0] for row in cursor.fetchall()]
-                        projects.extend(project_names)
-            except sqlite3.Error:
+                    cursor.execute("DELETE FROM projects WHERE db_file = ?", (name,))
+                for name in stale:
+                    SQLiteStorage._index_database(cursor, name, versions[name])
+                conn.commit()
+            cursor.execute(
+                """
+                SELECT project_name, db_file, run_count, last_updated, size
+                FROM projects ORDER BY project_name
+                """
+            )
+            return [
+                {
+                    "name": name,
+                    "db_path": os.path.join(TRACKIO_DIR, db_file),
+                    "run_count": run_count,
+                    "last_updated": last_updated,
+                    "size": size,
+                }
+                for name, db_file, run_count, last_updated, size in cursor.fetchall()
+            ]
+
+    @staticmethod
+    def _create_catalog_tables(cursor: sqlite3.Cursor):
+        # The version of each database file when it was last indexed, and the projects
+        # in each.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_files (
+                db_file TEXT PRIMARY KEY,
+                version TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS projects (
+                db_file TEXT NOT NULL,
+                project_name TEXT NOT NULL,
+                run_count INTEGER NOT NULL,
+                last_updated TEXT,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (db_file, project_name)
+            )
+        """)
+
+    @staticmethod
+    def _index_database(cursor: sqlite3.Cursor, db_file: str, version: str):
+        """Update the catalog entries of a database file, as part of the caller's transaction."""
+        db_path = os.path.join(TRACKIO_DIR, db_file)
+        cursor.execute("DELETE FROM projects WHERE db_file = ?", (db_file,))
+        try:
+            SQLiteStorage._ensure_db(db_path)
+            projects = (
+                get_connection(db_path)
+                .execute(
+                    """
+                    SELECT project_name, COUNT(*), MAX(last_timestamp)
+                    FROM runs GROUP BY project_name
+                    """
+                )
+                .fetchall()
+            )
+        except sqlite3.Error:
+            projects = []
+        size = sum(
+            os.path.getsize(path)
+            for path in (db_path, db_path + "-wal")
+            if os.path.exists(path)
+        )
+        cursor.executemany(
+            """
+            INSERT INTO projects (db_file, project_name, run_count, last_updated, size)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [(db_file, *project, size) for project in projects],
+        )
+        # Indexed with the version from before the database was read, so that a write
+        # made since then is picked up by the next listing.
+        cursor.execute(
+            "INSERT OR REPLACE INTO catalog_files (db_file, version) VALUES (?, ?)",
+            (db_file, version),
+        )
+
+    @staticmethod
+    def _get_file_version(db_path: str) -> tuple | None:
+        """
+        Get a cheap signature of a database, from the size and modification time of its
+        files, that changes whenever anything is written to it. Returns None if the
+        database doesn't exist.
+        """
+        version = []
+        for path in (db_path, db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                if path == db_path:
+                    return None
+                version.append(None)
                 continue
+            version.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        return tuple(version)
 
-        return list(set(projects))
+    @staticmethod
+    def get_project_version(project: str) -> tuple | None:
+        """
+        Get a cheap signature of a project's database, from the size and modification
+        time of its files, that changes whenever anything is written to it. Returns
+        None if the project has no database.
+        """
+        return SQLiteStorage._get_file_version(
+            SQLiteStorage._get_project_db_path(project)
+        )
 
     @staticmethod
     def get_runs(project: str) -> list[str]:
         """Get list of all runs for a project."""
-        db_path = SQLiteStorage._get_project_db_path(project)
-        if not os.path.exists(db_path):
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
             return []
 
-        with sqlite3.connect(db_path) as conn:
+        with get_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT DISTINCT run_name FROM metrics WHERE project_name = ?",
+                "SELECT run_name FROM runs WHERE project_name = ? ORDER BY id",
                 (project,),
             )
             return [row[0] for row in cursor.fetchall()]
 
+    @staticmethod
+    def _json_path(key: str) -> str:
+        """The JSON path of a top-level key of a config, for `json_extract`."""
+        return '$."{}"'.format(key.replace('"', '\\"'))
+
+    @staticmethod
+    def search_runs(
+        project: str,
+        query: str | None = None,
+        regex: bool = False,
+        config_filters: dict | None = None,
+        sort: str = "created",
+        descending: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[list[str], int]:
+        """
+        Search the runs of a project, returning a page of `limit` run names starting at
+        `offset`, along with the number of runs that match.
+
+        Runs match if their name contains `query` (ignoring case), or matches it as a
+        regular expression if `regex` is True, and if their config has the values in
+        `config_filters`. Runs are sorted by one of RUN_SORT_COLUMNS, by the last,
+        minimum or maximum value of a metric with `sort="metric:<name>"`,
+        `"min:<name>"` or `"max:<name>"`, or by a config value with
+        `sort="config:<key>"`. Runs without the metric or config key come last.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None:
+            return [], 0
+
+        conditions = ["r.project_name = ?"]
+        params = [project]
+        if query and regex:
+            try:
+                _compile_regex(query)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression {query!r}: {e}") from e
+            conditions.append("r.run_name REGEXP ?")
+            params.append(query)
+        elif query:
+            escaped = re.sub(r"([\\%_])", r"\\\1", query)
+            conditions.append("r.run_name LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        for key, value in (config_filters or {}).items():
+            if isinstance(value, (list, dict)):
+                # json_extract returns lists and dicts as minified JSON text.
+                conditions.append("json_extract(c.config, ?) = json(?)")
+                value = json.dumps(value)
+            else:
+                conditions.append("json_extract(c.config, ?) = ?")
+            params.extend([SQLiteStorage._json_path(key), value])
+        from_clause = """
+            FROM runs r
+            LEFT JOIN configs c
+            ON c.project_name = r.project_name AND c.run_name = r.run_name
+            WHERE """ + " AND ".join(conditions)
+
+        direction = "DESC" if descending else "ASC"
+        kind, _, name = sort.partition(":")
+        order_by = f"sort_value IS NULL, sort_value {direction}, r.id {direction}"
+        if kind == "metric":
+            sort_column = """(
+                SELECT v.value FROM metric_values v
+                WHERE v.run_id = r.id
+                AND v.key_id = (SELECT id FROM metric_keys WHERE name = ?)
+                ORDER BY v.step DESC LIMIT 1
+            )"""
+            sort_params = [name]
+        elif kind in ("min", "max"):
+            # Read from the coarsest rollups, which have one row per 1000 steps.
+            sort_column = f"""(
+                SELECT {kind.upper()}(m.{kind}) FROM metric_rollups m
+                WHERE m.run_id = r.id AND m.level = ?
+                AND m.key_id = (SELECT id FROM metric_keys WHERE name = ?)
+            )"""
+            sort_params = [ROLLUP_LEVELS[-1], name]
+        elif kind == "config":
+            sort_column = "json_extract(c.config, ?)"
+            sort_params = [SQLiteStorage._json_path(name)]
+        elif sort in RUN_SORT_COLUMNS:
+            sort_column = RUN_SORT_COLUMNS[sort]
+            sort_params = []
+            order_by = f"sort_value {direction}, r.id {direction}"
+        else:
+            raise ValueError(
+                f"Unknown sort: {sort}. Use one of {list(RUN_SORT_COLUMNS)}, "
+                "'metric:<name>', 'min:<name>', 'max:<name>' or 'config:<key>'."
+            )
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) {from_clause}", params)
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"""
+                SELECT r.run_name, {sort_column} AS sort_value {from_clause}
+                ORDER BY {order_by}
+                LIMIT ? OFFSET ?
+                """,
+                [*sort_params, *params, -1 if limit is None else limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()], total
+
+    @staticmethod
+    def get_run_summaries(
+        project: str, runs: list[str], metrics: list[str] | None = None
+    ) -> dict[str, dict]:
+        """
+        Summarize each of the given runs as a dict with its "status", "last_step",
+        "config", and the "count", "min", "max" and "last" value of each of `metrics`
+        (all numeric metrics if None) under "metrics". These are aggregated in SQLite
+        from the coarsest rollups, so no metric values are read.
+        """
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if db_path is None or not runs:
+            return {}
+
+        summaries = {}
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            run_placeholders = ", ".join("?" * len(runs))
+            cursor.execute(
+                f"""
+                SELECT r.run_name, r.status, r.last_step, c.config
+                FROM runs r
+                LEFT JOIN configs c
+                ON c.project_name = r.project_name AND c.run_name = r.run_name
+                WHERE r.project_name = ? AND r.run_name IN ({run_placeholders})
+                """,
+                [project, *runs],
+            )
+            for run, status, last_step, config in cursor.fetchall():
+                summaries[run] = {
+                    "status": status,
+                    "last_step": last_step,
+                    "config": json.loads(config) if config else {},
+                    "metrics": {},
+                }
+
+            query = f"""
+                SELECT r.run_name, k.name, SUM(m.count), MIN(m.min), MAX(m.max),
+                    (SELECT l.last FROM metric_rollups l
+                     WHERE l.run_id = m.run_id AND l.key_id = m.key_id
+                     AND l.level = m.level
+                     ORDER BY l.bucket DESC LIMIT 1)
+                FROM metric_rollups m
+                JOIN runs r ON r.id = m.run_id
+                JOIN metric_keys k ON k.id = m.key_id
+                WHERE m.level = ? AND r.project_name = ?
+                AND r.run_name IN ({run_placeholders})
+            """
+            params = [ROLLUP_LEVELS[-1], project, *runs]
+            if metrics is not None:
+                if not metrics:
+                    return summaries
+                query += f" AND k.name IN ({', '.join('?' * len(metrics))})"
+                params.extend(metrics)
+            cursor.execute(query + " GROUP BY m.run_id, m.key_id", params)
+            for run, name, count, min_, max_, last in cursor.fetchall():
+                summaries[run]["metrics"][name] = {
+                    "count": count,
+                    "min": min_,
+                    "max": max_,
+                    "last": last,
+                }
+        return summaries
+
+    @staticmethod
+    def get_last_steps(project: str, runs: list[str]) -> dict[str, int]:
+        """Get the last logged step of each of the given runs (0 if nothing was logged)."""
+        last_steps = {run: 0 for run in runs}
+        db_path = SQLiteStorage._get_existing_db_path(project)
+        if not runs or db_path is None:
+            return last_steps
+
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" * len(runs))
+            cursor.execute(
+                f"""
+                SELECT run_name, last_step
+                FROM runs
+                WHERE project_name = ? AND run_name IN ({placeholders})
+                """,
+                (project, *runs),
+            )
+            for run, last_step in cursor.fetchall():
+                last_steps[run] = last_step or 0
+        return last_steps
+
     def finish(self):
-        """Cleanup when run is finished."""
-        pass
+        """Mark the run as finished."""
+        if not os.path.exists(self.db_path):
+            return
+        with get_connection(self.db_path) as conn:
+            conn.execute(
+                "UPDATE runs SET status = 'finished' WHERE project_name = ? AND run_name = ?",
+                (self.project, self.name),
+            )
+            conn.commit()
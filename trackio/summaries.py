@@ -0,0 +1,68 @@
+from typing import Any
+
+import pandas as pd
+
+try:
+    from trackio.sqlite_storage import SQLiteStorage
+    from trackio.utils import RESERVED_KEYS
+except:  # noqa: E722
+    from sqlite_storage import SQLiteStorage
+    from utils import RESERVED_KEYS
+
+# The statistics of each metric given a column in a summary, as "<stat>(<metric>)".
+STATS = ("last", "min", "max")
+
+
+def get_summary(
+    project: str,
+    metrics: list[str] | None = None,
+    query: str | None = None,
+    regex: bool = False,
+    config_filters: dict[str, Any] | None = None,
+    sort: str = "created",
+    descending: bool = False,
+    limit: int | None = None,
+    offset: int = 0,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Summarize a page of the runs of a project, one row per run: its name, status and
+    last step, one column per config key, and the last, minimum and maximum value of
+    each of `metrics` (all numeric metrics if None). The runs are searched, sorted and
+    paginated as in `SQLiteStorage.search_runs`, and the statistics are aggregated in
+    SQLite, so this never reads the history of a metric. Returns the page and the
+    number of runs that match.
+    """
+    runs, total = SQLiteStorage.search_runs(
+        project,
+        query,
+        regex=regex,
+        config_filters=config_filters,
+        sort=sort,
+        descending=descending,
+        limit=limit,
+        offset=offset,
+    )
+    summaries = SQLiteStorage.get_run_summaries(project, runs, metrics)
+
+    rows = []
+    config_keys = {}
+    metric_names = {} if metrics is None else dict.fromkeys(metrics)
+    for run in runs:
+        summary = summaries.get(run)
+        if summary is None:
+            continue
+        row = {"run": run, "status": summary["status"], "step": summary["last_step"]}
+        for key, value in summary["config"].items():
+            if key in RESERVED_KEYS or key in row:
+                continue
+            config_keys[key] = None
+            row[key] = value
+        for metric, stats in summary["metrics"].items():
+            metric_names[metric] = None
+            for stat in STATS:
+                row[f"{stat}({metric})"] = stats[stat]
+        rows.append(row)
+
+    columns = ["run", "status", "step", *config_keys]
+    columns += [f"{stat}({metric})" for metric in metric_names for stat in STATS]
+    return pd.DataFrame(rows, columns=columns), total
@@ -0,0 +1,520 @@
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import huggingface_hub
+from huggingface_hub.errors import EntryNotFoundError
+
+try:
+    from trackio.sqlite_storage import SQLiteStorage, close_connections, set_hydrator
+except:  # noqa: E722
+    from sqlite_storage import SQLiteStorage, close_connections, set_hydrator
+
+# How often, in minutes, the project databases are synced to the dataset.
+SYNC_INTERVAL = 5
+# The maximum number of rows in a segment.
+SEGMENT_ROWS = 100_000
+# The number of segments smaller than SEGMENT_ROWS after which they are merged.
+COMPACTION_SEGMENTS = 12
+MANIFEST_VERSION = 1
+# How many files are downloaded at once when restoring databases.
+DOWNLOAD_WORKERS = 8
+# How long, in seconds, to wait before trying again to restore a database that could
+# not be restored, doubling after each failure up to the maximum.
+RESTORE_RETRY_INTERVAL = 5
+RESTORE_RETRY_MAX_INTERVAL = 300
+
+
+def manifest_path(name: str) -> str:
+    """The path in the repo of the manifest of a project database."""
+    return f"{name}/manifest.json"
+
+
+def write_segment(rows: list[tuple], path: str) -> str:
+    """
+    Write rows exported by `SQLiteStorage.export_rows` to a gzipped JSON Lines file,
+    and return its SHA-256. The file only depends on the rows, so that a segment
+    written again from the same rows is identical.
+    """
+    with open(path, "wb") as f:
+        with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+            for row_id, timestamp, project, run, step, metrics in rows:
+                record = {
+                    "id": row_id,
+                    "timestamp": timestamp,
+                    "project": project,
+                    "run": run,
+                    "step": step,
+                    "metrics": json.loads(metrics),
+                }
+                gz.write(json.dumps(record).encode() + b"\n")
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_segment(data: bytes) -> list[tuple]:
+    """Read the rows of a segment, in the format of `SQLiteStorage.export_rows`."""
+    rows = []
+    for line in gzip.decompress(data).splitlines():
+        record = json.loads(line)
+        rows.append(
+            (
+                record["id"],
+                record["timestamp"],
+                record["project"],
+                record["run"],
+                record["step"],
+                json.dumps(record["metrics"]),
+            )
+        )
+    return rows
+
+
+class HubDatasetRepo:
+    """A Hugging Face dataset that project databases are synced to."""
+
+    def __init__(self, repo_id: str, token: str | None = None):
+        self.api = huggingface_hub.HfApi(token=token)
+        self.repo_id = self.api.create_repo(
+            repo_id, repo_type="dataset", private=True, exist_ok=True
+        ).repo_id
+
+    def read(self, path_in_repo: str) -> bytes | None:
+        """Read a file of the repo, or return None if it doesn't exist."""
+        try:
+            path = self.api.hf_hub_download(
+                self.repo_id, path_in_repo, repo_type="dataset"
+            )
+        except EntryNotFoundError:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def list_databases(self) -> list[str]:
+        """The file names of the databases that have a manifest in the repo."""
+        return [
+            path.split("/")[0]
+            for path in self.api.list_repo_files(self.repo_id, repo_type="dataset")
+            if path.endswith("/manifest.json")
+        ]
+
+    def upload(self, files: dict[str, str], delete: list[str] = ()) -> None:
+        """
+        Upload local files, given by their path in the repo, and delete the files in
+        `delete`, in a single commit.
+        """
+        operations = [
+            huggingface_hub.CommitOperationAdd(path_in_repo, local_path)
+            for path_in_repo, local_path in files.items()
+        ]
+        operations += [
+            huggingface_hub.CommitOperationDelete(path_in_repo)
+            for path_in_repo in delete
+        ]
+        self.api.create_commit(
+            repo_id=self.repo_id,
+            repo_type="dataset",
+            operations=operations,
+            commit_message="Scheduled Commit",
+        )
+        if delete:
+            # Compacted segments would otherwise stay in the history of the repo.
+            self.api.super_squash_history(repo_id=self.repo_id, repo_type="dataset")
+
+
+class LocalRepo:
+    """A local folder that project databases are synced to, in place of a dataset."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, path_in_repo: str) -> bytes | None:
+        try:
+            with open(os.path.join(self.path, path_in_repo), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list_databases(self) -> list[str]:
+        return sorted(
+            os.path.basename(os.path.dirname(path))
+            for path in glob.glob(os.path.join(self.path, "*", "manifest.json"))
+        )
+
+    def upload(self, files: dict[str, str], delete: list[str] = ()) -> None:
+        for path_in_repo, local_path in files.items():
+            path = os.path.join(self.path, path_in_repo)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(local_path, path + ".partial")
+            os.replace(path + ".partial", path)
+        for path_in_repo in delete:
+            os.remove(os.path.join(self.path, path_in_repo))
+
+
+class SyncScheduler:
+    """
+    Syncs the project databases in a folder to a repo every `every` minutes, and when
+    the process exits. Only the rows logged since the last sync are uploaded, as new
+    immutable segments of at most SEGMENT_ROWS rows. The manifest of each database
+    lists its segments and holds the id of the last row uploaded (the high-water
+    mark) and the state of its runs, so syncing resumes where it stopped after a
+    restart. Once COMPACTION_SEGMENTS small segments have piled up, they are merged.
+
+    Rows are read in a single read transaction, which in WAL mode never blocks
+    writers, and uploads are made from a staging folder without holding any lock
+    that writers take.
+    """
+
+    def __init__(self, folder_path: str, repo, every: float = SYNC_INTERVAL):
+        self.folder_path = folder_path
+        self.repo = repo
+        self.every = every
+        self.staging_path = tempfile.mkdtemp(prefix="trackio-sync-")
+        # database file name -> its manifest, as last uploaded
+        self._manifests: dict[str, dict] = {}
+        # database file name -> stats of its files when it was last synced
+        self._synced: dict[str, tuple] = {}
+        # Serializes syncs; writers never take it.
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="trackio-sync", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.sync)
+
+    def get_manifest(self, name: str) -> dict:
+        """The manifest of a database in the repo, read once."""
+        if name not in self._manifests:
+            data = self.repo.read(manifest_path(name))
+            self._manifests[name] = (
+                json.loads(data)
+                if data
+                else {"version": MANIFEST_VERSION, "last_id": 0, "segments": []}
+            )
+        return self._manifests[name]
+
+    @staticmethod
+    def _file_stats(db_path: str) -> tuple:
+        stats = []
+        for path in (db_path, db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stats.append(None)
+        return tuple(stats)
+
+    def _write_segments(
+        self, name: str, db_path: str, after_id: int, last_id: int | None = None
+    ) -> tuple[list[dict], dict[str, str]]:
+        """Export the rows with ids in (after_id, last_id] to new segment files."""
+        segments, files = [], {}
+        for rows in SQLiteStorage.export_rows(
+            db_path, after_id, last_id, batch_size=SEGMENT_ROWS
+        ):
+            first, last = rows[0][0], rows[-1][0]
+            path_in_repo = f"{name}/segments/{first:012d}-{last:012d}.jsonl.gz"
+            local_path = os.path.join(self.staging_path, path_in_repo)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            segments.append(
+                {
+                    "path": path_in_repo,
+                    "first_id": first,
+                    "last_id": last,
+                    "rows": len(rows),
+                    "sha256": write_segment(rows, local_path),
+                }
+            )
+            files[path_in_repo] = local_path
+        return segments, files
+
+    def _compact(
+        self, name: str, db_path: str, segments: list[dict]
+    ) -> tuple[list[dict], dict[str, str], list[str]]:
+        """
+        Merge the small segments at the end of `segments` once there are enough of
+        them, writing the merged segments again from the database.
+        """
+        small = 0
+        while small < len(segments) and segments[-small - 1]["rows"] < SEGMENT_ROWS:
+            small += 1
+        if small < COMPACTION_SEGMENTS:
+            return segments, {}, []
+        merged, files = self._write_segments(
+            name,
+            db_path,
+            segments[-small]["first_id"] - 1,
+            segments[-1]["last_id"],
+        )
+        replaced = [segment["path"] for segment in segments[-small:]]
+        delete = [path for path in replaced if path not in files]
+        return segments[:-small] + merged, files, delete
+
+    def _sync_database(self, name: str, db_path: str):
+        """
+        Prepare the upload of the changes of a database, returning its new manifest,
+        the files to upload and the files to delete, or None if nothing changed.
+        """
+        manifest = self.get_manifest(name)
+        if SQLiteStorage.get_last_row_id(db_path) < manifest["last_id"]:
+            print(
+                f"* Trackio did not sync {db_path}: the dataset has rows that it "
+                "doesn't, restore it from the dataset first."
+            )
+            return None
+        segments, files = self._write_segments(name, db_path, manifest["last_id"])
+        runs = SQLiteStorage.export_runs(db_path)
+        if not segments and runs == manifest.get("runs"):
+            return None
+        segments, compacted, delete = self._compact(
+            name, db_path, manifest["segments"] + segments
+        )
+        # New segments merged right away are neither uploaded nor deleted.
+        for path in set(delete).intersection(files):
+            del files[path]
+            delete.remove(path)
+        files.update(compacted)
+        new_manifest = {
+            "version": MANIFEST_VERSION,
+            "last_id": segments[-1]["last_id"] if segments else 0,
+            "segments": segments,
+            "runs": runs,
+        }
+        manifest_file = os.path.join(self.staging_path, manifest_path(name))
+        os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+        with open(manifest_file, "w") as f:
+            json.dump(new_manifest, f)
+        # The manifest is uploaded last, so that it never lists missing segments.
+        files[manifest_path(name)] = manifest_file
+        return new_manifest, files, delete
+
+    def sync(self) -> list[str]:
+        """Upload the changes of every database since the last sync, returning their names."""
+        with self._lock:
+            manifests, files, delete, stats = {}, {}, [], {}
+            for db_path in sorted(glob.glob(os.path.join(self.folder_path, "*.db"))):
+                name = os.path.basename(db_path)
+                file_stats = self._file_stats(db_path)
+                if self._synced.get(name) == file_stats:
+                    continue
+                changes = self._sync_database(name, db_path)
+                stats[name] = file_stats
+                if changes is not None:
+                    manifests[name] = changes[0]
+                    files.update(changes[1])
+                    delete += changes[2]
+            try:
+                if files:
+                    self.repo.upload(files, delete)
+                    self._manifests.update(manifests)
+                self._synced.update(stats)
+            finally:
+                shutil.rmtree(self.staging_path, ignore_errors=True)
+            return list(manifests)
+
+    def _run(self):
+        while not self._stopped.wait(self.every * 60):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"* Trackio failed to sync to the dataset: {e}")
+
+    def stop(self):
+        """Stop syncing periodically. Mostly for tests."""
+        self._stopped.set()
+        atexit.unregister(self.sync)
+
+
+def read_manifest(repo, name: str) -> dict | None:
+    """Read the manifest of a database from a repo, or None if it has none."""
+    data = repo.read(manifest_path(name))
+    return None if data is None else json.loads(data)
+
+
+def _fetch_segment(repo, segment: dict) -> list[tuple]:
+    data = repo.read(segment["path"])
+    if data is None:
+        raise ValueError(f"Segment {segment['path']} is missing from the repo")
+    if hashlib.sha256(data).hexdigest() != segment["sha256"]:
+        raise ValueError(f"Segment {segment['path']} does not match its checksum")
+    return read_segment(data)
+
+
+def restore_database(
+    repo,
+    name: str,
+    db_path: str,
+    manifest: dict | None = None,
+    max_workers: int = DOWNLOAD_WORKERS,
+) -> int:
+    """
+    Rebuild a project database from its segments in a repo, checking each against the
+    SHA-256 in the manifest. Segments are downloaded `max_workers` at a time, while
+    the ones already downloaded are inserted in order. Rows that the database already
+    has are skipped, so this can also bring a database up to date. Returns the number
+    of rows inserted.
+    """
+    manifest = manifest or read_manifest(repo, name)
+    if manifest is None:
+        return 0
+    inserted = 0
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="trackio-fetch") as pool:
+        # Only a few segments are downloaded ahead, to bound memory use.
+        pending = deque()
+        for segment in manifest["segments"]:
+            pending.append(pool.submit(_fetch_segment, repo, segment))
+            if len(pending) >= 2 * max_workers:
+                inserted += SQLiteStorage.import_rows(
+                    db_path, pending.popleft().result()
+                )
+        while pending:
+            inserted += SQLiteStorage.import_rows(db_path, pending.popleft().result())
+    SQLiteStorage.import_runs(db_path, manifest.get("runs", []))
+    return inserted
+
+
+class Hydrator:
+    """
+    Restores the project databases of a folder from the repo they are synced to, as
+    when a Space restarts with an empty disk. `start()` returns immediately: the
+    manifests are read in the background, then the databases are restored one by one.
+    A database that is read or written before its turn (see `ensure`) is restored
+    right away, and its reader or writer waits until it is. A database that fails to
+    restore is tried again on a later read or write, with exponential backoff.
+    """
+
+    def __init__(self, repo, folder_path: str, max_workers: int = DOWNLOAD_WORKERS):
+        self.repo = repo
+        self.folder_path = folder_path
+        self.max_workers = max_workers
+        # database file name -> names of its projects, from the manifests read so far
+        self._projects: dict[str, list[str]] = {}
+        self._hydrated: set[str] = set()
+        # database file name -> (number of failed restores, time to try again at)
+        self._failures: dict[str, tuple[int, float]] = {}
+        # database file name -> id of the last row in the repo, from its manifest
+        self._last_ids: dict[str, int] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="trackio-hydrate", daemon=True
+        )
+        self._thread.start()
+
+    def get_projects(self) -> list[str]:
+        """The projects in the manifests read so far, restored or not."""
+        with self._lock:
+            return sorted({p for projects in self._projects.values() for p in projects})
+
+    def ensure(self, db_path: str):
+        """Restore the database at `db_path` if it is in the folder and not restored yet."""
+        name = os.path.basename(db_path)
+        if name in self._hydrated:
+            return
+        failures = self._failures.get(name)
+        if failures is not None and time.monotonic() < failures[1]:
+            return
+        if os.path.dirname(os.path.abspath(db_path)) != os.path.abspath(
+            self.folder_path
+        ):
+            return
+        self.hydrate(name)
+
+    def hydrate(self, name: str, manifest: dict | None = None):
+        """
+        Restore a database from the repo, once it succeeds. If it fails, the error is
+        printed and the database is left as it is, so that the dashboard still works,
+        and the restore is tried again later. Meanwhile, rows written to the database
+        get ids above those in the repo, so that they don't clash with the restored
+        rows nor get skipped by syncing.
+        """
+        if name in self._hydrated:
+            return
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name in self._hydrated:
+                return
+            try:
+                manifest = manifest or read_manifest(self.repo, name)
+                if manifest is not None:
+                    self._last_ids[name] = manifest["last_id"]
+                    self._restore(name, manifest)
+            except Exception as e:
+                print(f"* Trackio failed to restore {name} from the dataset: {e}")
+                count = self._failures.get(name, (0, 0))[0] + 1
+                interval = min(
+                    RESTORE_RETRY_INTERVAL * 2 ** (count - 1),
+                    RESTORE_RETRY_MAX_INTERVAL,
+                )
+                self._failures[name] = (count, time.monotonic() + interval)
+                if name in self._last_ids:
+                    SQLiteStorage.reserve_row_ids(
+                        os.path.join(self.folder_path, name), self._last_ids[name]
+                    )
+                return
+            # Writers created while the restore was failing counted their steps
+            # from the database as it was.
+            if self._failures.pop(name, None) is not None:
+                SQLiteStorage.reload_steps(os.path.join(self.folder_path, name))
+            self._hydrated.add(name)
+
+    def _restore(self, name: str, manifest: dict):
+        db_path = os.path.join(self.folder_path, name)
+        if os.path.exists(db_path):
+            # Only the rows that the database is missing are inserted.
+            restore_database(self.repo, name, db_path, manifest, self.max_workers)
+            return
+        # A new database is restored under another name, so that it only appears
+        # (to readers, writers and syncing) once complete.
+        partial_path = db_path + ".partial"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(partial_path + suffix):
+                os.remove(partial_path + suffix)
+        try:
+            restore_database(self.repo, name, partial_path, manifest, self.max_workers)
+        finally:
+            close_connections(partial_path)
+        os.replace(partial_path, db_path)
+
+    def _run(self):
+        try:
+            names = self.repo.list_databases()
+            with ThreadPoolExecutor(self.max_workers) as pool:
+                manifests = dict(
+                    zip(names, pool.map(lambda n: read_manifest(self.repo, n), names))
+                )
+            with self._lock:
+                for name, manifest in manifests.items():
+                    if manifest is not None:
+                        self._projects[name] = sorted(
+                            {run["project"] for run in manifest.get("runs", [])}
+                        )
+            for name, manifest in manifests.items():
+                self.hydrate(name, manifest)
+        except Exception as e:
+            print(f"* Trackio failed to restore projects from the dataset: {e}")
+
+
+def start_hydration(repo, folder_path: str) -> Hydrator:
+    """
+    Start restoring the project databases of a folder from a repo in the background,
+    and make every read or write of a database wait until it is restored.
+    """
+    hydrator = Hydrator(repo, folder_path)
+    set_hydrator(hydrator.ensure)
+    hydrator.start()
+    return hydrator
@@ -1,18 +1,60 @@
+import itertools
+import json
 import os
+import threading
+from collections import OrderedDict
 from typing import Any
 
 import gradio as gr
 import huggingface_hub as hf
+import numpy as np
 import pandas as pd
 
 HfApi = hf.HfApi()
 
 try:
+    from trackio.auth import AuthCache
+    from trackio.downsample import downsample
+    from trackio.notifier import ChangeNotifier
+    from trackio.smoothing import (
+        DEFAULT_METHOD,
+        DEFAULT_WEIGHT,
+        rolling_mean,
+        rolling_window,
+        smooth,
+    )
     from trackio.sqlite_storage import SQLiteStorage
-    from trackio.utils import RESERVED_KEYS, TRACKIO_LOGO_PATH
+    from trackio.summaries import get_summary
+    from trackio.sync import HubDatasetRepo, start_hydration
+    from trackio.utils import RESERVED_KEYS, TRACKIO_DIR, TRACKIO_LOGO_PATH
 except:  # noqa: E722
+    from auth import AuthCache
+    from downsample import downsample
+    from notifier import ChangeNotifier
+    from smoothing import (
+        DEFAULT_METHOD,
+        DEFAULT_WEIGHT,
+        rolling_mean,
+        rolling_window,
+        smooth,
+    )
     from sqlite_storage import SQLiteStorage
-    from utils import RESERVED_KEYS, TRACKIO_LOGO_PATH
+    from summaries import get_summary
+    from sync import HubDatasetRepo, start_hydration
+    from utils import RESERVED_KEYS, TRACKIO_DIR, TRACKIO_LOGO_PATH
+
+auth_cache = AuthCache(whoami=HfApi.whoami)
+
+# When synced to a dataset (e.g. on a Space, which starts with an empty disk), the
+# project databases are restored from it while the dashboard is already up.
+hydrator = None
+if dataset_id := os.environ.get("TRACKIO_DATASET_ID"):
+    try:
+        hydrator = start_hydration(
+            HubDatasetRepo(dataset_id, token=os.environ.get("HF_TOKEN")), TRACKIO_DIR
+        )
+    except Exception as e:
+        print(f"* Trackio failed to restore projects from {dataset_id}: {e}")
 
 css = """
 #run-cb .wrap {
@@ -24,6 +66,17 @@ css = """
 }
 """
 
+# The maximum number of points sent to the browser for each line of a plot, and the
+# algorithm used to pick them ("lttb" or "minmax").
+PLOT_POINTS = int(os.environ.get("TRACKIO_PLOT_POINTS", 1000))
+DOWNSAMPLE_METHOD = os.environ.get("TRACKIO_DOWNSAMPLE_METHOD", "lttb")
+# The number of plots shown at once in each group of metrics.
+PAGE_SIZE = 12
+# The number of runs listed at once in the sidebar.
+RUNS_PAGE_SIZE = 50
+# The number of metrics summarized in the runs table until the user picks some.
+SUMMARY_METRICS = 3
+
 COLOR_PALETTE = [
     "#3B82F6",
     "#EF4444",
@@ -57,6 +110,9 @@ def get_color_mapping(runs: list[str], smoothing: bool) -> dict[str, str]:
 def get_projects(request: gr.Request):
     dataset_id = os.environ.get("TRACKIO_DATASET_ID")
     projects = SQLiteStorage.get_projects()
+    if hydrator is not None:
+        # Projects that are not restored yet are restored once selected.
+        projects = sorted(set(projects) | set(hydrator.get_projects()))
     if project := request.query_params.get("project"):
         interactive = False
     else:
@@ -74,10 +130,39 @@ def get_projects(request: gr.Request):
     )
 
 
-def get_runs(project) -> list[str]:
-    if not project:
-        return []
-    return SQLiteStorage.get_runs(project)
+class ProjectStateCache:
+    """
+    Keeps the runs of each project and their last steps, shared by all dashboard
+    sessions. Storage is only queried again when the project's database files have
+    changed, so polling an idle project costs a couple of `stat` calls.
+    """
+
+    def __init__(self):
+        # project -> (database version, runs, last step of each run)
+        self._states: dict[str, tuple[tuple, list[str], dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, project: str) -> tuple[list[str], dict[str, int]]:
+        version = SQLiteStorage.get_project_version(project)
+        if version is None:
+            return [], {}
+        with self._lock:
+            state = self._states.get(project)
+            if state is None or state[0] != version:
+                runs = SQLiteStorage.get_runs(project)
+                state = (version, runs, SQLiteStorage.get_last_steps(project, runs))
+                self._states[project] = state
+            return state[1], state[2]
+
+
+project_state_cache = ProjectStateCache()
+notifier = ChangeNotifier(get_state=project_state_cache.get)
+
+# How long a dashboard session, or a client of the `wait_for_updates` endpoint, waits
+# for new metrics before checking in. Sessions that see no new metrics wait longer
+# and longer, up to the maximum.
+WAIT_MIN_TIMEOUT = 5.0  # seconds
+WAIT_MAX_TIMEOUT = 60.0
 
 
 def get_available_metrics(project: str, runs: list[str]) -> list[str]:
@@ -85,14 +170,7 @@ def get_available_metrics(project: str, runs: list[str]) -> list[str]:
     if not project or not runs:
         return ["step", "time"]
 
-    all_metrics = set()
-    for run in runs:
-        metrics = SQLiteStorage.get_metrics(project, run)
-        if metrics:
-            df = pd.DataFrame(metrics)
-            numeric_cols = df.select_dtypes(include="number").columns
-            numeric_cols = [c for c in numeric_cols if c not in RESERVED_KEYS]
-            all_metrics.update(numeric_cols)
+    all_metrics = set(SQLiteStorage.get_metric_names(project, runs))
 
     # Always include step and time as options
     all_metrics.add("step")
@@ -110,76 +188,661 @@ def get_available_metrics(project: str, runs: list[str]) -> list[str]:
     return result
 
 
-def load_run_data(project: str | None, run: str | None, smoothing: bool, x_axis: str):
+class RunFrameCache:
+    """
+    Keeps the numeric metrics of recently viewed runs as DataFrames, shared by all
+    dashboard sessions. On each read, if the rows logged since the previous read are
+    all at later steps, only those steps are read from storage and appended; otherwise
+    the run is read again under a new generation, which tells caches of values
+    derived from the frame to start over. Generations are never reused in the
+    process, even after a run is evicted. The least recently used runs are evicted
+    once the cache holds more than `max_runs` runs or `max_rows` rows in total.
+    """
+
+    # Shared by all instances, so that a frame read after its run was evicted (or by
+    # another cache) never takes the generation of an earlier frame.
+    _generations = itertools.count()
+
+    def __init__(self, max_runs: int = 64, max_rows: int = 2_000_000):
+        self.max_runs = max_runs
+        self.max_rows = max_rows
+        # (project, run) -> (DataFrame, number of logged rows read, generation)
+        self._frames: OrderedDict[tuple[str, str], tuple[pd.DataFrame, int, int]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, project: str, run: str) -> tuple[pd.DataFrame, int]:
+        """Get the metrics of a run, along with the generation of its frame."""
+        return self.get_many(project, [run])[run]
+
+    def get_many(
+        self, project: str, runs: list[str]
+    ) -> dict[str, tuple[pd.DataFrame, int]]:
+        """
+        Get the metrics of several runs, along with the generation of their frames.
+        The runs that need to be read in full are read together, in a single call to
+        `SQLiteStorage.get_metrics_frame`.
+        """
+        with self._lock:
+            entries = {}
+            for run in runs:
+                df, row_count, generation = self._frames.get(
+                    (project, run), (None, 0, 0)
+                )
+                # Counted before reading, so that rows logged during the read are
+                # read again rather than missed.
+                new_row_count = SQLiteStorage.count_rows(project, run)
+                # Rows are ordered by step. Cast, as sqlite3 binds NumPy integers as
+                # blobs.
+                next_step = (
+                    None if df is None or df.empty else int(df["step"].iloc[-1]) + 1
+                )
+                if df is not None and new_row_count == row_count:
+                    pass
+                elif (
+                    next_step is not None
+                    and SQLiteStorage.count_rows(project, run, min_step=next_step)
+                    == new_row_count - row_count
+                ):
+                    new_df = SQLiteStorage.get_metrics_frame(
+                        project, [run], step_range=(next_step, None)
+                    )
+                    if not new_df.empty:
+                        df = pd.concat([df, new_df], ignore_index=True)
+                else:
+                    generation = next(RunFrameCache._generations)
+                    df = None
+                entries[run] = (df, new_row_count, generation)
+
+            unread = [run for run, (df, _, _) in entries.items() if df is None]
+            if unread:
+                frames = SQLiteStorage.get_metrics_frame(project, unread)
+                # Each run only keeps the columns of the metrics it logged.
+                parts = {
+                    run: part.reset_index(drop=True).dropna(axis=1, how="all")
+                    for run, part in frames.groupby("run", sort=False)
+                }
+                for run in unread:
+                    _, row_count, generation = entries[run]
+                    df = parts.get(run, frames.iloc[:0])
+                    entries[run] = (df, row_count, generation)
+
+            for run, entry in entries.items():
+                self._frames[(project, run)] = entry
+                self._frames.move_to_end((project, run))
+            self._evict()
+            return {
+                run: (df, generation) for run, (df, _, generation) in entries.items()
+            }
+
+    def _evict(self):
+        total_rows = sum(len(df) for df, _, _ in self._frames.values())
+        while len(self._frames) > 1 and (
+            len(self._frames) > self.max_runs or total_rows > self.max_rows
+        ):
+            df, _, _ = self._frames.popitem(last=False)[1]
+            total_rows -= len(df)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+frame_cache = RunFrameCache()
+
+
+class SmoothingCache:
+    """
+    Keeps the smoothed values of each metric of recently viewed runs, per smoothing
+    method and weight, shared by all dashboard sessions. Since the frame of a run only
+    grows until its generation changes, each series is smoothed once and then extended
+    with the values logged since, from the state the smoothing stopped at. The least
+    recently used series are evicted once the cache holds more than `max_points`
+    values in total.
+    """
+
+    def __init__(self, max_points: int = 10_000_000):
+        self.max_points = max_points
+        # (project, run, frame generation, metric, x column, method, weight) ->
+        # (smoothed values aligned with the rows of the run, smoothing state)
+        self._series: OrderedDict[tuple, tuple[np.ndarray, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: tuple,
+        values: np.ndarray,
+        x: np.ndarray,
+        method: str,
+        weight: float,
+    ) -> np.ndarray:
+        """
+        Smooth `values` (one metric of a run, NaN where it was not logged), reusing
+        the result cached under `key` for the rows that were already smoothed.
+        """
+        key = (*key, method, weight)
+        with self._lock:
+            smoothed, state = self._series.get(key, (np.empty(0), None))
+            if len(smoothed) > len(values):  # the run was rewritten
+                smoothed, state = np.empty(0), None
+            if len(smoothed) < len(values):
+                new_values = values[len(smoothed) :]
+                new_smoothed = np.full(len(new_values), np.nan)
+                logged = np.isfinite(new_values)
+                new_smoothed[logged], state = smooth(
+                    new_values[logged],
+                    method,
+                    weight,
+                    x=x[len(smoothed) :][logged],
+                    state=state,
+                )
+                smoothed = np.concatenate([smoothed, new_smoothed])
+            self._series[key] = (smoothed, state)
+            self._series.move_to_end(key)
+            self._evict()
+            return smoothed
+
+    def _evict(self):
+        total_points = sum(len(smoothed) for smoothed, _ in self._series.values())
+        while len(self._series) > 1 and total_points > self.max_points:
+            smoothed, _ = self._series.popitem(last=False)[1]
+            total_points -= len(smoothed)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+smoothing_cache = SmoothingCache()
+
+
+def load_run_data(
+    project: str | None,
+    run: str | None,
+    smoothing: bool,
+    x_axis: str,
+    smoothing_method: str = DEFAULT_METHOD,
+    smoothing_weight: float = DEFAULT_WEIGHT,
+    metrics: list[str] | None = None,
+    frame: tuple[pd.DataFrame, int] | None = None,
+):
+    """
+    Load the metrics of a run for plotting, along with their smoothed values if
+    `smoothing` is enabled. If `metrics` is given, only those metrics are loaded.
+    `frame` is the run's frame and generation from `frame_cache`, if already read.
+    """
     if not project or not run:
         return None
-    metrics = SQLiteStorage.get_metrics(project, run)
-    if not metrics:
+    # The cached frame is shared between sessions, so it must not be modified.
+    cached_df, generation = frame or frame_cache.get(project, run)
+    if cached_df.empty:
         return None
-    df = pd.DataFrame(metrics)
-
-    if "step" not in df.columns:
-        df["step"] = range(len(df))
-
-    if x_axis == "time" and "timestamp" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        first_timestamp = df["timestamp"].min()
-        df["time"] = (df["timestamp"] - first_timestamp).dt.total_seconds()
+    if metrics is not None:
+        keep = {"step", "timestamp", x_axis, *metrics}
+        cached_df = cached_df[[c for c in cached_df.columns if c in keep]]
+
+    columns = {}
+    if x_axis == "time" and "timestamp" in cached_df.columns:
+        timestamps = cached_df["timestamp"]
+        columns["time"] = (timestamps - timestamps.min()).dt.total_seconds()
         x_column = "time"
     elif x_axis == "step":
         x_column = "step"
     else:
         x_column = x_axis
 
-    if smoothing:
-        numeric_cols = df.select_dtypes(include="number").columns
-        numeric_cols = [c for c in numeric_cols if c not in RESERVED_KEYS]
-
-        df_original = df.copy()
-        df_original["run"] = f"{run}_original"
-        df_original["data_type"] = "original"
+    if not smoothing:
+        return cached_df.assign(
+            **columns, run=run, data_type="original", x_axis=x_column
+        )
 
-        df_smoothed = df.copy()
-        window_size = max(3, min(10, len(df) // 10))  # Adaptive window size
-        df_smoothed[numeric_cols] = (
-            df_smoothed[numeric_cols]
-            .rolling(window=window_size, center=True, min_periods=1)
-            .mean()
+    df = cached_df.assign(
+        **columns, run=f"{run}_original", data_type="original", x_axis=x_column
+    )
+    # A time-weighted EMA is weighted by the spacing of the plotted steps or times.
+    weight_column = "time" if x_column == "time" else "step"
+    x = df[weight_column].to_numpy(dtype=np.float64)
+    smoothed = {c: df[c] for c in ("step", x_column) if c in df.columns}
+    for column in df.select_dtypes(include="number").columns:
+        if column in RESERVED_KEYS or column in smoothed:
+            continue
+        smoothed[column] = smoothing_cache.get(
+            (project, run, generation, column, weight_column),
+            df[column].to_numpy(dtype=np.float64),
+            x,
+            smoothing_method,
+            smoothing_weight,
         )
-        df_smoothed["run"] = f"{run}_smoothed"
-        df_smoothed["data_type"] = "smoothed"
+    df_smoothed = pd.DataFrame(smoothed).assign(
+        run=f"{run}_smoothed", data_type="smoothed", x_axis=x_column
+    )
+    return pd.concat([df, df_smoothed], ignore_index=True)
 
-        combined_df = pd.concat([df_original, df_smoothed], ignore_index=True)
-        combined_df["x_axis"] = x_column
-        return combined_df
-    else:
+
+def get_rollup_levels(
+    project: str | None,
+    runs: list[str],
+    x_axis: str,
+    x_lim: list[float] | None = None,
+) -> dict[str, int]:
+    """
+    Get the rollup level to plot each run at, for the runs that have enough steps in
+    view that plotting their raw values is not needed to draw PLOT_POINTS points.
+    """
+    if not project or not runs or x_axis != "step":
+        return {}
+    # Steps don't have to start at 0, so the number of values logged is what tells
+    # how many points a run would be plotted with.
+    stats = SQLiteStorage.get_metric_stats(project, runs) if x_lim is None else {}
+    levels = {}
+    for run in runs:
+        if x_lim is not None:
+            n_steps = int(x_lim[1] - x_lim[0])
+        else:
+            n_steps = max(
+                (count for count, _ in stats.get(run, {}).values()), default=0
+            )
+        level = SQLiteStorage.choose_rollup_level(n_steps, PLOT_POINTS)
+        if level is not None:
+            levels[run] = level
+    return levels
+
+
+def load_rollup_data(
+    project: str,
+    run: str,
+    metric: str,
+    level: int,
+    smoothing: bool,
+    x_lim: list[float] | None = None,
+    smoothing_method: str = DEFAULT_METHOD,
+    smoothing_weight: float = DEFAULT_WEIGHT,
+) -> pd.DataFrame | None:
+    """
+    Load one metric of a run from its pre-aggregated buckets of `level` steps, in the
+    same format as `load_run_data`. Each bucket is drawn as its minimum and maximum,
+    so that spikes stay visible; the smoothed line follows the bucket means.
+    """
+    step_range = None
+    if x_lim is not None:
+        step_range = (int(np.floor(x_lim[0])), int(np.ceil(x_lim[1])))
+    rollups = SQLiteStorage.get_metric_rollups(project, run, metric, level, step_range)
+    if not rollups:
+        return None
+    starts, _, mins, maxs, means, _ = (np.array(column) for column in zip(*rollups))
+    df = pd.DataFrame(
+        {
+            "step": np.column_stack(
+                [starts + level * 0.25, starts + level * 0.75]
+            ).ravel(),
+            metric: np.column_stack([mins, maxs]).ravel(),
+        }
+    )
+    df["x_axis"] = "step"
+    if not smoothing:
         df["run"] = run
         df["data_type"] = "original"
-        df["x_axis"] = x_column
         return df
 
-
-def update_runs(project, filter_text, user_interacted_with_runs=False):
-    if project is None:
-        runs = []
-        num_runs = 0
+    df["run"] = f"{run}_original"
+    df["data_type"] = "original"
+    # Bucket means are already averages of `level` steps, so they are smoothed as
+    # much as the raw values would be: an EMA decays per step between buckets, and a
+    # rolling mean covers as many steps as it would on the raw values.
+    if smoothing_method == "rolling":
+        window = max(round(rolling_window(smoothing_weight) / level), 1)
+        smoothed, _ = rolling_mean(means, window)
     else:
-        runs = get_runs(project)
-        num_runs = len(runs)
-        if filter_text:
-            runs = [r for r in runs if filter_text in r]
-    if not user_interacted_with_runs:
-        return gr.CheckboxGroup(choices=runs, value=runs), gr.Textbox(
-            label=f"Runs ({num_runs})"
+        smoothed, _ = smooth(means, "time_ema", smoothing_weight, x=starts)
+    df_smoothed = pd.DataFrame(
+        {
+            "step": starts + level * 0.5,
+            metric: smoothed,
+            "x_axis": "step",
+            "run": f"{run}_smoothed",
+            "data_type": "smoothed",
+        }
+    )
+    return pd.concat([df, df_smoothed], ignore_index=True)
+
+
+def downsample_series(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    x_lim: list[float] | None = None,
+    n_points: int = PLOT_POINTS,
+) -> pd.DataFrame:
+    """
+    Reduce each line (one per value of the "run" column) of a plot to at most
+    `n_points` points, chosen within `x_lim` when the plot is zoomed in.
+    """
+    lines = [line for _, line in df.groupby("run", sort=False)] if "run" in df else [df]
+    parts = []
+    for line in lines:
+        line = line.sort_values(x, kind="stable")
+        indices = downsample(
+            line[x].to_numpy(dtype=np.float64),
+            line[y].to_numpy(dtype=np.float64),
+            n_points,
+            x_lim=x_lim,
+            method=DOWNSAMPLE_METHOD,
         )
-    else:
-        return gr.CheckboxGroup(choices=runs), gr.Textbox(label=f"Runs ({num_runs})")
+        parts.append(line.iloc[indices])
+    return pd.concat(parts) if parts else df
 
 
-def filter_runs(project, filter_text):
-    runs = get_runs(project)
-    runs = [r for r in runs if filter_text in r]
-    return gr.CheckboxGroup(choices=runs, value=runs)
+def get_plot_metrics(
+    project: str | None, runs: list[str], metrics_subset: list[str] | None = None
+) -> list[str]:
+    """The numeric metrics of the given runs to plot, in the order of the plots."""
+    if not project or not runs:
+        return []
+    metrics = [
+        metric
+        for metric in SQLiteStorage.get_metric_names(project, runs)
+        if metric not in RESERVED_KEYS
+    ]
+    if metrics_subset:
+        metrics = [metric for metric in metrics if metric in metrics_subset]
+    return sort_metrics_by_prefix(metrics)
+
+
+def get_plot_signatures(
+    project: str, runs: list[str], metrics: list[str]
+) -> dict[str, tuple]:
+    """
+    Get a value for each metric that changes whenever any of the runs logs a new value
+    to it, to tell which plots need to be redrawn.
+    """
+    if not metrics:
+        return {}
+    stats = SQLiteStorage.get_metric_stats(project, runs)
+    return {
+        metric: tuple(stats.get(run, {}).get(metric) for run in runs)
+        for metric in metrics
+    }
+
+
+def load_plot_data(
+    project: str,
+    runs: list[str],
+    metrics: list[str],
+    smoothing: bool,
+    x_axis: str,
+    x_lim: list[float] | None = None,
+    smoothing_method: str = DEFAULT_METHOD,
+    smoothing_weight: float = DEFAULT_WEIGHT,
+) -> dict[str, tuple[pd.DataFrame, list[float]]]:
+    """
+    Load the data of the plot of each of `metrics` for the given runs, downsampled to
+    at most PLOT_POINTS points per line, along with the limits of its y-axis. Metrics
+    without any values are left out.
+    """
+    if not metrics:
+        return {}
+    # Runs that are long enough (or zoomed out enough) are plotted from their
+    # rollups, without loading their metric rows.
+    rollup_levels = get_rollup_levels(project, runs, x_axis, x_lim)
+    frames = frame_cache.get_many(
+        project, [run for run in runs if run not in rollup_levels]
+    )
+    dfs = []
+    for run, frame in frames.items():
+        df = load_run_data(
+            project,
+            run,
+            smoothing,
+            x_axis,
+            smoothing_method,
+            smoothing_weight,
+            metrics=metrics,
+            frame=frame,
+        )
+        if df is not None:
+            dfs.append(df)
+    master_df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+    plots = {}
+    for metric in metrics:
+        metric_dfs = []
+        if metric in master_df.columns:
+            metric_dfs.append(master_df.dropna(subset=[metric]))
+        for run, level in rollup_levels.items():
+            metric_dfs.append(
+                load_rollup_data(
+                    project,
+                    run,
+                    metric,
+                    level,
+                    smoothing,
+                    x_lim,
+                    smoothing_method,
+                    smoothing_weight,
+                )
+            )
+        metric_dfs = [df for df in metric_dfs if df is not None and not df.empty]
+        if not metric_dfs:
+            continue
+        metric_df = pd.concat(metric_dfs, ignore_index=True)
+        y_lim = [metric_df[metric].min(), metric_df[metric].max()]
+        plots[metric] = (
+            downsample_series(metric_df, x_axis, metric, x_lim=x_lim),
+            y_lim,
+        )
+    return plots
+
+
+def parse_config_filters(text: str | None) -> dict[str, Any]:
+    """
+    Parse comma-separated "key=value" pairs, e.g. "lr=0.001, optimizer=adam", into a
+    dict. Values are parsed as JSON where possible (numbers, booleans) and kept as
+    strings otherwise.
+    """
+    filters = {}
+    for pair in (text or "").split(","):
+        if not pair.strip():
+            continue
+        key, _, value = pair.partition("=")
+        value = value.strip()
+        try:
+            filters[key.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            filters[key.strip()] = value
+    return filters
+
+
+def get_run_sort_choices(project: str | None) -> list[tuple[str, str]]:
+    """The ways runs can be sorted in the sidebar, including by each metric."""
+    choices = [("Newest", "created"), ("Last updated", "recent"), ("Name", "name")]
+    if project:
+        choices += [
+            (f"Last {metric}", f"metric:{metric}")
+            for metric in SQLiteStorage.get_metric_names(project)
+        ]
+    return choices
+
+
+def update_runs(
+    project: str | None,
+    query: str,
+    regex: bool,
+    config_filter: str,
+    sort: str,
+    descending: bool,
+    page: int = 0,
+    selected: list[str] | None = None,
+    user_interacted_with_runs: bool = False,
+):
+    """
+    List one page of the runs that match the search in the sidebar. Only the names on
+    that page are sent to the browser; the selection is kept in `selected`. Until the
+    user selects runs, the runs on the page are selected.
+    """
+    runs, total = [], 0
+    if project:
+        try:
+            runs, total = SQLiteStorage.search_runs(
+                project,
+                query,
+                regex=regex,
+                config_filters=parse_config_filters(config_filter),
+                sort=sort,
+                descending=descending,
+                limit=RUNS_PAGE_SIZE,
+                offset=page * RUNS_PAGE_SIZE,
+            )
+        except ValueError as e:
+            gr.Warning(str(e))
+    num_pages = max((total + RUNS_PAGE_SIZE - 1) // RUNS_PAGE_SIZE, 1)
+    if page >= num_pages:
+        return update_runs(
+            project,
+            query,
+            regex,
+            config_filter,
+            sort,
+            descending,
+            num_pages - 1,
+            selected,
+            user_interacted_with_runs,
+        )
+
+    if not user_interacted_with_runs:
+        selected = runs
+    selected = selected or []
+    return (
+        gr.CheckboxGroup(choices=runs, value=[run for run in runs if run in selected]),
+        gr.Textbox(label=f"Runs ({total})"),
+        gr.Markdown(f"Page {page + 1} of {num_pages}, {len(selected)} selected"),
+        gr.Button(interactive=page > 0),
+        gr.Button(interactive=page < num_pages - 1),
+        page,
+        runs,
+        selected,
+        user_interacted_with_runs,
+    )
+
+
+def search_runs(
+    project, query, regex, config_filter, sort, descending, selected, interacted
+):
+    """Show the first page of runs after the search in the sidebar changed."""
+    return update_runs(
+        project, query, regex, config_filter, sort, descending, 0, selected, interacted
+    )
+
+
+def previous_runs(
+    project, query, regex, config_filter, sort, descending, page, selected, interacted
+):
+    return update_runs(
+        project,
+        query,
+        regex,
+        config_filter,
+        sort,
+        descending,
+        max(page - 1, 0),
+        selected,
+        interacted,
+    )
+
+
+def next_runs(
+    project, query, regex, config_filter, sort, descending, page, selected, interacted
+):
+    return update_runs(
+        project,
+        query,
+        regex,
+        config_filter,
+        sort,
+        descending,
+        page + 1,
+        selected,
+        interacted,
+    )
+
+
+def select_runs(value: list[str], page_runs: list[str], selected: list[str]):
+    """Update the selected runs with the runs checked on the current page."""
+    selected = [run for run in selected if run not in page_runs]
+    return selected + [run for run in page_runs if run in value], True
+
+
+def update_summary_metrics(project: str | None):
+    """List the metrics that can be summarized, showing the first few by default."""
+    metrics = SQLiteStorage.get_metric_names(project) if project else []
+    return gr.Dropdown(choices=metrics, value=metrics[:SUMMARY_METRICS])
+
+
+def get_summary_sort_choices(metrics: list[str]) -> list[tuple[str, str]]:
+    """The ways the runs table can be sorted, including by each summarized metric."""
+    choices = get_run_sort_choices(None)
+    for metric in metrics or []:
+        choices += [
+            (f"Last {metric}", f"metric:{metric}"),
+            (f"Min {metric}", f"min:{metric}"),
+            (f"Max {metric}", f"max:{metric}"),
+        ]
+    return choices
+
+
+def update_summary_sort_choices(metrics: list[str], sort: str):
+    choices = get_summary_sort_choices(metrics)
+    if sort not in [value for _, value in choices]:
+        sort = "created"
+    return gr.Dropdown(choices=choices, value=sort)
+
+
+def update_summary(
+    project: str | None,
+    query: str,
+    regex: bool,
+    config_filter: str,
+    metrics: list[str],
+    sort: str,
+    descending: bool,
+    page: int = 0,
+):
+    """Show one page of the runs table, summarized and sorted by SQLite."""
+    df, total = pd.DataFrame(), 0
+    if project:
+        try:
+            df, total = get_summary(
+                project,
+                metrics=metrics or [],
+                query=query,
+                regex=regex,
+                config_filters=parse_config_filters(config_filter),
+                sort=sort,
+                descending=descending,
+                limit=RUNS_PAGE_SIZE,
+                offset=page * RUNS_PAGE_SIZE,
+            )
+        except ValueError as e:
+            gr.Warning(str(e))
+    num_pages = max((total + RUNS_PAGE_SIZE - 1) // RUNS_PAGE_SIZE, 1)
+    if page >= num_pages:
+        return update_summary(
+            project,
+            query,
+            regex,
+            config_filter,
+            metrics,
+            sort,
+            descending,
+            num_pages - 1,
+        )
+    return (
+        df,
+        gr.Markdown(f"Page {page + 1} of {num_pages}, {total} runs"),
+        gr.Button(interactive=page > 0),
+        gr.Button(interactive=page < num_pages - 1),
+        page,
+    )
 
 
 def update_x_axis_choices(project, runs):
@@ -192,66 +855,114 @@ def update_x_axis_choices(project, runs):
     )
 
 
-def toggle_timer(cb_value):
-    if cb_value:
-        return gr.Timer(active=True)
-    else:
-        return gr.Timer(active=False)
+# The id of the latest `watch_project` call of each dashboard session. Earlier calls
+# of the session stop as soon as they notice that they have been superseded.
+_session_watches: dict[str, int] = {}
 
 
-def log(
+async def watch_project(
+    project: str | None, runs: list[str], realtime: bool, request: gr.Request
+):
+    """
+    Streams a new value to the `project_version` state of a dashboard session each
+    time runs are added to the project or new metrics are logged to the selected
+    runs, so that the dashboard is only refreshed when there is something new.
+    """
+    session = request.session_hash
+    watch_id = _session_watches.get(session, 0) + 1
+    _session_watches[session] = watch_id
+    if not project or not realtime:
+        return
+    version = notifier.version(project)
+    timeout = WAIT_MIN_TIMEOUT
+    while _session_watches.get(session) == watch_id:
+        new_version = await notifier.wait(project, version, runs, timeout=timeout)
+        if new_version == version:
+            timeout = min(timeout * 2, WAIT_MAX_TIMEOUT)
+            continue
+        timeout = WAIT_MIN_TIMEOUT
+        version = new_version
+        if _session_watches.get(session) == watch_id:
+            yield [project, version]
+
+
+def stop_watching(request: gr.Request):
+    _session_watches.pop(request.session_hash, None)
+
+
+async def wait_for_updates(
     project: str,
-    run: str,
-    metrics: dict[str, Any],
-    dataset_id: str | None,
-    hf_token: str | None,
-) -> None:
+    since_version: int = 0,
+    runs: list[str] | None = None,
+    timeout: float = WAIT_MAX_TIMEOUT,
+) -> dict[str, Any]:
+    """
+    Long-polls a project: returns as soon as runs are added to it or new metrics are
+    logged to `runs` (or to any run, if None) after `since_version`, or after
+    `timeout` seconds. Returns the new "version" to pass back as `since_version`,
+    along with the "runs" of the project and the "last_steps" of the watched runs.
+    """
+    version = await notifier.wait(
+        project, since_version, runs, timeout=min(timeout, WAIT_MAX_TIMEOUT)
+    )
+    all_runs, last_steps = project_state_cache.get(project)
+    watched = all_runs if runs is None else runs
+    return {
+        "version": version,
+        "runs": all_runs,
+        "last_steps": {run: last_steps[run] for run in watched if run in last_steps},
+    }
+
+
+def check_auth(hf_token: str | None) -> None:
     if os.getenv("SYSTEM") == "spaces":  # if we are running in Spaces
         # check auth token passed in
         if hf_token is None:
             raise PermissionError(
                 "Expected a HF_TOKEN to be provided when logging to a Space"
             )
-        who = HfApi.whoami(hf_token)
-        access_token = who["auth"]["accessToken"]
-        owner_name = os.getenv("SPACE_AUTHOR_NAME")
-        repo_name = os.getenv("SPACE_REPO_NAME")
-        # make sure the token user is either the author of the space,
-        # or is a member of an org that is the author.
-        orgs = [o["name"] for o in who["orgs"]]
-        if owner_name != who["name"] and owner_name not in orgs:
-            raise PermissionError(
-                "Expected the provided hf_token to be the user owner of the space, or be a member of the org owner of the space"
-            )
-        # reject fine-grained tokens without specific repo access
-        if access_token["role"] == "fineGrained":
-            matched = False
-            for item in access_token["fineGrained"]["scoped"]:
-                if (
-                    item["entity"]["type"] == "space"
-                    and item["entity"]["name"] == f"{owner_name}/{repo_name}"
-                    and "repo.write" in item["permissions"]
-                ):
-                    matched = True
-                    break
-                if (
-                    item["entity"]["type"] == "user"
-                    and item["entity"]["name"] == owner_name
-                    and "repo.write" in item["permissions"]
-                ):
-                    matched = True
-                    break
-            if not matched:
-                raise PermissionError(
-                    "Expected the provided hf_token with fine grained permissions to provide write access to the space"
-                )
-        # reject read-only tokens
-        elif access_token["role"] != "write":
-            raise PermissionError(
-                "Expected the provided hf_token to provide write permissions"
-            )
-    storage = SQLiteStorage(project, run, {}, dataset_id=dataset_id)
-    storage.log(metrics)
+        auth_cache.check(hf_token)
+
+
+def log(
+    project: str,
+    run: str,
+    metrics: dict[str, Any],
+    dataset_id: str | None,
+    hf_token: str | None,
+    step: int | None = None,
+) -> None:
+    check_auth(hf_token)
+    storage = SQLiteStorage.get_storage(project, run, dataset_id=dataset_id)
+    storage.log(metrics, step=step)
+    notifier.notify(project)
+
+
+def log_batch(
+    project: str,
+    logs: list[dict[str, Any]],
+    dataset_id: str | None,
+    hf_token: str | None,
+) -> None:
+    """
+    Logs many metrics records at once. Each record is a dict with a "run" name and a
+    "metrics" dict, and optionally a "step" and a "timestamp".
+    """
+    check_auth(hf_token)
+    SQLiteStorage.bulk_log(project, logs, dataset_id=dataset_id)
+    notifier.notify(project)
+
+
+def finish_run(
+    project: str,
+    run: str,
+    dataset_id: str | None,
+    hf_token: str | None,
+) -> None:
+    """Marks a run as finished, once all of its metrics have been logged."""
+    check_auth(hf_token)
+    SQLiteStorage.get_storage(project, run, dataset_id=dataset_id).finish()
+    notifier.notify(project)
 
 
 def sort_metrics_by_prefix(metrics: list[str]) -> list[str]:
@@ -288,6 +999,42 @@ def sort_metrics_by_prefix(metrics: list[str]) -> list[str]:
     return no_prefix + sorted_with_prefix
 
 
+def group_metrics_by_prefix(metrics: list[str]) -> dict[str, list[str]]:
+    """
+    Group metrics by prefix, in the order of `sort_metrics_by_prefix`. Metrics without
+    a prefix are grouped under "".
+
+    Example:
+    Input: ["train/loss", "loss", "train/acc", "val/loss"]
+    Output: {"": ["loss"], "train": ["train/acc", "train/loss"], "val": ["val/loss"]}
+    """
+    groups = {}
+    for metric in sort_metrics_by_prefix(metrics):
+        prefix = metric.split("/")[0] if "/" in metric else ""
+        groups.setdefault(prefix, []).append(metric)
+    return groups
+
+
+def filter_metrics(metrics: list[str], query: str | None) -> list[str]:
+    """Keep the metrics whose name contains `query`, ignoring case."""
+    if not query:
+        return metrics
+    query = query.strip().lower()
+    return [metric for metric in metrics if query in metric.lower()]
+
+
+def paginate(
+    metrics: list[str], page: int, page_size: int
+) -> tuple[list[str], int, int]:
+    """
+    Get the metrics on a page, along with the number of that page (clamped to the
+    pages that exist) and the number of pages.
+    """
+    num_pages = max((len(metrics) + page_size - 1) // page_size, 1)
+    page = min(max(page, 0), num_pages - 1)
+    return metrics[page * page_size : (page + 1) * page_size], page, num_pages
+
+
 def configure(request: gr.Request):
     sidebar_param = request.query_params.get("sidebar")
     match sidebar_param:
@@ -311,21 +1058,63 @@ with gr.Blocks(theme="citrus", title="Trackio Dashboard", css=css) as demo:
         )
         project_dd = gr.Dropdown(label="Project", allow_custom_value=True)
         run_tb = gr.Textbox(label="Runs", placeholder="Type to filter...")
+        with gr.Row():
+            run_regex_cb = gr.Checkbox(label="Regex", value=False, min_width=80)
+            run_desc_cb = gr.Checkbox(label="Descending", value=True, min_width=80)
+        run_config_tb = gr.Textbox(
+            label="Config filter",
+            placeholder="e.g. lr=0.001, optimizer=adam",
+        )
+        run_sort_dd = gr.Dropdown(
+            label="Sort runs by",
+            choices=get_run_sort_choices(None),
+            value="created",
+        )
         run_cb = gr.CheckboxGroup(
             label="Runs", choices=[], interactive=True, elem_id="run-cb"
         )
+        with gr.Row():
+            run_previous_btn = gr.Button("Previous", size="sm", interactive=False)
+            run_next_btn = gr.Button("Next", size="sm", interactive=False)
+        run_page_md = gr.Markdown()
+        with gr.Row():
+            run_select_page_btn = gr.Button("Select page", size="sm")
+            run_clear_btn = gr.Button("Clear selection", size="sm")
         gr.HTML("<hr>")
         realtime_cb = gr.Checkbox(label="Refresh metrics realtime", value=True)
         smoothing_cb = gr.Checkbox(label="Smooth metrics", value=True)
+        smoothing_method_dd = gr.Dropdown(
+            label="Smoothing",
+            choices=[
+                ("Exponential moving average", "ema"),
+                ("Time-weighted EMA", "time_ema"),
+                ("Rolling mean", "rolling"),
+            ],
+            value=DEFAULT_METHOD,
+        )
+        smoothing_weight_slider = gr.Slider(
+            label="Smoothing weight",
+            minimum=0,
+            maximum=0.999,
+            step=0.001,
+            value=DEFAULT_WEIGHT,
+        )
         x_axis_dd = gr.Dropdown(
             label="X-axis",
             choices=["step", "time"],
             value="step",
         )
+        metric_filter_tb = gr.Textbox(label="Metrics", placeholder="Search metrics...")
+        page_size_dd = gr.Dropdown(
+            label="Plots per page",
+            choices=[6, 12, 24, 48, 96],
+            value=PAGE_SIZE,
+        )
 
-    timer = gr.Timer(value=1)
     metrics_subset = gr.State([])
     user_interacted_with_run_cb = gr.State(False)
+    # Changes whenever there are new runs or metrics to show, see `watch_project`.
+    project_version = gr.State(None)
 
     gr.on([demo.load], fn=configure, outputs=[metrics_subset, sidebar])
     gr.on(
@@ -334,150 +1123,445 @@ with gr.Blocks(theme="citrus", title="Trackio Dashboard", css=css) as demo:
         outputs=project_dd,
         show_progress="hidden",
     )
+    # The run list in the sidebar shows one page of runs; the selected runs are kept
+    # here, and are what the rest of the dashboard shows.
+    selected_runs = gr.State([])
+    run_page = gr.State(0)
+    page_runs = gr.State([])
+    run_search = [
+        project_dd,
+        run_tb,
+        run_regex_cb,
+        run_config_tb,
+        run_sort_dd,
+        run_desc_cb,
+    ]
+    run_list = [
+        run_cb,
+        run_tb,
+        run_page_md,
+        run_previous_btn,
+        run_next_btn,
+        run_page,
+        page_runs,
+        selected_runs,
+        user_interacted_with_run_cb,
+    ]
+
     gr.on(
-        [timer.tick],
+        [demo.load, project_dd.change, selected_runs.change, realtime_cb.change],
+        fn=watch_project,
+        inputs=[project_dd, selected_runs, realtime_cb],
+        outputs=project_version,
+        show_progress="hidden",
+        trigger_mode="multiple",
+        concurrency_limit=None,
+        show_api=False,
+    )
+    demo.unload(stop_watching)
+    gr.on(
+        [project_version.change],
         fn=update_runs,
-        inputs=[project_dd, run_tb, user_interacted_with_run_cb],
-        outputs=[run_cb, run_tb],
+        inputs=[*run_search, run_page, selected_runs, user_interacted_with_run_cb],
+        outputs=run_list,
         show_progress="hidden",
     )
     gr.on(
         [demo.load, project_dd.change],
         fn=update_runs,
-        inputs=[project_dd, run_tb],
-        outputs=[run_cb, run_tb],
+        inputs=run_search,
+        outputs=run_list,
+        show_progress="hidden",
+    )
+    gr.on(
+        [
+            run_tb.input,
+            run_regex_cb.input,
+            run_config_tb.submit,
+            run_sort_dd.input,
+            run_desc_cb.input,
+        ],
+        fn=search_runs,
+        inputs=[*run_search, selected_runs, user_interacted_with_run_cb],
+        outputs=run_list,
         show_progress="hidden",
     )
+    for button, fn in [(run_previous_btn, previous_runs), (run_next_btn, next_runs)]:
+        button.click(
+            fn=fn,
+            inputs=[*run_search, run_page, selected_runs, user_interacted_with_run_cb],
+            outputs=run_list,
+            show_progress="hidden",
+        )
     gr.on(
-        [demo.load, project_dd.change, run_cb.change],
+        [demo.load, project_dd.change, project_version.change],
+        fn=lambda project: gr.Dropdown(choices=get_run_sort_choices(project)),
+        inputs=project_dd,
+        outputs=run_sort_dd,
+        show_progress="hidden",
+    )
+    gr.on(
+        [demo.load, project_dd.change, selected_runs.change],
         fn=update_x_axis_choices,
-        inputs=[project_dd, run_cb],
+        inputs=[project_dd, selected_runs],
         outputs=x_axis_dd,
         show_progress="hidden",
     )
 
-    realtime_cb.change(
-        fn=toggle_timer,
-        inputs=realtime_cb,
-        outputs=timer,
-        api_name="toggle_timer",
-    )
     run_cb.input(
-        fn=lambda: True,
-        outputs=user_interacted_with_run_cb,
+        fn=select_runs,
+        inputs=[run_cb, page_runs, selected_runs],
+        outputs=[selected_runs, user_interacted_with_run_cb],
+    )
+    run_select_page_btn.click(
+        fn=lambda page, selected: (
+            gr.CheckboxGroup(value=page),
+            selected + [run for run in page if run not in selected],
+            True,
+        ),
+        inputs=[page_runs, selected_runs],
+        outputs=[run_cb, selected_runs, user_interacted_with_run_cb],
     )
-    run_tb.input(
-        fn=filter_runs,
-        inputs=[project_dd, run_tb],
-        outputs=run_cb,
+    run_clear_btn.click(
+        fn=lambda: (gr.CheckboxGroup(value=[]), [], True),
+        outputs=[run_cb, selected_runs, user_interacted_with_run_cb],
     )
 
     gr.api(
         fn=log,
         api_name="log",
     )
-
-    x_lim = gr.State(None)
-    last_steps = gr.State({})
-
-    def update_x_lim(select_data: gr.SelectData):
-        return select_data.index
-
-    def update_last_steps(project, runs):
-        """Update the last step from all runs to detect when new data is available."""
-        if not project or not runs:
-            return {}
-
-        last_steps = {}
-        for run in runs:
-            metrics = SQLiteStorage.get_metrics(project, run)
-            if metrics:
-                df = pd.DataFrame(metrics)
-                if "step" not in df.columns:
-                    df["step"] = range(len(df))
-                if not df.empty:
-                    last_steps[run] = df["step"].max().item()
-                else:
-                    last_steps[run] = 0
-            else:
-                last_steps[run] = 0
-
-        return last_steps
-
-    timer.tick(
-        fn=update_last_steps,
-        inputs=[project_dd, run_cb],
-        outputs=last_steps,
-        show_progress="hidden",
+    gr.api(
+        fn=log_batch,
+        api_name="log_batch",
     )
-
-    @gr.render(
-        triggers=[
-            demo.load,
-            run_cb.change,
-            last_steps.change,
-            smoothing_cb.change,
-            x_lim.change,
-            x_axis_dd.change,
-        ],
-        inputs=[project_dd, run_cb, smoothing_cb, metrics_subset, x_lim, x_axis_dd],
-        show_progress="hidden",
+    gr.api(
+        fn=finish_run,
+        api_name="finish",
+    )
+    gr.api(
+        fn=wait_for_updates,
+        api_name="wait_for_updates",
+        concurrency_limit=None,
     )
-    def update_dashboard(project, runs, smoothing, metrics_subset, x_lim_value, x_axis):
-        dfs = []
-        original_runs = runs.copy()
-
-        for run in runs:
-            df = load_run_data(project, run, smoothing, x_axis)
-            if df is not None:
-                dfs.append(df)
 
-        if dfs:
-            master_df = pd.concat(dfs, ignore_index=True)
-        else:
-            master_df = pd.DataFrame()
+    with gr.Tab("Plots"):
+        x_lim = gr.State(None)
+        last_steps = gr.State({})
+
+        def update_x_lim(select_data: gr.SelectData):
+            return select_data.index
+
+        def update_last_steps(project, runs):
+            """Update the last step from all runs to detect when new data is available."""
+            if not project or not runs:
+                return {}
+            _, last_steps = project_state_cache.get(project)
+            return {run: last_steps.get(run, 0) for run in runs}
+
+        project_version.change(
+            fn=update_last_steps,
+            inputs=[project_dd, selected_runs],
+            outputs=last_steps,
+            show_progress="hidden",
+        )
 
-        if master_df.empty:
-            return
+        # The runs and metrics to plot: the plots are only rendered again when these (or
+        # the plot settings) change. New values only update the plots they belong to.
+        plot_layout = gr.State(None)
+        # The prefixes of the metric groups that are expanded (None until the user
+        # expands or collapses one, in which case only the first group is expanded),
+        # and the page shown in each group.
+        open_groups = gr.State(None)
+        group_pages = gr.State({})
+
+        def update_plot_layout(project, runs, metrics_subset):
+            return [project, runs, get_plot_metrics(project, runs, metrics_subset)]
+
+        gr.on(
+            [demo.load, selected_runs.change, last_steps.change],
+            fn=update_plot_layout,
+            inputs=[project_dd, selected_runs, metrics_subset],
+            outputs=plot_layout,
+            show_progress="hidden",
+        )
+        gr.on(
+            [metric_filter_tb.change, page_size_dd.change],
+            fn=lambda: {},
+            outputs=group_pages,
+            show_progress="hidden",
+        )
 
-        x_column = "step"
-        if dfs and not dfs[0].empty and "x_axis" in dfs[0].columns:
-            x_column = dfs[0]["x_axis"].iloc[0]
-
-        numeric_cols = master_df.select_dtypes(include="number").columns
-        numeric_cols = [c for c in numeric_cols if c not in RESERVED_KEYS]
-        if metrics_subset:
-            numeric_cols = [c for c in numeric_cols if c in metrics_subset]
-
-        numeric_cols = sort_metrics_by_prefix(list(numeric_cols))
-        color_map = get_color_mapping(original_runs, smoothing)
-
-        with gr.Row(key="row"):
-            for metric_idx, metric_name in enumerate(numeric_cols):
-                metric_df = master_df.dropna(subset=[metric_name])
-                if not metric_df.empty:
-                    plot = gr.LinePlot(
-                        metric_df,
-                        x=x_column,
-                        y=metric_name,
-                        color="run" if "run" in metric_df.columns else None,
-                        color_map=color_map,
-                        title=metric_name,
-                        key=f"plot-{metric_idx}",
-                        preserved_by_key=None,
-                        x_lim=x_lim_value,
-                        y_lim=[
-                            metric_df[metric_name].min(),
-                            metric_df[metric_name].max(),
-                        ],
-                        show_fullscreen_button=True,
-                        min_width=400,
+        @gr.render(
+            triggers=[
+                plot_layout.change,
+                smoothing_cb.change,
+                smoothing_method_dd.change,
+                smoothing_weight_slider.release,
+                x_lim.change,
+                x_axis_dd.change,
+                open_groups.change,
+                group_pages.change,
+                metric_filter_tb.change,
+                page_size_dd.change,
+            ],
+            inputs=[
+                plot_layout,
+                smoothing_cb,
+                x_lim,
+                x_axis_dd,
+                smoothing_method_dd,
+                smoothing_weight_slider,
+                open_groups,
+                group_pages,
+                metric_filter_tb,
+                page_size_dd,
+            ],
+            show_progress="hidden",
+        )
+        def update_dashboard(
+            layout,
+            smoothing,
+            x_lim_value,
+            x_axis,
+            smoothing_method,
+            smoothing_weight,
+            open_groups_value,
+            group_pages_value,
+            metric_filter,
+            page_size,
+        ):
+            if not layout:
+                return
+            project, runs, metrics = layout
+            groups = group_metrics_by_prefix(filter_metrics(metrics, metric_filter))
+            if open_groups_value is None:
+                open_groups_value = list(groups)[:1]
+
+            # Only the current page of each expanded group is loaded from storage.
+            pages = {}
+            for prefix, group_metrics in groups.items():
+                if prefix in open_groups_value:
+                    pages[prefix] = paginate(
+                        group_metrics, group_pages_value.get(prefix, 0), int(page_size)
                     )
-                plot.select(update_x_lim, outputs=x_lim, key=f"select-{metric_idx}")
-                plot.double_click(
-                    lambda: None, outputs=x_lim, key=f"double-{metric_idx}"
+            visible = [metric for page in pages.values() for metric in page[0]]
+            signatures = get_plot_signatures(project, runs, visible)
+            plot_data = load_plot_data(
+                project,
+                runs,
+                visible,
+                smoothing,
+                x_axis,
+                x_lim_value,
+                smoothing_method,
+                smoothing_weight,
+            )
+            color_map = get_color_mapping(runs, smoothing)
+
+            plots = {}
+            for prefix, group_metrics in groups.items():
+                is_open = prefix in pages
+                with gr.Accordion(
+                    label=f"{prefix or 'Metrics'} ({len(group_metrics)})",
+                    open=is_open,
+                    key=f"group-{prefix}",
+                ) as group:
+                    if is_open:
+                        page_metrics, page, num_pages = pages[prefix]
+                        with gr.Row(key=f"row-{prefix}"):
+                            for metric_name in page_metrics:
+                                if metric_name not in plot_data:
+                                    continue
+                                metric_df, y_lim = plot_data[metric_name]
+                                plot = gr.LinePlot(
+                                    metric_df,
+                                    x=x_axis,
+                                    y=metric_name,
+                                    color="run" if "run" in metric_df.columns else None,
+                                    color_map=color_map,
+                                    title=metric_name,
+                                    key=f"plot-{metric_name}",
+                                    preserved_by_key=None,
+                                    x_lim=x_lim_value,
+                                    y_lim=y_lim,
+                                    show_fullscreen_button=True,
+                                    min_width=400,
+                                )
+                                plot.select(
+                                    update_x_lim,
+                                    outputs=x_lim,
+                                    key=f"select-{metric_name}",
+                                )
+                                plot.double_click(
+                                    lambda: None,
+                                    outputs=x_lim,
+                                    key=f"double-{metric_name}",
+                                )
+                                plots[metric_name] = plot
+                        if num_pages > 1:
+                            with gr.Row(key=f"pages-{prefix}"):
+                                previous_btn = gr.Button(
+                                    "Previous",
+                                    size="sm",
+                                    interactive=page > 0,
+                                    key=f"previous-{prefix}",
+                                )
+                                gr.Markdown(
+                                    f"Page {page + 1} of {num_pages}",
+                                    key=f"page-{prefix}",
+                                )
+                                next_btn = gr.Button(
+                                    "Next",
+                                    size="sm",
+                                    interactive=page < num_pages - 1,
+                                    key=f"next-{prefix}",
+                                )
+                            previous_btn.click(
+                                lambda pages, prefix=prefix, page=page: {
+                                    **pages,
+                                    prefix: page - 1,
+                                },
+                                inputs=group_pages,
+                                outputs=group_pages,
+                                key=f"previous-click-{prefix}",
+                            )
+                            next_btn.click(
+                                lambda pages, prefix=prefix, page=page: {
+                                    **pages,
+                                    prefix: page + 1,
+                                },
+                                inputs=group_pages,
+                                outputs=group_pages,
+                                key=f"next-click-{prefix}",
+                            )
+                group.expand(
+                    lambda prefix=prefix: [
+                        *(p for p in open_groups_value if p != prefix),
+                        prefix,
+                    ],
+                    outputs=open_groups,
+                    key=f"expand-{prefix}",
+                )
+                group.collapse(
+                    lambda prefix=prefix: [p for p in open_groups_value if p != prefix],
+                    outputs=open_groups,
+                    key=f"collapse-{prefix}",
                 )
 
+            def update_plots():
+                """Redraw the plots of the metrics that were logged to since last drawn."""
+                new_signatures = get_plot_signatures(project, runs, list(plots))
+                changed = [m for m in plots if new_signatures[m] != signatures[m]]
+                new_data = load_plot_data(
+                    project,
+                    runs,
+                    changed,
+                    smoothing,
+                    x_axis,
+                    x_lim_value,
+                    smoothing_method,
+                    smoothing_weight,
+                )
+                updates = []
+                for metric_name in plots:
+                    if metric_name not in new_data:
+                        updates.append(gr.skip())
+                        continue
+                    signatures[metric_name] = new_signatures[metric_name]
+                    metric_df, y_lim = new_data[metric_name]
+                    updates.append(gr.update(value=metric_df, y_lim=y_lim))
+                return updates
+
+            if plots:
+                last_steps.change(
+                    update_plots,
+                    outputs=list(plots.values()),
+                    show_progress="hidden",
+                )
+
+    with gr.Tab("Runs table"):
+        with gr.Row():
+            summary_metrics_dd = gr.Dropdown(
+                label="Metrics", choices=[], multiselect=True, scale=3
+            )
+            summary_sort_dd = gr.Dropdown(
+                label="Sort by",
+                choices=get_summary_sort_choices([]),
+                value="created",
+                scale=2,
+            )
+            summary_desc_cb = gr.Checkbox(label="Descending", value=True, scale=1)
+        summary_df = gr.DataFrame(interactive=False)
+        with gr.Row():
+            summary_previous_btn = gr.Button("Previous", size="sm", interactive=False)
+            summary_page_md = gr.Markdown()
+            summary_next_btn = gr.Button("Next", size="sm", interactive=False)
+        summary_page = gr.State(0)
+
+        # The runs table is searched with the sidebar, and sorted on its own.
+        summary_search = [
+            project_dd,
+            run_tb,
+            run_regex_cb,
+            run_config_tb,
+            summary_metrics_dd,
+            summary_sort_dd,
+            summary_desc_cb,
+        ]
+        summary_outputs = [
+            summary_df,
+            summary_page_md,
+            summary_previous_btn,
+            summary_next_btn,
+            summary_page,
+        ]
+        gr.on(
+            [demo.load, project_dd.change],
+            fn=update_summary_metrics,
+            inputs=project_dd,
+            outputs=summary_metrics_dd,
+            show_progress="hidden",
+        )
+        summary_metrics_dd.change(
+            fn=update_summary_sort_choices,
+            inputs=[summary_metrics_dd, summary_sort_dd],
+            outputs=summary_sort_dd,
+            show_progress="hidden",
+        )
+        gr.on(
+            [
+                summary_metrics_dd.change,
+                run_tb.input,
+                run_regex_cb.input,
+                run_config_tb.submit,
+                summary_sort_dd.input,
+                summary_desc_cb.input,
+            ],
+            fn=update_summary,
+            inputs=summary_search,
+            outputs=summary_outputs,
+            show_progress="hidden",
+        )
+        gr.on(
+            [project_version.change],
+            fn=update_summary,
+            inputs=[*summary_search, summary_page],
+            outputs=summary_outputs,
+            show_progress="hidden",
+        )
+        summary_previous_btn.click(
+            fn=lambda *args: update_summary(*args[:-1], max(args[-1] - 1, 0)),
+            inputs=[*summary_search, summary_page],
+            outputs=summary_outputs,
+            show_progress="hidden",
+        )
+        summary_next_btn.click(
+            fn=lambda *args: update_summary(*args[:-1], args[-1] + 1),
+            inputs=[*summary_search, summary_page],
+            outputs=summary_outputs,
+            show_progress="hidden",
+        )
 
 if __name__ == "__main__":
     demo.launch(allowed_paths=[TRACKIO_LOGO_PATH], show_api=False)